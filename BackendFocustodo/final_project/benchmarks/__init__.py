@@ -0,0 +1,5 @@
+"""
+This package contains the benchmarks of the application. They run offline from
+the final_project directory, e.g. python -m benchmarks.memory
+Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@udistrital.edu.co>
+"""
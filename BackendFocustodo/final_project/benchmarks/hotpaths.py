@@ -0,0 +1,261 @@
+"""
+This module measures the hot paths of the client and the composite tree over
+synthetic datasets of growing size, and prints the results as JSON so they can be
+compared between commits.
+Usage: python -m benchmarks.hotpaths --sizes 1000 10000 100000 1000000 --output results.json
+Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@udistrital.edu.co>
+"""
+
+# pylint: disable= import-error
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from project import client as cliente
+from project import composite
+from project import report_factory
+from project import user_auth
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+SUBTASKS_PER_TASK = 3
+TASKS_PER_PROJECT = 10
+
+
+def build_client(size: int):
+    """This function creates a client with the given number of tasks."""
+    client = cliente.Client()
+    for number in range(size):
+        client.create_task(f"Task {number}")
+    return client
+
+
+def build_project(size: int):
+    """This function creates a project whose tasks have a few subtasks each."""
+    project = composite.Project("Project")
+    for number in range(size):
+        task = composite.Task(f"Task {number}")
+        for subtask_number in range(SUBTASKS_PER_TASK):
+            task.add_component(composite.Subtask(f"Subtask {subtask_number}"))
+        project.add_component(task)
+    return project
+
+
+def build_projects(size: int):
+    """This function creates a client with the tasks grouped in projects."""
+    client = build_client(size)
+    tasks = list(client.tasks)
+    for start in range(0, size, TASKS_PER_PROJECT):
+        name = f"Project {start // TASKS_PER_PROJECT}"
+        client.create_project(name)
+        project = client.projects.get(name)
+        for task in tasks[start : start + TASKS_PER_PROJECT]:
+            project.add_component(task)
+    return client
+
+
+def build_users(path: str, size: int):
+    """
+    This function writes a users file with hashed passwords.
+
+    The passwords are hashed with a single iteration, so the benchmark measures
+    the lookup of the users instead of the constant cost of PBKDF2.
+    """
+    users = []
+    for number in range(size):
+        salt, digest = user_auth.hash_password(
+            f"password {number}", salt=number.to_bytes(16, "big"), iterations=1
+        )
+        users.append(
+            {
+                "username": f"user{number}",
+                "salt": salt.hex(),
+                "password_hash": digest.hex(),
+                "iterations": 1,
+                "grants": {},
+            }
+        )
+    with open(path, "w", encoding="UTF-8") as file:
+        json.dump(users, file)
+
+
+def bench_create_task(size: int):
+    """This function creates size tasks."""
+    client = cliente.Client()
+    start = time.perf_counter()
+    for number in range(size):
+        client.create_task(f"Task {number}")
+    return time.perf_counter() - start
+
+
+def bench_delete_task(size: int):
+    """This function deletes size tasks in random order."""
+    client = build_client(size)
+    names = [f"Task {number}" for number in range(size)]
+    random.Random(size).shuffle(names)
+    start = time.perf_counter()
+    for name in names:
+        client.delete_task(name)
+    return time.perf_counter() - start
+
+
+def bench_set_task_as_done(size: int):
+    """This function sets size tasks as done in random order."""
+    client = build_client(size)
+    names = [f"Task {number}" for number in range(size)]
+    random.Random(size).shuffle(names)
+    start = time.perf_counter()
+    for name in names:
+        client.set_task_as_done(name)
+    return time.perf_counter() - start
+
+
+def bench_project_set_as_done(size: int):
+    """This function sets a project of size tasks as done, with the cascade."""
+    project = build_project(size)
+    start = time.perf_counter()
+    project.set_as_done()
+    return time.perf_counter() - start
+
+
+def bench_view_projects(size: int):
+    """This function renders the projects of a client with size tasks."""
+    client = build_projects(size)
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        client.view_projects()
+    return time.perf_counter() - start
+
+
+def bench_tasks_report(size: int):
+    """This function creates the tasks report of size done tasks."""
+    client = build_client(size)
+    for task in client.tasks:
+        client.set_task_as_done(task.get_name())
+    factory = report_factory.ReportFactory()
+    start = time.perf_counter()
+    str(factory.create_report("Tasks", client.done_tasks))
+    return time.perf_counter() - start
+
+
+def bench_search(size: int):
+    """This function makes size queries over a client with size tasks."""
+    client = build_projects(size)
+    client.search("task")
+    numbers = random.Random(size).choices(range(size), k=size)
+    start = time.perf_counter()
+    for number in numbers:
+        client.search(f"task {number}")
+    return time.perf_counter() - start
+
+
+def bench_authenticate(size: int):
+    """This function makes size logins of random users, out of size users."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "users.json")
+        build_users(path, size)
+        store = user_auth.CredentialStore(path)
+        # La primera llamada carga el archivo
+        user_auth.Authentication("user0", "password 0", store).authenticate()
+        numbers = random.Random(size).choices(range(size), k=size)
+        start = time.perf_counter()
+        for number in numbers:
+            user_auth.Authentication(
+                f"user{number}", f"password {number}", store
+            ).authenticate()
+        return time.perf_counter() - start
+
+
+BENCHMARKS = {
+    "client.create_task": bench_create_task,
+    "client.delete_task": bench_delete_task,
+    "client.set_task_as_done": bench_set_task_as_done,
+    "project.set_as_done": bench_project_set_as_done,
+    "client.view_projects": bench_view_projects,
+    "report.tasks": bench_tasks_report,
+    "client.search": bench_search,
+    "authentication.authenticate": bench_authenticate,
+}
+
+
+def measure(benchmark, size: int, repeat: int) -> dict:
+    """
+    This function runs a benchmark several times.
+
+    Returns:
+        dict: The best and median times in seconds, and the time per item.
+    """
+    times = [benchmark(size) for _ in range(repeat)]
+    best = min(times)
+    return {
+        "size": size,
+        "repeat": repeat,
+        "best_s": best,
+        "median_s": statistics.median(times),
+        "per_item_us": best / size * 1e6,
+    }
+
+
+def git_revision():
+    """This function returns the current commit, or None outside of a git tree."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes=DEFAULT_SIZES, names=None, repeat: int = 3) -> dict:
+    """
+    This function runs the benchmarks and returns the results.
+
+    Args:
+        sizes (iterable): The number of items of each dataset.
+        names (iterable): The benchmarks to run, all of them by default.
+        repeat (int): The number of runs of each benchmark.
+
+    Returns:
+        dict: The environment and one result per benchmark and size.
+    """
+    results = []
+    for name in names or BENCHMARKS:
+        for size in sizes:
+            result = measure(BENCHMARKS[name], size, repeat)
+            results.append({"benchmark": name, **result})
+    return {
+        "commit": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def main():
+    """This function parses the arguments and prints the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--benchmarks", nargs="+", choices=sorted(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Writes the results to a file")
+    args = parser.parse_args()
+    results = json.dumps(run(args.sizes, args.benchmarks, args.repeat), indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="UTF-8") as file:
+            file.write(results + "\n")
+    else:
+        print(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+This module measures the memory used by the composite components, comparing the
+slotted classes of project.composite with project/composite.py as it was in a
+git revision before __slots__, the baseline commit by default.
+Usage: python -m benchmarks.memory --tasks 10000 --subtasks 10 --baseline 97ef538
+Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@udistrital.edu.co>
+"""
+
+# pylint: disable= import-error
+import argparse
+import gc
+import json
+import os
+import subprocess
+import tracemalloc
+import types
+from project import composite
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The commit whose components keep their attributes in a __dict__
+BASELINE = "97ef538"
+
+
+def load_revision(revision: str):
+    """
+    This function loads project/composite.py as it was in a git revision.
+
+    Returns:
+        module: The composite module of the revision, or None if git or the
+        revision is not available.
+    """
+    try:
+        process = subprocess.run(
+            ["git", "show", f"{revision}:./project/composite.py"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    module = types.ModuleType(f"composite_{revision}")
+    # pylint: disable= exec-used
+    exec(
+        compile(process.stdout, f"{revision}:project/composite.py", "exec"),
+        vars(module),
+    )
+    return module
+
+
+def build_tree(task_class, subtask_class, tasks, subtasks):
+    """This function creates the tasks with their subtasks."""
+    tree = []
+    for task_number in range(tasks):
+        task = task_class(f"Task {task_number}")
+        for subtask_number in range(subtasks):
+            task.add_component(subtask_class(f"Subtask {subtask_number}"))
+        tree.append(task)
+    return tree
+
+
+def measure(task_class, subtask_class, tasks, subtasks):
+    """
+    This function returns the bytes allocated to build the tree.
+
+    Returns:
+        dict: The total bytes and the bytes per component.
+    """
+    gc.collect()
+    tracemalloc.start()
+    tree = build_tree(task_class, subtask_class, tasks, subtasks)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+    components = tasks * (subtasks + 1)
+    return {"bytes": current, "bytes_per_component": current / components}
+
+
+def run(tasks, subtasks, baseline: str = BASELINE):
+    """
+    This function runs the benchmark and returns the results.
+
+    Args:
+        baseline (str): The git revision of the classes before __slots__, or
+            None to measure only the current classes.
+
+    Returns:
+        dict: The measures, with None as the before numbers and the ratio when
+        the baseline can't be loaded.
+    """
+    before = None
+    previous = load_revision(baseline) if baseline else None
+    if previous is not None:
+        before = measure(previous.Task, previous.Subtask, tasks, subtasks)
+    slotted = measure(composite.Task, composite.Subtask, tasks, subtasks)
+    return {
+        "benchmark": "composite_memory",
+        "tasks": tasks,
+        "subtasks_per_task": subtasks,
+        "baseline": baseline if previous is not None else None,
+        "before": before,
+        "slotted": slotted,
+        "ratio": slotted["bytes"] / before["bytes"] if before else None,
+    }
+
+
+def main():
+    """This function parses the arguments and prints the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--subtasks", type=int, default=10)
+    parser.add_argument(
+        "--baseline",
+        default=BASELINE,
+        help="The git revision before __slots__, empty to skip it",
+    )
+    args = parser.parse_args()
+    print(json.dumps(run(args.tasks, args.subtasks, args.baseline), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+This module measures the startup of the CLI: it imports the entry points in a new
+interpreter with python -X importtime, and checks that the storage, the reports,
+the pomodoro and the premium features are not loaded until they are used.
+Usage: python -m benchmarks.startup --repeat 5 --check
+Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@udistrital.edu.co>
+"""
+
+# pylint: disable= import-error
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The modules that each entry point must not load while starting
+DEFERRED = {
+    "main": (
+        "sqlalchemy",
+        "numpy",
+        "project.cli",
+        "project.client",
+        "project.storage",
+        "project.journal",
+        "project.transfer",
+        "project.pomodoro",
+        "project.report_factory",
+        "project.analytics",
+    ),
+    "project.client": (
+        "numpy",
+        "project.pomodoro",
+        "project.report_factory",
+        "project.analytics",
+        "project.notification",
+        "project.search",
+        "project.tags",
+        "project.subscription",
+    ),
+}
+
+
+def parse_importtime(output: str) -> dict:
+    """
+    This function reads the report that python -X importtime writes to stderr.
+
+    Returns:
+        dict: The cumulative microseconds of every imported module.
+    """
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def import_module(module: str) -> tuple:
+    """
+    This function imports a module in a new interpreter.
+
+    Returns:
+        tuple: The seconds it took, and the cumulative microseconds of every
+        module it imported.
+    """
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return time.perf_counter() - start, parse_importtime(process.stderr)
+
+
+def measure(module: str, repeat: int) -> dict:
+    """
+    This function imports a module several times.
+
+    Returns:
+        dict: The best and median import times, the time of the interpreter alone,
+        the project modules that were loaded and the deferred modules that were
+        loaded anyway.
+    """
+    runs = [import_module(module) for _ in range(repeat)]
+    baseline = min(import_module("sys")[0] for _ in range(repeat))
+    imported = runs[0][1]
+    loaded = sorted(name for name in imported if name.startswith("project"))
+    early = [
+        name
+        for name in DEFERRED.get(module, ())
+        if any(other == name or other.startswith(name + ".") for other in imported)
+    ]
+    import_us = [modules.get(module, 0) for _, modules in runs]
+    return {
+        "module": module,
+        "repeat": repeat,
+        "best_import_us": min(import_us),
+        "median_import_us": statistics.median(import_us),
+        "best_wall_s": min(wall for wall, _ in runs),
+        "interpreter_s": baseline,
+        "loaded_modules": loaded,
+        "loaded_too_early": early,
+    }
+
+
+def run(modules=tuple(DEFERRED), repeat: int = 3) -> dict:
+    """
+    This function measures the startup of the entry points.
+
+    Args:
+        modules (iterable): The modules to be imported, main and project.client
+            by default.
+        repeat (int): The number of imports of each module.
+
+    Returns:
+        dict: The environment and one result per module.
+    """
+    return {
+        "python": sys.version.split()[0],
+        "results": [measure(module, repeat) for module in modules],
+    }
+
+
+def main():
+    """This function prints the results as JSON, and checks them with --check."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--modules", nargs="+", default=list(DEFERRED))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Writes the results to a file")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Fails if a deferred module is loaded while starting",
+    )
+    args = parser.parse_args()
+    results = run(args.modules, args.repeat)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="UTF-8") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    if args.check and any(result["loaded_too_early"] for result in results["results"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
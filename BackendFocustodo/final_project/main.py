@@ -4,11 +4,20 @@ Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@u
 """
 
 # pylint: disable= import-error
+import csv
+import os
 import sys
+from project import lazy
 from project import user_auth
-from project import subscription
-from project import notification
-from project import client as cliente
+
+# Solo el login se carga al iniciar; el resto se carga al usarse por primera vez
+subscription = lazy.lazy_import("project.subscription")
+notification = lazy.lazy_import("project.notification")
+pomodoro = lazy.lazy_import("project.pomodoro")
+storage = lazy.lazy_import("project.storage")
+transfer = lazy.lazy_import("project.transfer")
+journal = lazy.lazy_import("project.journal")
+cli = lazy.lazy_import("project.cli")
 
 
 def login():
@@ -38,9 +47,20 @@ def main():
         print("Usuario o contraseña incorrectos, intente de nuevo.")
         user = login()
 
-    client = cliente.Client()
+    # Se recuperan las tareas, proyectos y carpetas guardados del usuario
+    repository = storage.Repository(cli.DEFAULT_DATABASE)
+    # El journal guarda cada cambio, así un cierre inesperado no pierde el estado
+    journal_directory = os.path.join(cli.DEFAULT_JOURNALS, user.get_username())
+    client = journal.open_client(repository, user.get_username(), journal_directory)
+    notifications = notification.NotificationDispatcher().start()
+    # Los pomodoros corren en segundo plano en el scheduler compartido
+    scheduler = pomodoro.get_default_scheduler()
+    scheduler.start_thread()
+    # El registro solo vive en memoria, se llena con los clientes guardados
+    subscription.get_default_registry().register_all(repository.iter_premium())
+    # Un cliente premium guardado ya tiene su suscripción
     subscription_instance = subscription.Subscription(
-        user.get_username()
+        user.get_username(), premium=client.premium
     )  # Instantiate the class
 
     # pylint: disable=invalid-name
@@ -57,13 +77,17 @@ def main():
     7. Agregar Tarea a Proyecto
     8. Eliminar Proyecto
     9. Mostrar Proyectos
-    10. Iniciar Pomodoro
+    10. Iniciar o Detener Pomodoro
     11. Marcar Tarea como Realizada
     12. Marcar Subtarea como Realizada
     13. Marcar Proyecto como Realizado
     14. Personalizar Pomodoro
     15. Ver Planes de Suscripción
     16. Pagar Suscripción
+    17. Ver Reporte de Clientes
+    22. Exportar Tareas (.ndjson o .csv)
+    23. Importar Tareas (.ndjson o .csv)
+    24. Buscar
     """
 
     OPTIONS_PREMIUM = """
@@ -72,6 +96,8 @@ def main():
     19. Crear Carpeta
     20. Asignar Proyecto a Carpeta
     21. Ver Carpetas
+    25. Etiquetar Tareas
+    26. Ver Tareas por Etiqueta
     """
 
     if client.premium is True:
@@ -121,58 +147,41 @@ def main():
 
         elif option == "4":
             print("\n==========Creando Subtarea===========")
-            exist = False
-            exist_task = False
             task_super = input(
                 "Escriba el nombre de la tarea a la que pertenece la subtarea: "
             )
             # Verificar si la tarea a la que se quiere añadir la subtarea existe
-            for task in client.tasks:
-                if task_super == task.get_name():
-                    exist_task = True
-                    subtask = input("Ingrese el nombre de la subtarea: ")
-                    # Verificar si la subtarea ya existe
-                    for sub in task.subtasks:
-                        if subtask == sub.get_name():
-                            exist = True
-                    # Si la subtarea no existe, se crea
-                    if exist is False:
-                        task.add_component(client.create_subtask(subtask))
-                        print("Subtarea: " + subtask + " creada con éxito")
-                        break
+            task = client.tasks.get(task_super)
+            if task is not None:
+                subtask = input("Ingrese el nombre de la subtarea: ")
+                # Si la subtarea no existe, se crea
+                if client.add_subtask(task_super, subtask) is True:
+                    print("Subtarea: " + subtask + " creada con éxito")
+                else:
                     print(f"La subtarea {subtask} ya existe, intente con otro nombre.")
-                    break
             # Si la tarea no existe, se avisa al usuario
-            if exist_task is False:
+            else:
                 print(
                     f"La tarea {task_super} no existe, cree la tarea primero y luego añade la subtarea"
                 )
 
         elif option == "5":
             print("\n==========Eliminando Subtarea===========")
-            exist = False
-            exist_task = False
             task_super = input(
                 "Escriba el nombre de la tarea a la que pertenece la subtarea a eliminar: "
             )
             # Verificar si la tarea a la que se quiere añadir la subtarea existe
-            for task in client.tasks:
-                if task_super == task.get_name():
-                    exist_task = True
-                    # Verificar si la subtarea a eliminar existe
-                    subtask = input("Ingrese el nombre de la subtarea a eliminar: ")
-                    for sub in task.subtasks:
-                        if subtask == sub.get_name():
-                            exist = True
-                            task.remove_component(subtask)
-                            print("Subtarea: " + subtask + " eliminada con éxito")
-                            break
-                    # Si la subtarea no existe, se avisa al usuario
-                    if exist is False:
-                        print(f"La subtarea {subtask} no existe.")
-                        break
+            task = client.tasks.get(task_super)
+            if task is not None:
+                # Verificar si la subtarea a eliminar existe
+                subtask = input("Ingrese el nombre de la subtarea a eliminar: ")
+                if client.remove_subtask(task_super, subtask) is True:
+                    print("Subtarea: " + subtask + " eliminada con éxito")
+                # Si la subtarea no existe, se avisa al usuario
+                else:
+                    print(f"La subtarea {subtask} no existe.")
             # Si la tarea no existe, se avisa al usuario
-            if exist_task is False:
+            else:
                 print(f"La tarea {task_super} no existe, intente con otro nombre.")
 
         elif option == "6":
@@ -190,35 +199,22 @@ def main():
 
         elif option == "7":
             print("\n==========Agregando Tarea a Proyecto===========")
-            exist = False
-            exist_in_project = False
-            exist_project = False
             project_name = input("Ingrese el nombre del proyecto: ")
             task_name = input("Ingrese el nombre de la tarea a agregar al proyecto: ")
-            # Verificar si la tarea existe
-            for task in client.tasks:
-                if task_name == task.get_name():
-                    exist = True
-                    # Verificar si el proyecto existe
-                    for project in client.projects:
-                        if project_name == project.get_name():
-                            exist_project = True
-                            # Para evitar que se agregue la misma tarea al proyecto
-                            for task in project.tasks:
-                                if task_name == task.get_name():
-                                    exist_in_project = True
-                                    print("La tarea ya existe en el proyecto.")
-                                    break
-                            # Si la tarea no existe en el proyecto, se agrega
-                            if exist_in_project is False:
-                                project.add_component(task)
-                                print(
-                                    f"La tarea {task_name} fue agregada al proyecto {project_name} con éxito."
-                                )
-                                break
-            if exist_project is False:
+            # Verificar si la tarea y el proyecto existen
+            task = client.tasks.get(task_name)
+            project = client.projects.get(project_name)
+            if task is not None and project is not None:
+                # Para evitar que se agregue la misma tarea al proyecto
+                if client.add_task_to_project(project_name, task_name) is False:
+                    print("La tarea ya existe en el proyecto.")
+                else:
+                    print(
+                        f"La tarea {task_name} fue agregada al proyecto {project_name} con éxito."
+                    )
+            if project is None:
                 print("El proyecto no existe, cree uno y luego podrá agregar tareas.")
-            if exist is False:
+            if task is None:
                 print("La tarea que quiere agregar no existe.")
 
         elif option == "8":
@@ -234,9 +230,17 @@ def main():
             client.view_projects()
 
         elif option == "10":
-            print("\n==========Iniciando Pomodoro===========")
-            # Se le envía notificación para que pueda enviar mensajes al usuario
-            client.start_pomodoro(notification.Notification(user.get_username()))
+            if scheduler.stop(user.get_username()):
+                print("\n==========Pomodoro Detenido===========")
+            else:
+                print("\n==========Iniciando Pomodoro===========")
+                # Se le envía notificación para que pueda enviar mensajes al usuario
+                # Las notificaciones se entregan en segundo plano, sin frenar el menú
+                client.start_pomodoro(
+                    notification.Notification(user.get_username(), notifications),
+                    scheduler,
+                )
+                print("El pomodoro corre en segundo plano, elija 10 para detenerlo")
 
         elif option == "11":
             print("\n==========Marcando Tarea como Realizada===========")
@@ -248,27 +252,19 @@ def main():
 
         elif option == "12":
             print("\n==========Marcando Subtarea como Realizada===========")
-            exist = False
-            exist_task = False
             task_super = input(
                 "Escriba el nombre de la tarea a la que pertenece la subtarea a marcar: "
             )
             # Verificar si la tarea a la que se quiere añadir la subtarea existe
-            for task in client.tasks:
-                if task_super == task.get_name():
-                    exist_task = True
-                    subtask = input("Ingrese el nombre de la subtarea a marcar: ")
-                    # Verificar si la subtarea a marcar existe
-                    for sub in task.subtasks:
-                        if subtask == sub.get_name():
-                            exist = True
-                            sub.set_as_done()
-                            print("Subtarea: " + subtask + " marcada con éxito")
-                            break
-                    if exist is False:
-                        print(f"La subtarea {subtask} no existe.")
-                        break
-            if exist_task is False:
+            task = client.tasks.get(task_super)
+            if task is not None:
+                subtask = input("Ingrese el nombre de la subtarea a marcar: ")
+                # Verificar si la subtarea a marcar existe
+                if client.complete_subtask(task_super, subtask) is True:
+                    print("Subtarea: " + subtask + " marcada con éxito")
+                else:
+                    print(f"La subtarea {subtask} no existe.")
+            else:
                 print(f"La tarea {task_super} no existe, intente con otro nombre.")
 
         elif option == "13":
@@ -290,10 +286,12 @@ def main():
             client.view_plans(subscription_instance)
 
         elif option == "16":
-            if client.pay_for_subscription(subscription_instance) is True:
+            if (
+                client.premium is False
+                and client.pay_for_subscription(subscription_instance) is True
+            ):
                 print("\n============Pagando Suscripción=============")
-                client = cliente.PremiumDecorator(client)
-                client.premium = True
+                client.upgrade_to_premium()
                 print("Suscripción pagada con éxito")
             else:  # En caso de que el usuario ya sea premium
                 print("\n============Mostrando Estado=============")
@@ -301,7 +299,7 @@ def main():
 
         elif option == "17":
             print("\n==========Mostrando Reporte de Clientes===========")
-            # client.view_clients_report()
+            client.view_clients_report("Clients")
 
         # Opciones que solo pueden ejecutar los usuarios premium
         elif option == "18":
@@ -317,72 +315,123 @@ def main():
             else:
                 print("\n==========Creando Carpeta===========")
                 folder_name = input("Ingrese el nombre de la carpeta: ")
-                client.create_folder(folder_name)
+                # Si retorna False, la carpeta ya existe
+                if client.create_folder(folder_name) is False:
+                    print(
+                        f"La carpeta {folder_name} ya existe, intente con otro nombre."
+                    )
+                else:
+                    print(f"Carpeta: {folder_name} creada con éxito")
 
         elif option == "20":
             if client.premium is False:
                 print("Opción no disponible")
             else:
                 print("\n==========Asignando Proyecto a Carpeta===========")
-                exist_project = False
-                exist_folder = False
                 project_name = input(
                     "Ingrese el nombre del proyecto a agregar a la carpeta: "
                 )
-
                 # Verificar si el proyecto existe
-                for project in client.projects:
-                    if project_name == project.get_name():
-                        exist_project = True
+                project = client.projects.get(project_name)
 
                 folder_name = input("Ingrese el nombre de la carpeta: ")
                 # Verificar si la carpeta existe
-                for folder in client.folders:
-                    if folder_name == folder.get_name():
-                        exist_folder = True
+                folder = client.folders.get(folder_name)
 
                 # Para evitar que se agregue el mismo proyecto a la carpeta
-                # pylint: disable=undefined-loop-variable
-                # That isn't a undefined loop variable because with its if statement it's defined as just one
-                if exist_project is True and exist_folder is True:
-                    for folder in client.folders:
-                        if folder_name == folder.get_name():
-                            if folder.get_project(project_name) is None:
-                                folder.add_project(project)
-                                print(
-                                    f"El proyecto {project_name} fue agregado a la carpeta {folder_name} con éxito."
-                                )
-                            else:
-                                print("El proyecto ya existe en la carpeta.")
-                                break
-
-                if exist_project is False:
+                if project is not None and folder is not None:
+                    if client.assign_project_to_folder(folder_name, project_name):
+                        print(
+                            f"El proyecto {project_name} fue agregado a la carpeta {folder_name} con éxito."
+                        )
+                    else:
+                        print("El proyecto ya existe en la carpeta.")
+
+                if project is None:
                     print(
                         f"\nEl proyecto {project_name} no existe, cree uno y luego podrá agregarlo a una carpeta."
                     )
 
-                if exist_folder is False:
+                if folder is None:
                     print(
                         f"\nLa carpeta {folder_name} no existe, cree una y luego podrá agregar proyectos."
                     )
 
-        # Impresión con ciclos anidados
         elif option == "21":
             if client.premium is False:
                 print("Opción no disponible")
             else:
                 print("\n==========Mostrando Carpetas===========")
-                for folder in client.folders:
-                    print("Carpeta: " + folder.get_name())
-                    for project in folder.projects:
-                        print("     Proyecto: " + project.get_name())
-                        for task in project.tasks:
-                            print("         Tarea: " + task.get_name())
-                            for subtask in task.subtasks:
-                                print("             Subtarea: " + subtask.get_name())
+                client.view_folders()
+
+        elif option == "25":
+            if client.premium is False:
+                print("Opción no disponible")
+            else:
+                print("\n==========Etiquetando Tareas===========")
+                tag = input("Ingrese la etiqueta: ")
+                names = input(
+                    "Ingrese los nombres de las tareas, separados por comas: "
+                )
+                names = [name.strip() for name in names.split(",") if name.strip()]
+                for name, tagged in zip(names, client.tag_tasks(tag, names)):
+                    if tagged is False:
+                        print("La tarea " + name + " no existe o ya tiene la etiqueta")
+                print(f"Tareas con la etiqueta {tag}: {client.count_tasks_by_tag(tag)}")
+
+        elif option == "26":
+            if client.premium is False:
+                print("Opción no disponible")
+            else:
+                print("\n==========Mostrando Tareas por Etiqueta===========")
+                for tag, (pending, total) in client.get_tag_counts().items():
+                    print(f"{tag}: {pending} pendientes de {total}")
+                client.view_tasks_by_tag(input("Ingrese la etiqueta: "))
+
+        elif option in ("22", "23"):
+            path = input("Ingrese la ruta del archivo (.ndjson o .csv): ")
+            csv_format = path.lower().endswith(".csv")
+            try:
+                if option == "22":
+                    print("\n==========Exportando Tareas===========")
+                    with open(path, "w", encoding="UTF-8", newline="") as file:
+                        if csv_format:
+                            transfer.export_csv(client, file)
+                        else:
+                            transfer.export_ndjson(client, file)
+                    print(f"Tareas exportadas a {path}")
+                else:
+                    print("\n==========Importando Tareas===========")
+                    with open(path, "r", encoding="UTF-8", newline="") as file:
+                        if csv_format:
+                            counts = transfer.import_csv(client, file)
+                        else:
+                            counts = transfer.import_ndjson(client, file)
+                    # La importación se guarda completa en un nuevo checkpoint
+                    client.snapshot()
+                    print(f"Registros importados: {counts}")
+            except (OSError, ValueError, KeyError, csv.Error) as error:
+                print(f"No fue posible procesar el archivo: {error}")
+
+        elif option == "24":
+            print("\n==========Buscando===========")
+            query = input("Ingrese las palabras a buscar: ")
+            results = client.search(query)
+            if not results:
+                print("No se encontraron resultados")
+            for result in results:
+                if result.parent is None:
+                    print(f"{result.kind}: {result.name}")
+                else:
+                    print(f"{result.kind}: {result.name} (en {result.parent})")
 
         elif option == "x":
             print("Saliendo de la aplicación...")
+            # Los pomodoros se detienen antes de guardar sus minutos
+            scheduler.shutdown()
+            # El cierre guarda el cliente en el repositorio que lee la API
+            client.close()
+            notifications.shutdown()
             print(
                 "Si desea enviar feedback, por favor envíe un correo a focustodo@udistrital.edu.co"
             )
@@ -393,4 +442,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # Con argumentos se ejecutan los comandos sin menú, e.g. en scripts
+    if len(sys.argv) > 1:
+        sys.exit(cli.run(sys.argv[1:]))
     main()
@@ -0,0 +1,146 @@
+"""
+This module contains the AnalyticsReport class, the premium productivity report
+computed with vectorized NumPy operations over the completion history.
+Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@udistrital.edu.co>
+"""
+
+# pylint: disable= import-error
+import datetime
+import numpy as np
+from project import report_factory
+
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
+def _longest_run(active):
+    """This function returns the length of the longest run of True values."""
+    if not active.any():
+        return 0
+    edges = np.diff(np.concatenate(([0], active.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return int((ends - starts).max())
+
+
+def _rolling_average(daily, window):
+    """This function returns the average of the last days of a daily series."""
+    if daily.size == 0:
+        return 0.0
+    return float(daily[-window:].sum() / window)
+
+
+# pylint: disable= too-many-locals
+def compute_analytics(tasks, pomodoro_minutes=None, today=None) -> dict:
+    """
+    This function computes the productivity metrics of a client.
+
+    The tasks are turned into NumPy arrays once, and every metric is a vectorized
+    operation over them, so years of history are processed in milliseconds.
+
+    Args:
+        tasks (iterable): The tasks of the client, done or not.
+        pomodoro_minutes (dict): The minutes of pomodoro per date.
+        today (date): The date the metrics are computed for, today by default.
+
+    Returns:
+        dict: The streaks, weekday distribution, rolling averages, per-tag
+        completion rates and pomodoro totals.
+    """
+    if today is None:
+        today = datetime.datetime.now().date()
+    tags = []
+    tag_status = []
+    status = []
+    done_days = []
+    for task in tasks:
+        # Una tarea cuenta en la tasa de cada una de sus etiquetas
+        for tag in task.get_tags():
+            tags.append(tag)
+            tag_status.append(task.status is True)
+        status.append(task.status is True)
+        if task.status is True and task.date_done is not None:
+            done_days.append(task.date_done.toordinal())
+    status = np.array(status, dtype=bool)
+    done_days = np.array(done_days, dtype=np.int64)
+    done_days = done_days[done_days <= today.toordinal()]
+
+    # Serie diaria desde la primera tarea realizada hasta hoy
+    if done_days.size:
+        first_day = int(done_days.min())
+        daily = np.bincount(
+            done_days - first_day, minlength=today.toordinal() - first_day + 1
+        )
+    else:
+        daily = np.zeros(0, dtype=np.int64)
+    active = daily > 0
+    inactive = np.flatnonzero(~active)
+    current_streak = int(daily.size - 1 - inactive[-1]) if inactive.size else daily.size
+
+    # date.toordinal() is 1 on Monday, January 1st of year 1
+    weekdays = np.bincount((done_days - 1) % 7, minlength=7)
+
+    rates = {}
+    if status.size:
+        tag_names, tag_index = np.unique(
+            np.array(tags, dtype=object), return_inverse=True
+        )
+        totals = np.bincount(tag_index, minlength=tag_names.size)
+        done = np.bincount(
+            tag_index,
+            weights=np.array(tag_status, dtype=bool),
+            minlength=tag_names.size,
+        )
+        rates = {str(tag): float(rate) for tag, rate in zip(tag_names, done / totals)}
+
+    minutes = np.fromiter((pomodoro_minutes or {}).values(), dtype=np.float64)
+    return {
+        "date": today.isoformat(),
+        "completed_tasks": int(done_days.size),
+        "current_streak": int(current_streak),
+        "longest_streak": _longest_run(active),
+        "weekday_distribution": dict(zip(WEEKDAYS, weekdays.tolist())),
+        "rolling_average_7": _rolling_average(daily, 7),
+        "rolling_average_30": _rolling_average(daily, 30),
+        "tag_completion_rates": rates,
+        "pomodoro_minutes": float(minutes.sum()),
+        "pomodoro_days": int(np.count_nonzero(minutes)),
+    }
+
+
+class AnalyticsReport(report_factory.Report):
+    """This class represents the advanced productivity report of premium clients."""
+
+    def __init__(self, report_type: str, tasks, pomodoro_minutes=None, today=None):
+        super().__init__(report_type)
+        self.__type = report_type
+        self.__summary = compute_analytics(tasks, pomodoro_minutes, today)
+
+    def get_summary(self) -> dict:
+        """This method returns the metrics of the report."""
+        return self.__summary
+
+    # pylint: disable= attribute-defined-outside-init
+    def create_report(self):
+        """This method creates the report of the productivity metrics of the user"""
+        summary = self.__summary
+        self.__title = f"{self.__type} Report"
+        self.__description = "This report shows your streaks, habits and focus time."
+        self.__date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        weekdays = ", ".join(
+            f"{day}: {count}" for day, count in summary["weekday_distribution"].items()
+        )
+        tags = ", ".join(
+            f"{tag}: {rate:.0%}"
+            for tag, rate in summary["tag_completion_rates"].items()
+        )
+        self.__content = f"""
+        Completed tasks: {summary["completed_tasks"]}\n
+        Current streak: {summary["current_streak"]} days\n
+        Longest streak: {summary["longest_streak"]} days\n
+        Completed tasks per weekday: {weekdays}\n
+        Average per day (last 7 days): {summary["rolling_average_7"]:.2f}\n
+        Average per day (last 30 days): {summary["rolling_average_30"]:.2f}\n
+        Completion rate per tag: {tags}\n
+        Pomodoro minutes: {summary["pomodoro_minutes"]:g}\n
+        """
+        return f"\n\n     Title: {self.__title}\n\n     Description: {self.__description}\n\n     Date: {self.__date}\n\n     Content: {self.__content}"
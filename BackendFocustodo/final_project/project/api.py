@@ -0,0 +1,478 @@
+"""
+This module contains the HTTP service of the application. It exposes the ClientABC
+operations as JSON endpoints, with one isolated client per authenticated user.
+It can be served with: uvicorn project.api:app
+The served app keeps the clients in FOCUSTODO_DATABASE_URL, the database of
+main.py by default, with at most FOCUSTODO_SESSIONS clients in memory, which are
+saved after FOCUSTODO_IDLE_SECONDS without requests.
+Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@udistrital.edu.co>
+"""
+
+# pylint: disable= import-error
+# pylint: disable= too-few-public-methods
+import contextlib
+import os
+from fastapi import Depends, FastAPI, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from pydantic import BaseModel
+from project import client as cliente
+from project import renderer
+from project import report_factory
+from project import sessions as session_manager
+from project import storage
+from project import subscription
+from project import user_auth
+
+
+class NameBody(BaseModel):
+    """This class represents a request body with the name of an item."""
+
+    name: str
+
+
+class NamesBody(BaseModel):
+    """This class represents a request body with the names of several items."""
+
+    names: list[str]
+
+
+class TagBody(BaseModel):
+    """This class represents a request body with the tag of a task."""
+
+    tag: str
+
+
+def _component_counters(component):
+    """This function returns the completion counters of a node of the tree."""
+    return {
+        "total_count": component.get_total_count(),
+        "done_count": component.get_done_count(),
+    }
+
+
+def task_to_json(task):
+    """This function returns the JSON representation of a task."""
+    return {
+        "name": task.get_name(),
+        "status": task.get_status(),
+        "tag": task.tag,
+        "tags": list(task.tags),
+        "date": task.date.isoformat(),
+        "date_done": task.date_done.isoformat() if task.date_done else None,
+        "subtasks": [
+            {"name": subtask.get_name(), "status": subtask.get_status()}
+            for subtask in task.subtasks
+        ],
+        **_component_counters(task),
+    }
+
+
+def project_to_json(project):
+    """This function returns the JSON representation of a project."""
+    return {
+        "name": project.get_name(),
+        "status": project.get_status(),
+        "tasks": project.tasks.names(),
+        **_component_counters(project),
+    }
+
+
+def folder_to_json(folder):
+    """This function returns the JSON representation of a folder."""
+    return {
+        "name": folder.get_name(),
+        "projects": folder.projects.names(),
+        **_component_counters(folder),
+    }
+
+
+class Sessions:
+    """
+    This class keeps the client and the subscription of every authenticated user.
+
+    Each user gets its own Client, so the data of one user is never visible to
+    another one. The clients are kept by a SessionManager, which can move the idle
+    ones to a Repository.
+    """
+
+    def __init__(
+        self,
+        manager: session_manager.SessionManager = None,
+        registry: subscription.SubscriptionRegistry = None,
+    ):
+        self.manager = (
+            manager if manager is not None else session_manager.SessionManager()
+        )
+        self.registry = (
+            registry if registry is not None else subscription.get_default_registry()
+        )
+        # Los clientes guardados se cuentan en el registro desde el inicio
+        if self.manager.repository is not None:
+            self.registry.register_all(self.manager.repository.iter_premium())
+        self.subscriptions = {}
+
+    def get_client(self, username: str) -> cliente.ClientABC:
+        """This method returns the client of the user, creating it if needed."""
+        client = self.manager.get(username)
+        self.registry.register(username, client.premium)
+        return client
+
+    def set_client(self, username: str, client: cliente.ClientABC):
+        """This method replaces the client of the user, e.g. after paying."""
+        self.manager.set(username, client)
+
+    def get_subscription(self, username: str) -> subscription.Subscription:
+        """This method returns the subscription of the user."""
+        subscription_instance = self.subscriptions.get(username)
+        if subscription_instance is None:
+            subscription_instance = subscription.Subscription(
+                username, self.registry, premium=self.registry.is_premium(username)
+            )
+            self.subscriptions[username] = subscription_instance
+        return subscription_instance
+
+
+def default_authenticate(username: str, password: str) -> bool:
+    """This function validates the credentials against the users file."""
+    return user_auth.Authentication(username, password).authenticate()
+
+
+# pylint: disable= too-many-locals
+# pylint: disable= too-many-statements
+# Every endpoint is a local function of the application factory
+def create_app(sessions: Sessions = None, authenticate=default_authenticate):
+    """
+    This function creates the FastAPI application.
+
+    Args:
+        sessions (Sessions): The clients of the users, a new one by default.
+        authenticate (callable): Validates a username and a password.
+
+    Returns:
+        FastAPI: The application.
+    """
+    sessions = sessions if sessions is not None else Sessions()
+
+    @contextlib.asynccontextmanager
+    async def lifespan(_):
+        yield
+        # Los clientes en memoria se guardan al detener el servicio
+        sessions.manager.save_all()
+
+    app = FastAPI(title="Focus To-Do", lifespan=lifespan)
+    app.state.sessions = sessions
+    security = HTTPBasic()
+
+    # Es síncrona para que FastAPI la ejecute en su threadpool: el hash de la
+    # contraseña tarda decenas de milisegundos y bloquearía el event loop
+    def current_user(
+        credentials: HTTPBasicCredentials = Depends(security),
+    ) -> str:
+        if not authenticate(credentials.username, credentials.password):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid username or password",
+                headers={"WWW-Authenticate": "Basic"},
+            )
+        return credentials.username
+
+    # También es síncrona: cargar y guardar clientes usa la base de datos
+    def current_client(username: str = Depends(current_user)):
+        sessions.manager.evict_idle()
+        return sessions.get_client(username)
+
+    async def premium_client(client=Depends(current_client)):
+        if client.premium is False:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="This option is only available for premium clients",
+            )
+        return client
+
+    def get_task(client, name):
+        task = client.tasks.get(name)
+        if task is None:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, f"Task {name} not found")
+        return task
+
+    def get_project(client, name):
+        project = client.projects.get(name)
+        if project is None:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, f"Project {name} not found")
+        return project
+
+    # Tasks
+    @app.get("/tasks")
+    async def view_tasks(client=Depends(current_client)):
+        return [task_to_json(task) for task in client.tasks]
+
+    @app.post("/tasks", status_code=status.HTTP_201_CREATED)
+    async def create_task(body: NameBody, client=Depends(current_client)):
+        if client.create_task(body.name) is False:
+            raise HTTPException(
+                status.HTTP_409_CONFLICT, f"Task {body.name} already exists"
+            )
+        return task_to_json(client.tasks.get(body.name))
+
+    @app.delete("/tasks/{name}", status_code=status.HTTP_204_NO_CONTENT)
+    async def delete_task(name: str, client=Depends(current_client)):
+        if client.delete_task(name) is False:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, f"Task {name} not found")
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+    @app.post("/tasks/{name}/done")
+    async def set_task_as_done(name: str, client=Depends(current_client)):
+        if client.set_task_as_done(name) is False:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, f"Task {name} not found")
+        return task_to_json(client.tasks.get(name))
+
+    @app.put("/tasks/{name}/tag")
+    async def set_tag(name: str, body: TagBody, client=Depends(premium_client)):
+        get_task(client, name)
+        client.set_tag(name, body.tag)
+        return task_to_json(client.tasks.get(name))
+
+    @app.post("/tasks/{name}/tags")
+    async def add_tag(name: str, body: TagBody, client=Depends(premium_client)):
+        get_task(client, name)
+        if client.add_tag(name, body.tag) is False:
+            raise HTTPException(
+                status.HTTP_409_CONFLICT, f"Task {name} can't get tag {body.tag}"
+            )
+        return task_to_json(client.tasks.get(name))
+
+    @app.delete("/tasks/{name}/tags/{tag}")
+    async def remove_tag(name: str, tag: str, client=Depends(premium_client)):
+        get_task(client, name)
+        if client.remove_tag(name, tag) is False:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, f"Tag {tag} not found")
+        return task_to_json(client.tasks.get(name))
+
+    # Tags
+    @app.get("/tags")
+    async def view_tags(client=Depends(premium_client)):
+        return {
+            tag: {"pending": pending, "total": total}
+            for tag, (pending, total) in client.get_tag_counts().items()
+        }
+
+    @app.get("/tags/{tag}/tasks")
+    async def view_tasks_by_tag(
+        tag: str, pending: bool = None, client=Depends(premium_client)
+    ):
+        return [
+            task_to_json(task) for task in client.get_tag_index().tasks(tag, pending)
+        ]
+
+    @app.post("/tags/{tag}/tasks")
+    async def tag_tasks(tag: str, body: NamesBody, client=Depends(premium_client)):
+        return dict(zip(body.names, client.tag_tasks(tag, body.names)))
+
+    # Subtasks
+    @app.post("/tasks/{name}/subtasks", status_code=status.HTTP_201_CREATED)
+    async def create_subtask(name: str, body: NameBody, client=Depends(current_client)):
+        task = get_task(client, name)
+        if client.add_subtask(name, body.name) is False:
+            raise HTTPException(
+                status.HTTP_409_CONFLICT, f"Subtask {body.name} already exists"
+            )
+        return task_to_json(task)
+
+    @app.delete(
+        "/tasks/{name}/subtasks/{subtask}", status_code=status.HTTP_204_NO_CONTENT
+    )
+    async def delete_subtask(name: str, subtask: str, client=Depends(current_client)):
+        get_task(client, name)
+        if client.remove_subtask(name, subtask) is False:
+            raise HTTPException(
+                status.HTTP_404_NOT_FOUND, f"Subtask {subtask} not found"
+            )
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+    @app.post("/tasks/{name}/subtasks/{subtask}/done")
+    async def set_subtask_as_done(
+        name: str, subtask: str, client=Depends(current_client)
+    ):
+        task = get_task(client, name)
+        subtarea = task.get_component(subtask)
+        if subtarea is None:
+            raise HTTPException(
+                status.HTTP_404_NOT_FOUND, f"Subtask {subtask} not found"
+            )
+        subtarea.set_as_done()
+        return task_to_json(task)
+
+    # Projects
+    @app.get("/projects")
+    async def view_projects(client=Depends(current_client)):
+        return [project_to_json(project) for project in client.projects]
+
+    @app.post("/projects", status_code=status.HTTP_201_CREATED)
+    async def create_project(body: NameBody, client=Depends(current_client)):
+        if client.create_project(body.name) is False:
+            raise HTTPException(
+                status.HTTP_409_CONFLICT, f"Project {body.name} already exists"
+            )
+        return project_to_json(client.projects.get(body.name))
+
+    @app.delete("/projects/{name}", status_code=status.HTTP_204_NO_CONTENT)
+    async def delete_project(name: str, client=Depends(current_client)):
+        if client.delete_project(name) is False:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, f"Project {name} not found")
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+    @app.post("/projects/{name}/done")
+    async def set_project_as_done(name: str, client=Depends(current_client)):
+        if client.set_project_as_done(name) is False:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, f"Project {name} not found")
+        return project_to_json(client.projects.get(name))
+
+    @app.post("/projects/{name}/tasks")
+    async def add_task_to_project(
+        name: str, body: NameBody, client=Depends(current_client)
+    ):
+        project = get_project(client, name)
+        if project.add_component(get_task(client, body.name)) is False:
+            raise HTTPException(
+                status.HTTP_409_CONFLICT, f"Task {body.name} is already in {name}"
+            )
+        return project_to_json(project)
+
+    # Folders
+    @app.get("/folders")
+    async def view_folders(client=Depends(premium_client)):
+        return [folder_to_json(folder) for folder in client.folders]
+
+    @app.post("/folders", status_code=status.HTTP_201_CREATED)
+    async def create_folder(body: NameBody, client=Depends(premium_client)):
+        if client.create_folder(body.name) is False:
+            raise HTTPException(
+                status.HTTP_409_CONFLICT, f"Folder {body.name} already exists"
+            )
+        return folder_to_json(client.folders.get(body.name))
+
+    @app.post("/folders/{name}/projects")
+    async def assign_project_to_folder(
+        name: str, body: NameBody, client=Depends(premium_client)
+    ):
+        folder = client.folders.get(name)
+        if folder is None:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, f"Folder {name} not found")
+        if folder.add_project(get_project(client, body.name)) is False:
+            raise HTTPException(
+                status.HTTP_409_CONFLICT, f"Project {body.name} is already in {name}"
+            )
+        return folder_to_json(folder)
+
+    # Text views, streamed in chunks while they are rendered. The body is an
+    # async generator, so Starlette iterates it in the event loop, where the async
+    # endpoints change the client, and no change happens in the middle of a chunk.
+    # The chunks end between top-level items, and the views walk a copy of them,
+    # so the client can change between chunks
+    def stream(lines):
+        async def chunks():
+            for chunk in renderer.iter_chunks(lines, whole_items=True):
+                yield chunk
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    @app.get("/views/tasks")
+    async def render_tasks(
+        offset: int = 0, limit: int = None, client=Depends(current_client)
+    ):
+        return stream(renderer.iter_tasks(list(client.tasks), offset, limit))
+
+    @app.get("/views/projects")
+    async def render_projects(
+        offset: int = 0, limit: int = None, client=Depends(current_client)
+    ):
+        return stream(renderer.iter_projects(list(client.projects), offset, limit))
+
+    @app.get("/views/folders")
+    async def render_folders(
+        offset: int = 0, limit: int = None, client=Depends(premium_client)
+    ):
+        return stream(renderer.iter_folders(list(client.folders), offset, limit))
+
+    # Search
+    @app.get("/search")
+    async def search(q: str, limit: int = 10, client=Depends(current_client)):
+        return [result._asdict() for result in client.search(q, limit)]
+
+    # Subscription and reports
+    @app.get("/plans")
+    async def view_plans(username: str = Depends(current_user)):
+        subscription_instance = sessions.get_subscription(username)
+        return [
+            {
+                "id_plan": plan.id_plan,
+                "name": plan.name,
+                "price": plan.price,
+                "description": plan.description,
+            }
+            for plan in subscription_instance.plans
+        ]
+
+    @app.post("/subscription")
+    async def pay_for_subscription(username: str = Depends(current_user)):
+        client = sessions.get_client(username)
+        if client.premium is True or (
+            client.pay_for_subscription(sessions.get_subscription(username)) is False
+        ):
+            raise HTTPException(status.HTTP_409_CONFLICT, "Already premium")
+        client = cliente.PremiumDecorator(client)
+        client.premium = True
+        sessions.set_client(username, client)
+        return {"premium": True}
+
+    @app.get("/reports/productivity")
+    async def view_productivity_stats(client=Depends(premium_client)):
+        return {"report": str(client.view_productivity_stats())}
+
+    @app.get("/reports/clients")
+    async def view_clients_report(username: str = Depends(current_user)):
+        # pylint: disable= unused-argument
+        factory = report_factory.ReportFactory()
+        return {"report": str(factory.create_report("Clients", sessions.registry))}
+
+    @app.get("/sessions/stats")
+    async def view_sessions_stats(username: str = Depends(current_user)):
+        # pylint: disable= unused-argument
+        return sessions.manager.stats()
+
+    return app
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The same database as main.py, which is run from the parent directory
+DATABASE_URL = "sqlite:///" + os.path.join(ROOT, "focustodo.db")
+SESSIONS = 1000
+IDLE_SECONDS = 15 * 60
+
+
+def create_default_app():
+    """
+    This function creates the served application, with the clients stored in the
+    repository and the limits of the environment variables.
+
+    Returns:
+        FastAPI: The application.
+    """
+    repository = storage.Repository(
+        os.environ.get("FOCUSTODO_DATABASE_URL", DATABASE_URL)
+    )
+    manager = session_manager.SessionManager(
+        repository,
+        capacity=int(os.environ.get("FOCUSTODO_SESSIONS", SESSIONS)),
+        idle_seconds=float(os.environ.get("FOCUSTODO_IDLE_SECONDS", IDLE_SECONDS)),
+    )
+    return create_app(Sessions(manager))
+
+
+def __getattr__(name):
+    # El app servido se crea al pedirlo, así importar el módulo no abre la base de datos
+    if name == "app":
+        globals()["app"] = create_default_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
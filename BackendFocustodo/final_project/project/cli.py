@@ -0,0 +1,456 @@
+"""
+This module contains the non-interactive command line of the application. It runs
+many client operations in one invocation, given as a subcommand or as a script of
+commands (one per line) read from a file or from the standard input, without any
+prompt. The output is buffered and the exit status is not zero if an operation
+fails.
+Usage:
+    python main.py --user alice create-task "Comprar pan" "Pagar arriendo"
+    python main.py --user alice --script onboarding.txt
+    cat migration.txt | python main.py --user alice --script -
+The password is read from the FOCUSTODO_PASSWORD environment variable.
+Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@udistrital.edu.co>
+"""
+
+# pylint: disable= import-error
+import argparse
+import csv
+import io
+import os
+import shlex
+import sys
+from project import lazy
+from project import renderer
+
+# The storage and the client are only loaded after the arguments are valid
+storage = lazy.lazy_import("project.storage")
+journal = lazy.lazy_import("project.journal")
+transfer = lazy.lazy_import("project.transfer")
+user_auth = lazy.lazy_import("project.user_auth")
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+PASSWORD_VARIABLE = "FOCUSTODO_PASSWORD"
+DEFAULT_DATABASE = "sqlite:///final_project/focustodo.db"
+DEFAULT_JOURNALS = os.path.join("final_project", "journal")
+
+
+class CommandError(Exception):
+    """This class represents a command that can't be parsed or run."""
+
+
+class _CommandParser(argparse.ArgumentParser):
+    """This class raises CommandError instead of exiting on invalid commands."""
+
+    def error(self, message):
+        raise CommandError(message)
+
+
+def default_authenticate(username: str, password: str) -> bool:
+    """This function validates the credentials against the users file."""
+    return user_auth.Authentication(username, password).authenticate()
+
+
+def _results(result, names):
+    """This function returns the names whose operation failed."""
+    if isinstance(result, list):
+        return [name for name, done in zip(names, result) if done is False]
+    return list(names) if result is False else []
+
+
+def _require_premium(client):
+    """This function fails if the client is not premium."""
+    if client.premium is not True:
+        raise CommandError("la opción requiere una suscripción premium")
+
+
+# Cada comando recibe el cliente, sus argumentos y la salida, y devuelve los
+# nombres de los elementos que fallaron
+# pylint: disable= unused-argument
+def _create_task(client, args, out):
+    return _results(client.create_tasks(args.names), args.names)
+
+
+def _delete_task(client, args, out):
+    return _results(client.delete_tasks(args.names), args.names)
+
+
+def _done(client, args, out):
+    return _results(client.set_tasks_as_done(args.names), args.names)
+
+
+def _create_project(client, args, out):
+    return _results(client.create_project(args.name), [args.name])
+
+
+def _delete_project(client, args, out):
+    return _results(client.delete_project(args.name), [args.name])
+
+
+def _done_project(client, args, out):
+    return _results(client.set_project_as_done(args.name), [args.name])
+
+
+def _add_subtask(client, args, out):
+    return _results(client.add_subtask(args.task, args.name), [args.name])
+
+
+def _remove_subtask(client, args, out):
+    return _results(client.remove_subtask(args.task, args.name), [args.name])
+
+
+def _done_subtask(client, args, out):
+    return _results(client.complete_subtask(args.task, args.name), [args.name])
+
+
+def _add_to_project(client, args, out):
+    result = client.add_tasks_to_project(args.project, args.tasks)
+    return _results(result, args.tasks)
+
+
+def _tasks(client, args, out):
+    client.view_tasks(args.offset, args.limit, out)
+    return []
+
+
+def _projects(client, args, out):
+    client.view_projects(args.offset, args.limit, out)
+    return []
+
+
+def _search(client, args, out):
+    lines = (
+        f"{result.kind}: {result.name}"
+        + ("" if result.parent is None else f" (en {result.parent})")
+        for result in client.search(" ".join(args.query), args.limit)
+    )
+    renderer.write_lines(lines, out)
+    return []
+
+
+def _create_folder(client, args, out):
+    _require_premium(client)
+    return _results(client.create_folder(args.name), [args.name])
+
+
+def _assign_folder(client, args, out):
+    _require_premium(client)
+    result = client.assign_projects_to_folder(args.folder, args.projects)
+    return _results(result, args.projects)
+
+
+def _folders(client, args, out):
+    _require_premium(client)
+    client.view_folders(args.offset, args.limit, out)
+    return []
+
+
+def _tag(client, args, out):
+    _require_premium(client)
+    return _results(client.tag_tasks(args.tag, args.tasks), args.tasks)
+
+
+def _untag(client, args, out):
+    _require_premium(client)
+    return _results(client.untag_tasks(args.tag, args.tasks), args.tasks)
+
+
+def _tagged(client, args, out):
+    _require_premium(client)
+    client.view_tasks_by_tag(args.tag, args.offset, args.limit, out)
+    return []
+
+
+def _export(client, args, out):
+    with open(args.path, "w", encoding="UTF-8", newline="") as file:
+        if args.path.lower().endswith(".csv"):
+            transfer.export_csv(client, file)
+        else:
+            transfer.export_ndjson(client, file)
+    return []
+
+
+def _import(client, args, out):
+    with open(args.path, "r", encoding="UTF-8", newline="") as file:
+        if args.path.lower().endswith(".csv"):
+            counts = transfer.import_csv(client, file)
+        else:
+            counts = transfer.import_ndjson(client, file)
+    # La importación se guarda completa en un nuevo checkpoint
+    client.snapshot()
+    out.write(f"Registros importados: {counts}\n")
+    return []
+
+
+# name: (handler, help, positional arguments, paged view)
+COMMANDS = {
+    "create-task": (_create_task, "Crea tareas", ("names+",), False),
+    "delete-task": (_delete_task, "Elimina tareas", ("names+",), False),
+    "done": (_done, "Marca tareas como realizadas", ("names+",), False),
+    "create-project": (_create_project, "Crea un proyecto", ("name",), False),
+    "delete-project": (_delete_project, "Elimina un proyecto", ("name",), False),
+    "done-project": (
+        _done_project,
+        "Marca un proyecto como realizado",
+        ("name",),
+        False,
+    ),
+    "add-subtask": (_add_subtask, "Crea una subtarea", ("task", "name"), False),
+    "remove-subtask": (
+        _remove_subtask,
+        "Elimina una subtarea",
+        ("task", "name"),
+        False,
+    ),
+    "done-subtask": (
+        _done_subtask,
+        "Marca una subtarea como realizada",
+        ("task", "name"),
+        False,
+    ),
+    "add-to-project": (
+        _add_to_project,
+        "Agrega tareas a un proyecto",
+        ("project", "tasks+"),
+        False,
+    ),
+    "tasks": (_tasks, "Muestra las tareas pendientes", (), True),
+    "projects": (_projects, "Muestra los proyectos pendientes", (), True),
+    "search": (_search, "Busca tareas, subtareas y proyectos", ("query+",), False),
+    "create-folder": (_create_folder, "Crea una carpeta (premium)", ("name",), False),
+    "assign-folder": (
+        _assign_folder,
+        "Asigna proyectos a una carpeta (premium)",
+        ("folder", "projects+"),
+        False,
+    ),
+    "folders": (_folders, "Muestra las carpetas (premium)", (), True),
+    "tag": (_tag, "Etiqueta tareas (premium)", ("tag", "tasks+"), False),
+    "untag": (_untag, "Quita una etiqueta (premium)", ("tag", "tasks+"), False),
+    "tagged": (_tagged, "Muestra las tareas de una etiqueta (premium)", ("tag",), True),
+    "export": (_export, "Exporta a .ndjson o .csv", ("path",), False),
+    "import": (_import, "Importa de .ndjson o .csv", ("path",), False),
+}
+
+
+def build_command_parser() -> argparse.ArgumentParser:
+    """This function returns the parser of one command, e.g. a line of a script."""
+    parser = _CommandParser(prog="focustodo", add_help=False)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, (handler, help_text, arguments, paged) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text, add_help=False)
+        for argument in arguments:
+            if argument.endswith("+"):
+                subparser.add_argument(argument[:-1], nargs="+")
+            else:
+                subparser.add_argument(argument)
+        if paged:
+            subparser.add_argument("--offset", type=int, default=0)
+            subparser.add_argument("--limit", type=int)
+        elif name == "search":
+            subparser.add_argument("--limit", type=int, default=10)
+        subparser.set_defaults(handler=handler)
+    return parser
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """This function returns the parser of the options of the command line."""
+    commands = "\n".join(
+        f"  {name:<16}{help_text}" for name, (_, help_text, _, _) in COMMANDS.items()
+    )
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Ejecuta operaciones de FocusToDo sin el menú interactivo.",
+        epilog="comandos:\n" + commands,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--user", required=True, help="El usuario")
+    parser.add_argument(
+        "--script",
+        help="Archivo con un comando por línea, o - para la entrada estándar",
+    )
+    parser.add_argument("--database", default=DEFAULT_DATABASE)
+    parser.add_argument("--journal", help="Carpeta del journal del usuario")
+    parser.add_argument(
+        "--stop-on-error",
+        action="store_true",
+        help="Se detiene en el primer comando que falle",
+    )
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="Un comando")
+    return parser
+
+
+def iter_script(file):
+    """
+    This function yields the commands of a script, skipping the blank lines and
+    the lines starting with #.
+
+    Yields:
+        tuple: The line number and the line of the command.
+    """
+    for number, line in enumerate(file, start=1):
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield number, line
+
+
+class BatchRunner:
+    """
+    This class runs commands on a client and counts the failures.
+
+    The output of the commands is kept in a buffer and written in big chunks,
+    and the errors go to their own stream, prefixed with the line of the command.
+
+    Methods:
+        run(command, number): Runs a command.
+        run_all(commands): Runs several commands.
+        flush(): Writes the buffered output.
+    """
+
+    # pylint: disable= too-many-arguments
+    def __init__(
+        self,
+        client,
+        stdout=None,
+        stderr=None,
+        stop_on_error: bool = False,
+        buffer_size: int = renderer.BUFFER_SIZE,
+    ):
+        self.client = client
+        self.stdout = stdout if stdout is not None else sys.stdout
+        self.stderr = stderr if stderr is not None else sys.stderr
+        self.stop_on_error = stop_on_error
+        self.buffer_size = buffer_size
+        self.parser = build_command_parser()
+        self.buffer = io.StringIO()
+        self.commands = 0
+        self.failures = 0
+
+    def run(self, command, number=None) -> bool:
+        """
+        This method runs a command.
+
+        Args:
+            command (list or str): The command and its arguments, or a line whose
+                words are split like in a shell, so names with spaces go in quotes.
+            number (int): The line of the command in the script, for the errors.
+
+        Returns:
+            bool: False if the command is invalid or an operation failed.
+        """
+        self.commands += 1
+        where = f"línea {number}: " if number is not None else ""
+        text = command if isinstance(command, str) else shlex.join(command)
+        try:
+            words = shlex.split(command) if isinstance(command, str) else command
+            args = self.parser.parse_args(words)
+            failed = args.handler(self.client, args, self.buffer)
+        except (CommandError, OSError, ValueError, KeyError, csv.Error) as error:
+            self.__fail(f"{where}{text}: {error}")
+            return False
+        if self.buffer.tell() >= self.buffer_size:
+            self.flush()
+        if failed:
+            self.__fail(f"{where}{args.command}: falló para {', '.join(failed)}")
+            return False
+        return True
+
+    def __fail(self, message):
+        """This method counts a failure and writes its message."""
+        self.failures += 1
+        self.stderr.write(message + "\n")
+
+    def run_all(self, commands) -> bool:
+        """
+        This method runs several commands.
+
+        Args:
+            commands (iterable): (line number, command) tuples, e.g. from
+                iter_script.
+
+        Returns:
+            bool: False if a command failed.
+        """
+        succeeded = True
+        for number, words in commands:
+            if not self.run(words, number):
+                succeeded = False
+                if self.stop_on_error:
+                    break
+        self.flush()
+        return succeeded
+
+    def flush(self):
+        """This method writes the buffered output."""
+        self.stdout.write(self.buffer.getvalue())
+        self.stdout.flush()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+
+
+# pylint: disable= too-many-arguments
+def run(
+    argv=None,
+    stdin=None,
+    stdout=None,
+    stderr=None,
+    environ=None,
+    authenticate=default_authenticate,
+) -> int:
+    """
+    This function runs the command line.
+
+    Args:
+        argv (list): The arguments, sys.argv[1:] by default.
+        stdin, stdout, stderr: The streams, the ones of the process by default.
+        environ (dict): The environment, where the password is read.
+        authenticate (callable): Validates the username and the password.
+
+    Returns:
+        int: EXIT_OK, EXIT_FAILED if a command failed, or EXIT_USAGE if the
+        arguments or the credentials are not valid.
+    """
+    stdin = stdin if stdin is not None else sys.stdin
+    stdout = stdout if stdout is not None else sys.stdout
+    stderr = stderr if stderr is not None else sys.stderr
+    environ = environ if environ is not None else os.environ
+    parser = build_parser()
+    try:
+        args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    except SystemExit as error:
+        return EXIT_OK if error.code == 0 else EXIT_USAGE
+    if bool(args.command) == bool(args.script):
+        stderr.write("Indique un comando o un --script, pero no ambos\n")
+        return EXIT_USAGE
+    try:
+        authenticated = authenticate(args.user, environ.get(PASSWORD_VARIABLE, ""))
+    except OSError as error:
+        stderr.write(f"No fue posible leer los usuarios: {error}\n")
+        return EXIT_USAGE
+    if not authenticated:
+        stderr.write(f"Usuario o contraseña incorrectos ({PASSWORD_VARIABLE})\n")
+        return EXIT_USAGE
+
+    journal_directory = args.journal or os.path.join(DEFAULT_JOURNALS, args.user)
+    repository = storage.Repository(args.database)
+    client = journal.open_client(repository, args.user, journal_directory)
+    runner = BatchRunner(client, stdout, stderr, args.stop_on_error)
+    try:
+        if args.script is None:
+            succeeded = runner.run_all([(None, args.command)])
+        elif args.script == "-":
+            succeeded = runner.run_all(iter_script(stdin))
+        else:
+            with open(args.script, "r", encoding="UTF-8") as file:
+                succeeded = runner.run_all(iter_script(file))
+    except (OSError, ValueError) as error:
+        stderr.write(f"No fue posible leer el script: {error}\n")
+        succeeded = False
+    finally:
+        client.close()
+    return EXIT_OK if succeeded else EXIT_FAILED
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -7,10 +7,20 @@ Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@u
 # pylint: disable = line-too-long
 # pylint: disable= import-error
 from abc import ABC, abstractmethod
+import datetime
+from project import completions
 from project import composite
-from project import pomodoro
-from project import report_factory
-from project import notification
+from project import lazy
+from project import registry
+from project import renderer
+
+# The pomodoro, the reports and the premium features load when they are first used
+pomodoro = lazy.lazy_import("project.pomodoro")
+report_factory = lazy.lazy_import("project.report_factory")
+notification = lazy.lazy_import("project.notification")
+search = lazy.lazy_import("project.search")
+etiquetas = lazy.lazy_import("project.tags")
+suscripcion = lazy.lazy_import("project.subscription")
 
 
 # Abstract class for the decorator pattern
@@ -24,7 +34,7 @@ class ClientABC(ABC):
         """This method creates a task."""
 
     @abstractmethod
-    def view_tasks(self):
+    def view_tasks(self, offset: int = 0, limit: int = None, file=None):
         """This method shows all the tasks."""
 
     @abstractmethod
@@ -44,12 +54,12 @@ class ClientABC(ABC):
         """This method deletes a project."""
 
     @abstractmethod
-    def view_projects(self):
+    def view_projects(self, offset: int = 0, limit: int = None, file=None):
         """This method shows all the projects."""
 
     # pylint: disable = redefined-outer-name
     @abstractmethod
-    def start_pomodoro(self, notification):
+    def start_pomodoro(self, notification, scheduler=None, on_pomodoro=None):
         """This method starts the pomodoro timer."""
 
     @abstractmethod
@@ -68,6 +78,42 @@ class ClientABC(ABC):
     def custom_pomodoro(self):
         """This method allows the user to set custom values for the pomodoro timer."""
 
+    @abstractmethod
+    def add_subtask(self, task_name: str, name: str):
+        """This method adds a new subtask to a task."""
+
+    @abstractmethod
+    def remove_subtask(self, task_name: str, name: str):
+        """This method removes a subtask from a task."""
+
+    @abstractmethod
+    def complete_subtask(self, task_name: str, name: str):
+        """This method sets a subtask of a task as done."""
+
+    @abstractmethod
+    def add_task_to_project(self, project_name: str, task_name: str):
+        """This method adds a task to a project."""
+
+    @abstractmethod
+    def create_tasks(self, names: list):
+        """This method creates several tasks."""
+
+    @abstractmethod
+    def delete_tasks(self, names: list):
+        """This method deletes several tasks."""
+
+    @abstractmethod
+    def set_tasks_as_done(self, names: list):
+        """This method sets several tasks as done."""
+
+    @abstractmethod
+    def add_tasks_to_project(self, project_name: str, task_names: list):
+        """This method adds several tasks to a project."""
+
+    @abstractmethod
+    def search(self, query: str, limit: int = 10):
+        """This method finds the items whose names or tags match a query."""
+
     @abstractmethod
     def view_plans(self, subscription):
         """This method shows all the plans."""
@@ -88,8 +134,9 @@ class Client(ClientABC):
     subtasks, projects, pomodoro timer, etc."""
 
     def __init__(self):
-        self.tasks = []
-        self.projects = []
+        # Tasks and projects are indexed by name to avoid linear scans
+        self.tasks = registry.NameRegistry()
+        self.projects = registry.NameRegistry()
         self.short_break = 5
         self.long_break = 15
         self.pomodoro_length = 25
@@ -98,33 +145,32 @@ class Client(ClientABC):
         self.premium = False
         self.user = None
         self.done_tasks = []
-        self.clients = []
+        # Histograma por día de las tareas realizadas, para las estadísticas
+        self.completions = completions.CompletionIndex()
+        # Minutos de pomodoro completados por día
+        self.pomodoro_minutes = {}
+        # El índice de búsqueda se crea en la primera búsqueda
+        self.search_index = None
 
     def create_task(self, name: str):
         """This method creates a task."""
-        for tarea in self.tasks:
-            if name == tarea.get_name():
-                return False
-        tarea = composite.Task(name)
-        self.tasks.append(tarea)
-        return True
+        if name in self.tasks:
+            return False
+        task = composite.Task(name)
+        if self.search_index is not None:
+            search.add_task(self.search_index, task)
+        return self.tasks.add(task)
 
-    def view_tasks(self):
-        """This method shows all the tasks."""
-        for tarea in self.tasks:
-            if tarea.status is False:
-                print("Tarea: " + tarea.get_name())
-                for subtarea in tarea.subtasks:
-                    if subtarea.status is False:
-                        print("     Subtarea: " + subtarea.get_name() + "\n")
+    def view_tasks(self, offset: int = 0, limit: int = None, file=None):
+        """This method shows the pending tasks, optionally a page of them."""
+        renderer.write_lines(renderer.iter_tasks(self.tasks, offset, limit), file)
 
     def delete_task(self, name: str):
         """This method deletes a task."""
-        for tarea in self.tasks:
-            if name == tarea.get_name():
-                self.tasks.remove(tarea)
-                return True
-        return False
+        task = self.tasks.remove(name)
+        if task is not None and self.search_index is not None:
+            search.remove_task(self.search_index, task)
+        return task is not None
 
     def create_subtask(self, name: str):
         """This method creates a subtask."""
@@ -133,74 +179,195 @@ class Client(ClientABC):
 
     def create_project(self, name: str):
         """This method creates a project."""
-        for project in self.projects:
-            if name == project.get_name():
-                return False
+        if name in self.projects:
+            return False
         project = composite.Project(name)
-        self.projects.append(project)
-        return True
+        if self.search_index is not None:
+            search.add_project(self.search_index, project)
+        return self.projects.add(project)
 
     def delete_project(self, name: str):
         """This method deletes a project."""
-        for project in self.projects:
-            if name == project.get_name():
-                self.projects.remove(project)
-                return True
-        return False
+        if self.projects.remove(name) is None:
+            return False
+        if self.search_index is not None:
+            search.remove_project(self.search_index, name)
+        return True
 
-    # pylint: disable=too-many-nested-blocks
-    # That nested blocks are necessary because of the structure of the tasks, subtasks and projects
-    def view_projects(self):
-        """This method shows all the projects."""
-        for project in self.projects:
-            if project.status is False:
-                print("Proyecto: " + project.get_name())
-                if len(project.tasks) > 0:
-                    for tarea in project.tasks:
-                        if tarea.status is False:
-                            print("     Tarea: " + tarea.get_name())
-                            for subtarea in tarea.subtasks:
-                                if subtarea.status is False:
-                                    print(
-                                        "         Subtarea: "
-                                        + subtarea.get_name()
-                                        + "\n"
-                                    )
+    def view_projects(self, offset: int = 0, limit: int = None, file=None):
+        """This method shows the pending projects, optionally a page of them."""
+        # Los contadores del proyecto se mantienen al marcar o agregar tareas
+        renderer.write_lines(renderer.iter_projects(self.projects, offset, limit), file)
 
     # pylint: disable = redefined-outer-name
-    def start_pomodoro(self, notification):
-        """This method starts the pomodoro timer."""
+    def start_pomodoro(self, notification, scheduler=None, on_pomodoro=None):
+        """
+        This method starts the pomodoro timer of the user of the notification in a
+        PomodoroScheduler, without waiting for it. Every completed pomodoro adds
+        its minutes to pomodoro_minutes.
+
+        Args:
+            notification (Notification): Receives the phase changes.
+            scheduler (PomodoroScheduler): The scheduler shared by the process by
+                default.
+            on_pomodoro (callable): Receives the minutes of every completed
+                pomodoro, add_pomodoro_minutes by default.
+
+        Returns:
+            PomodoroSession: The started session.
+        """
         pomodoro_timer = pomodoro.Pomodoro(
             self.short_break,
             self.long_break,
             self.pomodoro_length,
             self.long_break_after,
         )
-        pomodoro_timer.start_pomodoro(notification)
+        if scheduler is None:
+            scheduler = pomodoro.get_default_scheduler()
+        if on_pomodoro is None:
+            on_pomodoro = self.add_pomodoro_minutes
+        minutes = self.pomodoro_length
+        return pomodoro_timer.schedule(
+            scheduler,
+            notification.username,
+            notification,
+            on_pomodoro=lambda session: on_pomodoro(minutes),
+        )
+
+    def add_pomodoro_minutes(self, minutes: int):
+        """
+        This method adds the minutes of a completed pomodoro to today.
+
+        Returns:
+            int: The pomodoro minutes of today.
+        """
+        today = datetime.datetime.now().date()
+        self.pomodoro_minutes[today] = self.pomodoro_minutes.get(today, 0) + minutes
+        return self.pomodoro_minutes[today]
 
     def set_task_as_done(self, name: str):
         """This method sets a task as done."""
-        for task in self.tasks:
-            if name == task.get_name():
-                self.done_tasks.append(task)
-                task.set_as_done()
-                return True
-        return False
+        task = self.tasks.get(name)
+        if task is None:
+            return False
+        # Una tarea ya realizada no se cuenta dos veces
+        if task.get_status() is False:
+            task.set_as_done()
+            self.done_tasks.append(task)
+            self.completions.add(task.date_done)
+        return True
 
     def set_subtask_as_done(self, name: str):
-        """This method sets a subtask as done."""
-        for subtask in self.tasks:
-            if name == subtask.get_name():
-                subtask.set_as_done()
-                break
+        """This method sets a subtask as done, False if it doesn't exist."""
+        subtask = self.tasks.get(name)
+        if subtask is None:
+            return False
+        subtask.set_as_done()
+        return True
 
     def set_project_as_done(self, name: str):
         """This method sets a project as done."""
-        for project in self.projects:
-            if name == project.get_name():
-                project.set_as_done()
-                return True
-        return False
+        project = self.projects.get(name)
+        if project is None:
+            return False
+        project.set_as_done()
+        return True
+
+    def add_subtask(self, task_name: str, name: str):
+        """This method adds a new subtask to a task, False if it can't be added."""
+        task = self.tasks.get(task_name)
+        if task is None:
+            return False
+        subtask = self.create_subtask(name)
+        if task.add_component(subtask) is False:
+            return False
+        if self.search_index is not None:
+            search.add_subtask(self.search_index, task_name, subtask)
+        return True
+
+    def remove_subtask(self, task_name: str, name: str):
+        """This method removes a subtask from a task, False if it doesn't exist."""
+        task = self.tasks.get(task_name)
+        if task is None or task.remove_component(name) is False:
+            return False
+        if self.search_index is not None:
+            search.remove_subtask(self.search_index, task_name, name)
+        return True
+
+    def complete_subtask(self, task_name: str, name: str):
+        """This method sets a subtask of a task as done, False if it doesn't exist."""
+        task = self.tasks.get(task_name)
+        subtask = task.get_component(name) if task is not None else None
+        if subtask is None:
+            return False
+        subtask.set_as_done()
+        return True
+
+    def add_task_to_project(self, project_name: str, task_name: str):
+        """This method adds a task to a project, False if it can't be added."""
+        return self.add_tasks_to_project(project_name, [task_name])[0]
+
+    # Las operaciones por lotes devuelven un resultado por cada nombre recibido
+    def create_tasks(self, names: list):
+        """This method creates several tasks and returns a bool per name."""
+        tasks = [composite.Task(name) for name in names]
+        results = self.tasks.add_many(tasks)
+        if self.search_index is not None:
+            for task, added in zip(tasks, results):
+                if added:
+                    search.add_task(self.search_index, task)
+        return results
+
+    def delete_tasks(self, names: list):
+        """This method deletes several tasks and returns a bool per name."""
+        remove = self.tasks.remove
+        removed = [remove(name) for name in names]
+        if self.search_index is not None:
+            for task in removed:
+                if task is not None:
+                    search.remove_task(self.search_index, task)
+        return [task is not None for task in removed]
+
+    def set_tasks_as_done(self, names: list):
+        """This method sets several tasks as done and returns a bool per name."""
+        get = self.tasks.get
+        results = []
+        done = []
+        for name in names:
+            task = get(name)
+            results.append(task is not None)
+            if task is not None and task.get_status() is False:
+                task.set_as_done()
+                done.append(task)
+        self.done_tasks.extend(done)
+        dates = {}
+        for task in done:
+            dates[task.date_done] = dates.get(task.date_done, 0) + 1
+        for date_done, count in dates.items():
+            self.completions.add(date_done, count)
+        return results
+
+    def add_tasks_to_project(self, project_name: str, task_names: list):
+        """
+        This method adds several tasks to a project.
+
+        Args:
+            project_name (str): The name of the project.
+            task_names (list): The names of the tasks to be added.
+
+        Returns:
+            list: One bool per task, False if the task or the project do not
+            exist or the task is already in the project.
+        """
+        project = self.projects.get(project_name)
+        if project is None:
+            return [False] * len(task_names)
+        get = self.tasks.get
+        results = []
+        for name in task_names:
+            task = get(name)
+            results.append(task is not None and project.add_component(task))
+        return results
 
     def custom_pomodoro(self):
         """This method allows the user to set custom values for the pomodoro timer."""
@@ -229,13 +396,33 @@ class Client(ClientABC):
 
     def view_clients_report(self, type_report: str):
         """This method shows the clients report."""
+        # El registro lleva la cuenta de clientes y premium, no se recorren clientes
         factory = report_factory.ReportFactory()
-        print(factory.create_report("Clients", self.clients))
+        print(factory.create_report("Clients", suscripcion.get_default_registry()))
+
+    def search(self, query: str, limit: int = 10):
+        """
+        This method finds the tasks, subtasks and projects that match a query.
+
+        Args:
+            query (str): Words, or beginnings of words, of the names and tags.
+            limit (int): The maximum number of results.
 
-    def send_notification(self, message: str):
-        """This method sends a notification."""
-        noti = notification.Notification(message, self.user)
-        noti.show_notification()
+        Returns:
+            list: SearchResult objects, the best matches first.
+        """
+        if self.search_index is None:
+            self.search_index = search.build_index(self)
+        return self.search_index.search(query, limit)
+
+    def reindex(self):
+        """This method drops the search index, after changes made outside the client."""
+        self.search_index = None
+
+    def send_notification(self, message: str, dispatcher=None):
+        """This method sends a notification, through the dispatcher if given."""
+        noti = notification.Notification(self.user, dispatcher)
+        noti.show_notification(message)
 
 
 class PremiumDecorator(ClientABC):
@@ -246,19 +433,31 @@ class PremiumDecorator(ClientABC):
         self.premium = client.premium
         self.tasks = client.tasks
         self.done_tasks = client.done_tasks
-        self.folders = []
+        self.completions = client.completions
+        self.pomodoro_minutes = client.pomodoro_minutes
+        self.folders = registry.NameRegistry()
         self.projects = client.projects
+        # El índice de etiquetas se crea la primera vez que se consulta
+        self.tag_index = None
+        # El índice se vuelve a crear desde el decorador, con las carpetas
+        client.reindex()
 
     def create_task(self, name: str):
         """This method creates a task."""
-        return self.client.create_task(name)
+        created = self.client.create_task(name)
+        if created and self.tag_index is not None:
+            self.tag_index.add(self.tasks.get(name))
+        return created
 
-    def view_tasks(self):
+    def view_tasks(self, offset: int = 0, limit: int = None, file=None):
         """This method shows all the tasks."""
-        return self.client.view_tasks()
+        return self.client.view_tasks(offset, limit, file)
 
     def delete_task(self, name: str):
         """This method deletes a task."""
+        task = self.tasks.get(name)
+        if task is not None and self.tag_index is not None:
+            self.tag_index.remove(task)
         return self.client.delete_task(name)
 
     def create_subtask(self, name: str):
@@ -278,29 +477,91 @@ class PremiumDecorator(ClientABC):
         return self.client.create_project(name)
 
     def delete_project(self, name: str):
-        """This method deletes a project."""
-        return self.client.delete_project(name)
+        """This method deletes a project, also from the folders that have it."""
+        project = self.projects.get(name)
+        if self.client.delete_project(name) is False:
+            return False
+        for folder in self.folders:
+            if folder.get_project(name) is project:
+                folder.remove_project(name)
+        return True
 
-    def view_projects(self):
+    def view_projects(self, offset: int = 0, limit: int = None, file=None):
         """This method shows all the projects."""
-        return self.client.view_projects()
+        return self.client.view_projects(offset, limit, file)
 
     # pylint: disable = redefined-outer-name
-    def start_pomodoro(self, notification):
+    def start_pomodoro(self, notification, scheduler=None, on_pomodoro=None):
         """This method starts the pomodoro timer."""
-        return self.client.start_pomodoro(notification)
+        return self.client.start_pomodoro(notification, scheduler, on_pomodoro)
+
+    def add_pomodoro_minutes(self, minutes: int):
+        """This method adds the minutes of a completed pomodoro to today."""
+        return self.client.add_pomodoro_minutes(minutes)
 
     def set_task_as_done(self, name: str):
         """This method sets a task as done."""
-        return self.client.set_task_as_done(name)
+        result = self.client.set_task_as_done(name)
+        self._refresh_tags([self.tasks.get(name)])
+        return result
 
     def set_subtask_as_done(self, name: str):
         """This method sets a subtask as done."""
-        return self.client.set_subtask_as_done(name)
+        result = self.client.set_subtask_as_done(name)
+        self._refresh_tags([self.tasks.get(name)])
+        return result
 
     def set_project_as_done(self, name: str):
         """This method sets a project as done."""
-        return self.client.set_project_as_done(name)
+        result = self.client.set_project_as_done(name)
+        project = self.projects.get(name)
+        if project is not None:
+            self._refresh_tags(project.tasks)
+        return result
+
+    def add_subtask(self, task_name: str, name: str):
+        """This method adds a new subtask to a task."""
+        return self.client.add_subtask(task_name, name)
+
+    def remove_subtask(self, task_name: str, name: str):
+        """This method removes a subtask from a task."""
+        return self.client.remove_subtask(task_name, name)
+
+    def complete_subtask(self, task_name: str, name: str):
+        """This method sets a subtask of a task as done."""
+        return self.client.complete_subtask(task_name, name)
+
+    def add_task_to_project(self, project_name: str, task_name: str):
+        """This method adds a task to a project."""
+        return self.client.add_task_to_project(project_name, task_name)
+
+    def create_tasks(self, names: list):
+        """This method creates several tasks."""
+        results = self.client.create_tasks(names)
+        if self.tag_index is not None:
+            for name, created in zip(names, results):
+                if created:
+                    self.tag_index.add(self.tasks.get(name))
+        return results
+
+    def delete_tasks(self, names: list):
+        """This method deletes several tasks."""
+        if self.tag_index is not None:
+            for name in names:
+                task = self.tasks.get(name)
+                if task is not None:
+                    self.tag_index.remove(task)
+        return self.client.delete_tasks(names)
+
+    def set_tasks_as_done(self, names: list):
+        """This method sets several tasks as done."""
+        results = self.client.set_tasks_as_done(names)
+        self._refresh_tags(self.tasks.get(name) for name in names)
+        return results
+
+    def add_tasks_to_project(self, project_name: str, task_names: list):
+        """This method adds several tasks to a project."""
+        return self.client.add_tasks_to_project(project_name, task_names)
 
     def custom_pomodoro(self):
         """This method allows the user to set custom values for the pomodoro timer."""
@@ -311,26 +572,171 @@ class PremiumDecorator(ClientABC):
         return self.client.view_plans(subscription)
 
     def pay_for_subscription(self, subscription):
-        """This method allows the user to pay for a subscription."""
-        self.client.pay_for_subscription(subscription)
+        """This method returns False, the user is already premium."""
+        return False
 
     def view_clients_report(self, type_report: str):
         """This method shows the clients report."""
-        self.client.create_report(type_report)
+        return self.client.view_clients_report(type_report)
+
+    def search(self, query: str, limit: int = 10):
+        """This method finds the tasks, subtasks, projects and folders of a query."""
+        if self.client.search_index is None:
+            # El índice del cliente también incluye las carpetas
+            self.client.search_index = search.build_index(self)
+        return self.client.search(query, limit)
+
+    def reindex(self):
+        """This method drops the search and tag indexes, after changes made outside the client."""
+        self.tag_index = None
+        self.client.reindex()
 
     def view_productivity_stats(self):
         """This method shows the productivity stats."""
         factory = report_factory.ReportFactory()
-        return factory.create_report("Tasks", self.done_tasks)
+        return factory.create_report("Tasks", self.completions)
+
+    def view_analytics(self):
+        """This method shows the advanced productivity analytics."""
+        # Las tareas realizadas que se eliminaron también cuentan en la historia
+        tasks = list(self.tasks)
+        tasks.extend(task for task in self.done_tasks if task not in self.tasks)
+        factory = report_factory.ReportFactory()
+        return factory.create_report(
+            "Analytics", tasks, pomodoro_minutes=self.pomodoro_minutes
+        )
+
+    def view_folders(self, offset: int = 0, limit: int = None, file=None):
+        """This method shows the folders with their projects, tasks and subtasks."""
+        renderer.write_lines(renderer.iter_folders(self.folders, offset, limit), file)
 
     def create_folder(self, folder_name: str):
         """This method creates a folder."""
+        if folder_name in self.folders:
+            return False
         folder = composite.Folder(folder_name)
-        self.folders.append(folder)
+        if self.client.search_index is not None:
+            search.add_folder(self.client.search_index, folder)
+        return self.folders.add(folder)
+
+    def assign_project_to_folder(self, folder_name: str, project_name: str):
+        """This method assigns a project to a folder, False if it can't be added."""
+        return self.assign_projects_to_folder(folder_name, [project_name])[0]
+
+    def assign_projects_to_folder(self, folder_name: str, project_names: list):
+        """
+        This method assigns several projects to a folder.
+
+        Args:
+            folder_name (str): The name of the folder.
+            project_names (list): The names of the projects to be assigned.
+
+        Returns:
+            list: One bool per project, False if the project or the folder do not
+            exist or the project is already in the folder.
+        """
+        folder = self.folders.get(folder_name)
+        if folder is None:
+            return [False] * len(project_names)
+        get = self.projects.get
+        results = []
+        for name in project_names:
+            project = get(name)
+            results.append(project is not None and folder.add_project(project))
+        return results
+
+    def get_tag_index(self):
+        """This method returns the tag index, creating it the first time."""
+        if self.tag_index is None:
+            self.tag_index = etiquetas.TagIndex(self.tasks)
+        return self.tag_index
+
+    def _refresh_tags(self, tasks):
+        """This method moves the tasks that are now done out of the pending tasks."""
+        if self.tag_index is None:
+            return
+        for task in tasks:
+            if task is not None:
+                self.tag_index.refresh(task)
+
+    def _retag(self, task, change):
+        """
+        This method changes the tags of a task and updates the indexes.
+
+        Args:
+            task (Task): The task whose tags change.
+            change (callable): Changes the tags, returns False if nothing changed.
+
+        Returns:
+            bool: The result of change.
+        """
+        old_tags = task.get_tags()
+        changed = change()
+        self.get_tag_index().retag(task, old_tags)
+        if changed is not False and self.client.search_index is not None:
+            search.add_task(self.client.search_index, task)
+        return changed
 
     def set_tag(self, task_name: str, tag: str):
-        """This method sets a tag to a task."""
-        for task in self.client.tasks:
-            if task_name == task.get_name():
-                task.set_tag(tag)
-                break
+        """This method sets a tag to a task, replacing its other tags."""
+        task = self.client.tasks.get(task_name)
+        if task is None:
+            return False
+        self._retag(task, lambda: task.set_tag(tag))
+        return True
+
+    def add_tag(self, task_name: str, tag: str):
+        """This method adds a tag to a task, False if it can't be added."""
+        task = self.tasks.get(task_name)
+        if task is None:
+            return False
+        return self._retag(task, lambda: task.add_tag(tag))
+
+    def remove_tag(self, task_name: str, tag: str):
+        """This method removes a tag from a task, False if it doesn't have it."""
+        task = self.tasks.get(task_name)
+        if task is None:
+            return False
+        return self._retag(task, lambda: task.remove_tag(tag))
+
+    def tag_tasks(self, tag: str, task_names: list):
+        """This method adds a tag to several tasks and returns a bool per task."""
+        return [self.add_tag(name, tag) for name in task_names]
+
+    def untag_tasks(self, tag: str, task_names: list):
+        """This method removes a tag from several tasks and returns a bool per task."""
+        return [self.remove_tag(name, tag) for name in task_names]
+
+    def rename_tag(self, tag: str, new_tag: str):
+        """
+        This method replaces a tag by another one in all the tasks that have it.
+
+        Returns:
+            int: The number of tasks that were changed.
+        """
+        if new_tag == tag:
+            return 0
+        changed = 0
+        # Solo se recorren las tareas de la etiqueta, desde el índice
+        for task in self.get_tag_index().tasks(tag):
+            renamed = [new_tag if other == tag else other for other in task.get_tags()]
+            if self._retag(
+                task, lambda task=task, renamed=renamed: task.set_tags(renamed)
+            ):
+                changed += 1
+        return changed
+
+    def view_tasks_by_tag(
+        self, tag: str, offset: int = 0, limit: int = None, file=None
+    ):
+        """This method shows the pending tasks with a tag, optionally a page of them."""
+        tasks = self.get_tag_index().tasks(tag, pending=True)
+        renderer.write_lines(renderer.iter_tasks(tasks, offset, limit), file)
+
+    def count_tasks_by_tag(self, tag: str, pending: bool = None):
+        """This method returns the number of tasks with a tag, or its pending ones."""
+        return self.get_tag_index().count(tag, pending)
+
+    def get_tag_counts(self):
+        """This method returns the (pending, total) tasks of every tag."""
+        return self.get_tag_index().counts()
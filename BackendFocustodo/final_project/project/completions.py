@@ -0,0 +1,117 @@
+"""
+This module contains the CompletionIndex class, a per-day histogram of the tasks
+completed by a client, used to answer the productivity statistics.
+Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@udistrital.edu.co>
+"""
+
+import calendar
+import datetime
+
+
+class CompletionIndex:
+    """
+    This class counts the completed tasks per day.
+
+    It is updated when a task is set as done, so the counts of any range of days
+    are answered in O(days in range) instead of walking every completed task.
+
+    Methods:
+        add(date_done): Counts a task completed on that date.
+        remove(date_done): Discounts a task completed on that date.
+        count_on(day): Counts the tasks completed on a day.
+        count_between(start, end): Counts the tasks completed in a range of days.
+        count_today(): Counts the tasks completed today.
+        count_last_days(days): Counts the tasks completed in the last days.
+        count_month(year, month): Counts the tasks completed in a month.
+    """
+
+    def __init__(self, dates=None):
+        """
+        Initializes a new instance of the CompletionIndex class.
+
+        Args:
+            dates (iterable): Optional completion dates to be counted.
+        """
+        self.__days = {}
+        self.total = 0
+        for date_done in dates or ():
+            self.add(date_done)
+
+    def __len__(self):
+        return self.total
+
+    def add(self, date_done, count: int = 1):
+        """This method counts tasks completed on the given date."""
+        self.total += count
+        if date_done is not None:
+            self.__days[date_done] = self.__days.get(date_done, 0) + count
+
+    def remove(self, date_done, count: int = 1):
+        """This method discounts tasks completed on the given date."""
+        self.total -= count
+        if date_done is not None:
+            remaining = self.__days.get(date_done, 0) - count
+            if remaining > 0:
+                self.__days[date_done] = remaining
+            else:
+                self.__days.pop(date_done, None)
+
+    def count_on(self, day) -> int:
+        """This method returns the number of tasks completed on a day."""
+        return self.__days.get(day, 0)
+
+    def count_between(self, start, end) -> int:
+        """
+        This method returns the number of tasks completed between two dates.
+
+        Args:
+            start (date): The first day of the range.
+            end (date): The last day of the range, included.
+
+        Returns:
+            int: The number of tasks completed in the range.
+        """
+        days = (end - start).days + 1
+        if days <= 0:
+            return 0
+        # Si el histograma tiene menos días que el rango, se recorre el histograma
+        if len(self.__days) < days:
+            return sum(
+                count for day, count in self.__days.items() if start <= day <= end
+            )
+        return sum(
+            self.__days.get(start + datetime.timedelta(days=offset), 0)
+            for offset in range(days)
+        )
+
+    def count_today(self, today=None) -> int:
+        """This method returns the number of tasks completed today."""
+        if today is None:
+            today = datetime.datetime.now().date()
+        return self.count_on(today)
+
+    def count_last_days(self, days: int, today=None) -> int:
+        """
+        This method returns the number of tasks completed in the last days.
+
+        Args:
+            days (int): The number of days before today, e.g. 7 for the last week.
+            today (date): The last day of the range, today by default.
+
+        Returns:
+            int: The number of tasks completed from today - days to today.
+        """
+        if today is None:
+            today = datetime.datetime.now().date()
+        return self.count_between(today - datetime.timedelta(days=days), today)
+
+    def count_month(self, year: int, month: int) -> int:
+        """This method returns the number of tasks completed in a month."""
+        last_day = calendar.monthrange(year, month)[1]
+        return self.count_between(
+            datetime.date(year, month, 1), datetime.date(year, month, last_day)
+        )
+
+    def items(self):
+        """This method returns the (date, count) pairs sorted by date."""
+        return sorted(self.__days.items())
@@ -6,15 +6,197 @@ Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@u
 
 """
 
+# pylint: disable= import-error
 from abc import ABC, abstractmethod
+import contextlib
+import contextvars
 import datetime
+from project import registry
 
+# The tag of the tasks without tags
+DEFAULT_TAG = "General"
+# Separates the tags of a task when they are stored as one text
+TAG_SEPARATOR = ","
 
-class Component(ABC):
+# All the components created or done on the same day share one date object
+_today_cache = {"date": None}
+# The date pinned by pinned_today, only in the thread or task that pinned it
+_pinned_today = contextvars.ContextVar("pinned_today", default=None)
+
+
+def _today():
+    """This function returns today's date, reusing the same object all day."""
+    pinned = _pinned_today.get()
+    if pinned is not None:
+        return pinned
+    today = datetime.datetime.now().date()
+    if today != _today_cache["date"]:
+        _today_cache["date"] = today
+    return _today_cache["date"]
+
+
+def join_tags(tags):
+    """This function returns the tags as one text, e.g. to store them."""
+    return TAG_SEPARATOR.join(tags)
+
+
+def split_tags(text):
+    """This function returns the tags stored in a text by join_tags."""
+    if not text:
+        return ()
+    return tuple(tag.strip() for tag in text.split(TAG_SEPARATOR) if tag.strip())
+
+
+@contextlib.contextmanager
+def pinned_today(day):
+    """
+    This function makes the components use the given date as today, e.g. to
+    replay changes that were made on another day. Other threads and asyncio
+    tasks keep using the real date.
+
+    Parameters:
+    - day (date): The date used as today inside the with block.
+    """
+    token = _pinned_today.set(day)
+    try:
+        yield day
+    finally:
+        _pinned_today.reset(token)
+
+
+class CompletionCounters:
+    """
+    This class keeps the rolled-up completion counters of a node of the tree.
+
+    Every node knows the containers it belongs to (parents), so when a descendant
+    is added, removed or set as done the change is pushed up in O(depth) and the
+    progress of any node can be read in O(1).
+
+    The nodes use __slots__ instead of a per-instance __dict__. Only the nodes that
+    can have children store counters; leaves read the class defaults below, and
+    done_dates is not created until a descendant is done, so millions of subtasks
+    stay small in memory.
+
+    Attributes:
+        parents (tuple): The containers this node belongs to.
+        total_count (int): The number of descendants of this node.
+        done_count (int): The number of descendants that are done.
+        done_dates (dict): The number of done descendants per date_done, or None.
+        parent_tuple (tuple): The shared parents tuple of the children of this node.
+    """
+
+    __slots__ = ()
+    parents = ()
+    total_count = 0
+    done_count = 0
+    done_dates = None
+
+    def init_counters(self):
+        """
+        Initializes the counters of a node that can have children.
+        """
+        self.total_count = 0
+        self.done_count = 0
+        self.done_dates = None
+        # Children with only this container share this tuple as their parents
+        self.parent_tuple = (self,)
+
+    def update_counters(self, total, done, done_dates):
+        """
+        Adds the given deltas to the counters of this node and its containers.
+
+        Parameters:
+        - total (int): The change in the number of descendants.
+        - done (int): The change in the number of done descendants.
+        - done_dates (dict): The change in the number of done descendants per date.
+        """
+        self.total_count += total
+        self.done_count += done
+        if done_dates and self.done_dates is None:
+            self.done_dates = {}
+        for date_done, count in done_dates.items():
+            count += self.done_dates.get(date_done, 0)
+            if count == 0:
+                self.done_dates.pop(date_done, None)
+            else:
+                self.done_dates[date_done] = count
+        for parent in self.parents:
+            parent.update_counters(total, done, done_dates)
+
+    def attach_child(self, child):
+        """
+        Registers this node as a container of the child and adds its counters.
+
+        Parameters:
+        - child (Component): The child that was added to this node.
+        """
+        if child.parents:
+            child.parents = (*child.parents, self)
+        else:
+            child.parents = self.parent_tuple
+        self.update_counters(*child.subtree_counters())
+
+    def detach_child(self, child):
+        """
+        Unregisters this node as a container of the child and removes its counters.
+
+        Parameters:
+        - child (Component): The child that was removed from this node.
+        """
+        child.parents = tuple(parent for parent in child.parents if parent is not self)
+        if len(child.parents) == 1:
+            child.parents = child.parents[0].parent_tuple
+        total, done, done_dates = child.subtree_counters()
+        self.update_counters(
+            -total, -done, {date: -count for date, count in done_dates.items()}
+        )
+
+    def get_total_count(self):
+        """
+        Gets the number of descendants of this node.
+
+        Returns:
+        - int: The number of descendants.
+        """
+        return self.total_count
+
+    def get_done_count(self):
+        """
+        Gets the number of descendants of this node that are done.
+
+        Returns:
+        - int: The number of done descendants.
+        """
+        return self.done_count
+
+    def get_progress(self):
+        """
+        Gets the fraction of descendants that are done.
+
+        Returns:
+        - float: A value between 0 and 1, 0 if the node has no descendants.
+        """
+        if self.total_count == 0:
+            return 0.0
+        return self.done_count / self.total_count
+
+    def get_done_dates(self):
+        """
+        Gets the number of done descendants per date_done.
+
+        Returns:
+        - dict: A copy of the done dates histogram.
+        """
+        return dict(self.done_dates or {})
+
+
+class Component(CompletionCounters, ABC):
     """
     This class is used to create the components of the composite pattern.
     """
 
+    __slots__ = ("name", "status", "date", "date_done", "parents")
+
     def __init__(self, name):
         """
         Initializes a new instance of the Component class.
@@ -22,9 +204,10 @@ class Component(ABC):
         Parameters:
         - name (str): The name of the component.
         """
+        self.parents = ()
         self.name = name
         self.status = False
-        self.date = datetime.datetime.now().date()
+        self.date = _today()
         self.date_done = None
 
     @abstractmethod
@@ -42,7 +225,7 @@ class Component(ABC):
         Removes a component from the current component.
 
         Parameters:
-        - indice (int): The index of the component to be removed.
+        - indice (str): The name of the component to be removed.
         """
 
     @abstractmethod
@@ -81,33 +264,66 @@ class Component(ABC):
         """
         return self.status
 
+    def subtree_counters(self):
+        """
+        Gets the counters that this component adds to the nodes that contain it.
+
+        Returns:
+        - tuple: The number of nodes, the number of done nodes and the number of
+          done nodes per date, counting this component and its descendants.
+        """
+        done_dates = self.get_done_dates()
+        if self.status is True:
+            done_dates[self.date_done] = done_dates.get(self.date_done, 0) + 1
+        return 1 + self.total_count, int(self.status) + self.done_count, done_dates
+
+    def mark_as_done(self):
+        """
+        Sets the status and the date_done of this component, without its children.
+
+        Returns:
+        - bool: True if the status changed, False if it was already done.
+        """
+        if self.status is True:
+            return False
+        self.status = True
+        self.date_done = _today()
+        for parent in self.parents:
+            parent.update_counters(0, 1, {self.date_done: 1})
+        return True
+
 
 class Project(Component):
     """
     This class represents a project, which is a composite component.
     """
 
+    __slots__ = ("tasks", "total_count", "done_count", "done_dates", "parent_tuple")
+
     def __init__(self, name):
         super().__init__(name)
-        self.tasks = []
+        self.init_counters()
+        self.tasks = registry.NameRegistry()
 
     def add_component(self, componente_agregado):
-        self.tasks.append(componente_agregado)
+        if self.tasks.add(componente_agregado) is False:
+            return False
+        self.attach_child(componente_agregado)
+        return True
 
     def remove_component(self, indice):
-        return self.tasks.pop(indice)
+        tarea = self.tasks.remove(indice)
+        if tarea is not None:
+            self.detach_child(tarea)
+        return tarea
 
     def set_as_done(self):
-        self.status = True
+        self.mark_as_done()
         for tarea in self.tasks:
             tarea.set_as_done()
 
     def get_component(self, name):
-        tarea_encontrada = None
-        for tarea in self.tasks:
-            if name == tarea.get_name():
-                tarea_encontrada = tarea
-        return tarea_encontrada
+        return self.tasks.get(name)
 
 
 class Task(Component):
@@ -116,21 +332,46 @@ class Task(Component):
 
     Attributes:
         name (str): The name of the task.
-        subtasks (list): A list of subtasks that belong to this task.
-        tag (str): The tag associated with the task.
+        subtasks (NameRegistry): The subtasks that belong to this task, indexed by name.
+        tags (tuple): The tags of the task, in the order they were added.
+        tag (str): The first tag of the task, DEFAULT_TAG if it has none.
 
     Methods:
         add_component(componenteAgregado): Adds a subtask to the task.
         remove_component(subtask_name): Removes a subtask from the task.
         set_as_done(): Sets the task as done.
         set_tag(tag): Sets the tag for the task.
+        set_tags(tags): Replaces the tags of the task.
+        add_tag(tag): Adds a tag to the task.
+        remove_tag(tag): Removes a tag from the task.
+        get_tags(): Gets the tags of the task, or DEFAULT_TAG.
         get_component(name): Retrieves a subtask by its name.
     """
 
+    __slots__ = (
+        "subtasks",
+        "tags",
+        "total_count",
+        "done_count",
+        "done_dates",
+        "parent_tuple",
+    )
+
     def __init__(self, name):
         super().__init__(name)
-        self.subtasks = []
-        self.tag = "General"
+        self.init_counters()
+        self.subtasks = registry.NameRegistry()
+        # Las tareas sin etiquetas comparten la misma tupla vacía
+        self.tags = ()
+
+    @property
+    def tag(self):
+        """The first tag of the task, or DEFAULT_TAG if it has no tags."""
+        return self.tags[0] if self.tags else DEFAULT_TAG
+
+    @tag.setter
+    def tag(self, tag):
+        self.set_tag(tag)
 
     def add_component(self, componente_agregado):
         """
@@ -140,9 +381,12 @@ class Task(Component):
             componenteAgregado (Component): The subtask to be added.
 
         Returns:
-            None
+            bool: True if the subtask was added, False if its name already exists.
         """
-        self.subtasks.append(componente_agregado)
+        if self.subtasks.add(componente_agregado) is False:
+            return False
+        self.attach_child(componente_agregado)
+        return True
 
     def remove_component(self, indice):
         """
@@ -154,10 +398,11 @@ class Task(Component):
         Returns:
             bool: True if the subtask was successfully removed, False otherwise.
         """
-        for subtask in self.subtasks:
-            if indice == subtask.get_name():
-                return self.subtasks.remove(subtask)
-        return False
+        subtarea = self.subtasks.remove(indice)
+        if subtarea is None:
+            return False
+        self.detach_child(subtarea)
+        return True
 
     def set_as_done(self):
         """
@@ -169,14 +414,13 @@ class Task(Component):
         Returns:
             None
         """
-        self.status = True
-        self.date_done = datetime.datetime.now().date()
+        self.mark_as_done()
         for subtarea in self.subtasks:
             subtarea.set_as_done()
 
     def set_tag(self, tag):
         """
-        Sets the tag for the task.
+        Sets the tag for the task, replacing the other tags.
 
         Args:
             tag (str): The tag to be set for the task.
@@ -184,7 +428,65 @@ class Task(Component):
         Returns:
             None
         """
-        self.tag = tag
+        self.set_tags((tag,))
+
+    def set_tags(self, tags):
+        """
+        Replaces the tags of the task.
+
+        Args:
+            tags (iterable): The new tags. DEFAULT_TAG, empty tags and repeated
+            tags are skipped.
+
+        Returns:
+            bool: True if the tags of the task changed.
+        """
+        old_tags = self.tags
+        self.tags = ()
+        for tag in tags:
+            self.add_tag(tag)
+        return self.tags != old_tags
+
+    def add_tag(self, tag):
+        """
+        Adds a tag to the task.
+
+        Args:
+            tag (str): The tag to be added. It can't contain TAG_SEPARATOR.
+
+        Returns:
+            bool: True if the tag was added, False if the task already has it or
+            it is not a valid tag.
+        """
+        tag = tag.strip()
+        if not tag or TAG_SEPARATOR in tag or tag == DEFAULT_TAG or tag in self.tags:
+            return False
+        self.tags += (tag,)
+        return True
+
+    def remove_tag(self, tag):
+        """
+        Removes a tag from the task.
+
+        Args:
+            tag (str): The tag to be removed.
+
+        Returns:
+            bool: True if the tag was removed, False if the task doesn't have it.
+        """
+        if tag not in self.tags:
+            return False
+        self.tags = tuple(other for other in self.tags if other != tag)
+        return True
+
+    def get_tags(self):
+        """
+        Gets the tags of the task.
+
+        Returns:
+            tuple: The tags of the task, or only DEFAULT_TAG if it has none.
+        """
+        return self.tags or (DEFAULT_TAG,)
 
     def get_component(self, name):
         """
@@ -196,11 +498,7 @@ class Task(Component):
         Returns:
             Component: The subtask with the specified name, or None if not found.
         """
-        subtarea_encontrada = None
-        for subtarea in self.subtasks:
-            if name == subtarea.get_name():
-                subtarea_encontrada = subtarea
-        return subtarea_encontrada
+        return self.subtasks.get(name)
 
 
 class Subtask(Component):
@@ -219,6 +517,8 @@ class Subtask(Component):
         get_component(self, name): Retrieves a component from the subtask.
     """
 
+    __slots__ = ()
+
     # pylint: disable=useless-super-delegation
     # It is necessary to call the constructor of the parent class
     def __init__(self, name):
@@ -243,7 +543,7 @@ class Subtask(Component):
         Removes a component from the subtask (not applicable for leaf components).
 
         Args:
-            indice: The index of the component to be removed.
+            indice: The name of the component to be removed.
 
         Returns:
             None
@@ -254,7 +554,7 @@ class Subtask(Component):
         """
         Sets the subtask as done.
         """
-        self.status = True
+        self.mark_as_done()
 
     def get_component(self, name):
         """
@@ -269,21 +569,30 @@ class Subtask(Component):
         return None
 
 
-class Folder:
+class Folder(CompletionCounters):
     """
     This class represents a folder, which is used to organize projects.
 
     Attributes:
         name (str): The name of the folder.
-        projects (list): A list of projects that belong to this folder.
+        projects (NameRegistry): The projects that belong to this folder, indexed by name.
 
     Methods:
         add_project(componenteAgregado): Adds a project to the folder.
-        remove_project(indice): Removes a project from the folder.
+        remove_project(indice): Removes a project from the folder by its name.
         get_name(): Gets the name of the folder.
         get_project(name): Gets a project from the folder by its name.
     """
 
+    __slots__ = (
+        "name",
+        "projects",
+        "total_count",
+        "done_count",
+        "done_dates",
+        "parent_tuple",
+    )
+
     def __init__(self, name):
         """
         Initializes a new instance of the Folder class.
@@ -291,8 +600,9 @@ class Folder:
         Parameters:
         - name (str): The name of the folder.
         """
+        self.init_counters()
         self.name = name
-        self.projects = []
+        self.projects = registry.NameRegistry()
 
     def add_project(self, componente_agregado):
         """
@@ -300,20 +610,29 @@ class Folder:
 
         Parameters:
         - componenteAgregado (Project): The project to be added.
+
+        Returns:
+        - bool: True if the project was added, False if its name already exists.
         """
-        self.projects.append(componente_agregado)
+        if self.projects.add(componente_agregado) is False:
+            return False
+        self.attach_child(componente_agregado)
+        return True
 
     def remove_project(self, indice):
         """
         Removes a project from the folder.
 
         Parameters:
-        - indice (int): The index of the project to be removed.
+        - indice (str): The name of the project to be removed.
 
         Returns:
-        - Project: The removed project.
+        - Project: The removed project, or None if not found.
         """
-        return self.projects.pop(indice)
+        proyecto = self.projects.remove(indice)
+        if proyecto is not None:
+            self.detach_child(proyecto)
+        return proyecto
 
     def get_name(self):
         """
@@ -334,8 +653,4 @@ class Folder:
         Returns:
         - Project: The project with the specified name, or None if not found.
         """
-        proyecto_encontrado = None
-        for proyecto in self.projects:
-            if name == proyecto.get_name():
-                proyecto_encontrado = proyecto
-        return proyecto_encontrado
+        return self.projects.get(name)
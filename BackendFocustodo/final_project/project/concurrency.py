@@ -0,0 +1,354 @@
+"""
+This module contains the ReadWriteLock class and the ThreadSafeClient class, which
+lets several threads (e.g. the requests of a threaded server, or a pomodoro thread
+next to the menu) use the same client without corrupting its collections.
+Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@udistrital.edu.co>
+"""
+
+# pylint: disable= import-error
+import contextlib
+import threading
+from project import client as cliente
+
+# The locks are always taken in this order, so two threads can't wait on each other
+COLLECTIONS = ("tasks", "projects", "folders")
+TASKS = ("tasks",)
+PROJECTS = ("projects",)
+FOLDERS = ("folders",)
+# Marking or linking items updates the counters of the projects and folders above
+TREE = COLLECTIONS
+
+
+class ReadWriteLock:
+    """
+    This class is a lock that many readers or one writer can hold at a time.
+
+    Waiting writers go first: new readers wait until they are done, so a stream
+    of readers can't starve the writers. The lock is not reentrant.
+
+    Methods:
+        acquire_read(), release_read(): Hold and release the lock to read.
+        acquire_write(), release_write(): Hold and release the lock to write.
+        read(), write(): The same, as context managers.
+    """
+
+    __slots__ = ("_condition", "_readers", "_writing", "_waiting_writers")
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+
+    def acquire_read(self):
+        """This method waits until there are no writers and holds the lock to read."""
+        with self._condition:
+            while self._writing or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+
+    def release_read(self):
+        """This method releases the lock held to read."""
+        with self._condition:
+            self._readers -= 1
+            if self._readers == 0:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        """This method waits until nobody holds the lock and holds it to write."""
+        with self._condition:
+            self._waiting_writers += 1
+            try:
+                while self._writing or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writing = True
+
+    def release_write(self):
+        """This method releases the lock held to write."""
+        with self._condition:
+            self._writing = False
+            self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def read(self):
+        """This method holds the lock to read inside a with block."""
+        self.acquire_read()
+        try:
+            yield self
+        finally:
+            self.release_read()
+
+    @contextlib.contextmanager
+    def write(self):
+        """This method holds the lock to write inside a with block."""
+        self.acquire_write()
+        try:
+            yield self
+        finally:
+            self.release_write()
+
+
+# pylint: disable= too-many-public-methods
+class ThreadSafeClient(cliente.ClientABC):
+    """
+    This class makes every operation of a Client or PremiumDecorator hold the
+    locks of the collections it uses. Using the decorator pattern.
+
+    The tasks, projects and folders have one ReadWriteLock each, so views run at
+    the same time and only the operations that change a collection wait for each
+    other. The search and tag indexes are shared by all the collections, so they
+    have their own lock. The pomodoro runs without locks, so it never blocks the
+    other operations.
+
+    Attributes read directly, e.g. client.tasks, are not protected; a
+    JournaledClient only serializes its own changes, so it should be wrapped by it
+    and not the other way around.
+    """
+
+    def __init__(self, client):
+        """
+        Initializes a new instance of the ThreadSafeClient class.
+
+        Args:
+            client (ClientABC): The client to be protected.
+        """
+        self.client = client
+        self.locks = {name: ReadWriteLock() for name in COLLECTIONS}
+        self.index_lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    @contextlib.contextmanager
+    def locked(self, read=(), write=(), index=False):
+        """
+        This method holds the locks of some collections inside a with block.
+
+        Args:
+            read (tuple): The collections to be read.
+            write (tuple): The collections to be changed.
+            index (bool): If the search and tag indexes are used.
+        """
+        with contextlib.ExitStack() as stack:
+            for name in COLLECTIONS:
+                if name in write:
+                    stack.enter_context(self.locks[name].write())
+                elif name in read:
+                    stack.enter_context(self.locks[name].read())
+            if index:
+                stack.enter_context(self.index_lock)
+            yield
+
+    def upgrade_to_premium(self):
+        """This method wraps the client in a PremiumDecorator, if it isn't premium."""
+        with self.locked(write=COLLECTIONS, index=True):
+            if self.client.premium is True:
+                return
+            self.client = cliente.PremiumDecorator(self.client)
+            self.client.premium = True
+
+    # Tasks
+    def create_task(self, name: str):
+        """This method creates a task."""
+        with self.locked(write=TASKS, index=True):
+            return self.client.create_task(name)
+
+    def view_tasks(self, offset: int = 0, limit: int = None, file=None):
+        """This method shows the pending tasks."""
+        with self.locked(read=TASKS):
+            return self.client.view_tasks(offset, limit, file)
+
+    def delete_task(self, name: str):
+        """This method deletes a task."""
+        with self.locked(write=TASKS, index=True):
+            return self.client.delete_task(name)
+
+    def create_subtask(self, name: str):
+        """This method creates a subtask."""
+        return self.client.create_subtask(name)
+
+    def set_task_as_done(self, name: str):
+        """This method sets a task as done."""
+        # Las tareas realizadas salen de las pendientes del índice de etiquetas
+        with self.locked(write=TREE, index=True):
+            return self.client.set_task_as_done(name)
+
+    def set_subtask_as_done(self, name: str):
+        """This method sets a subtask as done."""
+        with self.locked(write=TREE, index=True):
+            return self.client.set_subtask_as_done(name)
+
+    def add_subtask(self, task_name: str, name: str):
+        """This method adds a new subtask to a task."""
+        with self.locked(write=TREE, index=True):
+            return self.client.add_subtask(task_name, name)
+
+    def remove_subtask(self, task_name: str, name: str):
+        """This method removes a subtask from a task."""
+        with self.locked(write=TREE, index=True):
+            return self.client.remove_subtask(task_name, name)
+
+    def complete_subtask(self, task_name: str, name: str):
+        """This method sets a subtask of a task as done."""
+        with self.locked(write=TREE):
+            return self.client.complete_subtask(task_name, name)
+
+    def create_tasks(self, names: list):
+        """This method creates several tasks."""
+        with self.locked(write=TASKS, index=True):
+            return self.client.create_tasks(names)
+
+    def delete_tasks(self, names: list):
+        """This method deletes several tasks."""
+        with self.locked(write=TASKS, index=True):
+            return self.client.delete_tasks(names)
+
+    def set_tasks_as_done(self, names: list):
+        """This method sets several tasks as done."""
+        with self.locked(write=TREE, index=True):
+            return self.client.set_tasks_as_done(names)
+
+    # Projects
+    def create_project(self, name: str):
+        """This method creates a project."""
+        with self.locked(write=PROJECTS, index=True):
+            return self.client.create_project(name)
+
+    def delete_project(self, name: str):
+        """This method deletes a project."""
+        with self.locked(write=PROJECTS, index=True):
+            return self.client.delete_project(name)
+
+    def view_projects(self, offset: int = 0, limit: int = None, file=None):
+        """This method shows the pending projects."""
+        with self.locked(read=TASKS + PROJECTS):
+            return self.client.view_projects(offset, limit, file)
+
+    def set_project_as_done(self, name: str):
+        """This method sets a project as done."""
+        with self.locked(write=TREE, index=True):
+            return self.client.set_project_as_done(name)
+
+    def add_task_to_project(self, project_name: str, task_name: str):
+        """This method adds a task to a project."""
+        with self.locked(write=TREE):
+            return self.client.add_task_to_project(project_name, task_name)
+
+    def add_tasks_to_project(self, project_name: str, task_names: list):
+        """This method adds several tasks to a project."""
+        with self.locked(write=TREE):
+            return self.client.add_tasks_to_project(project_name, task_names)
+
+    # Search
+    def search(self, query: str, limit: int = 10):
+        """This method finds the items whose names or tags match a query."""
+        with self.locked(read=COLLECTIONS, index=True):
+            return self.client.search(query, limit)
+
+    def reindex(self):
+        """This method drops the search and tag indexes."""
+        with self.locked(index=True):
+            return self.client.reindex()
+
+    # Pomodoro, settings and subscription
+    def start_pomodoro(self, notification, scheduler=None, on_pomodoro=None):
+        """This method starts the pomodoro timer, without holding any lock."""
+        return self.client.start_pomodoro(notification, scheduler, on_pomodoro)
+
+    def custom_pomodoro(self):
+        """This method allows the user to set custom values for the pomodoro timer."""
+        return self.client.custom_pomodoro()
+
+    def view_plans(self, subscription):
+        """This method shows all the plans."""
+        return self.client.view_plans(subscription)
+
+    def pay_for_subscription(self, subscription):
+        """This method allows the user to pay for a subscription."""
+        return self.client.pay_for_subscription(subscription)
+
+    def view_clients_report(self, type_report: str):
+        """This method shows the clients report."""
+        return self.client.view_clients_report(type_report)
+
+    # Premium
+    def view_productivity_stats(self):
+        """This method shows the productivity stats."""
+        with self.locked(read=TASKS):
+            return self.client.view_productivity_stats()
+
+    def view_analytics(self):
+        """This method shows the advanced productivity analytics."""
+        with self.locked(read=TASKS):
+            return self.client.view_analytics()
+
+    def view_folders(self, offset: int = 0, limit: int = None, file=None):
+        """This method shows the folders with their projects, tasks and subtasks."""
+        with self.locked(read=COLLECTIONS):
+            return self.client.view_folders(offset, limit, file)
+
+    def create_folder(self, folder_name: str):
+        """This method creates a folder."""
+        with self.locked(write=FOLDERS, index=True):
+            return self.client.create_folder(folder_name)
+
+    def assign_project_to_folder(self, folder_name: str, project_name: str):
+        """This method assigns a project to a folder."""
+        with self.locked(write=PROJECTS + FOLDERS):
+            return self.client.assign_project_to_folder(folder_name, project_name)
+
+    def assign_projects_to_folder(self, folder_name: str, project_names: list):
+        """This method assigns several projects to a folder."""
+        with self.locked(write=PROJECTS + FOLDERS):
+            return self.client.assign_projects_to_folder(folder_name, project_names)
+
+    def set_tag(self, task_name: str, tag: str):
+        """This method sets a tag to a task."""
+        with self.locked(write=TASKS, index=True):
+            return self.client.set_tag(task_name, tag)
+
+    def add_tag(self, task_name: str, tag: str):
+        """This method adds a tag to a task."""
+        with self.locked(write=TASKS, index=True):
+            return self.client.add_tag(task_name, tag)
+
+    def remove_tag(self, task_name: str, tag: str):
+        """This method removes a tag from a task."""
+        with self.locked(write=TASKS, index=True):
+            return self.client.remove_tag(task_name, tag)
+
+    def tag_tasks(self, tag: str, task_names: list):
+        """This method adds a tag to several tasks."""
+        with self.locked(write=TASKS, index=True):
+            return self.client.tag_tasks(tag, task_names)
+
+    def untag_tasks(self, tag: str, task_names: list):
+        """This method removes a tag from several tasks."""
+        with self.locked(write=TASKS, index=True):
+            return self.client.untag_tasks(tag, task_names)
+
+    def rename_tag(self, tag: str, new_tag: str):
+        """This method replaces a tag by another one in all its tasks."""
+        with self.locked(write=TASKS, index=True):
+            return self.client.rename_tag(tag, new_tag)
+
+    def view_tasks_by_tag(
+        self, tag: str, offset: int = 0, limit: int = None, file=None
+    ):
+        """This method shows the pending tasks with a tag."""
+        with self.locked(read=TASKS, index=True):
+            return self.client.view_tasks_by_tag(tag, offset, limit, file)
+
+    def count_tasks_by_tag(self, tag: str, pending: bool = None):
+        """This method returns the number of tasks with a tag."""
+        with self.locked(read=TASKS, index=True):
+            return self.client.count_tasks_by_tag(tag, pending)
+
+    def get_tag_counts(self):
+        """This method returns the (pending, total) tasks of every tag."""
+        with self.locked(read=TASKS, index=True):
+            return self.client.get_tag_counts()
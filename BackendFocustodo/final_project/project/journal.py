@@ -0,0 +1,631 @@
+"""
+This module contains the Journal and JournaledClient classes. Every change made to
+a client is appended to a journal file, and the whole state is compacted in a
+checkpoint from time to time, so a crash only loses the changes not yet written.
+The checkpoint is a snapshot file, or the Repository shared with the API when the
+client is opened with open_client.
+Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@udistrital.edu.co>
+"""
+
+# pylint: disable= import-error
+import datetime
+import json
+import os
+import threading
+import time
+from project import client as cliente
+from project import completions
+from project import composite
+from project import transfer
+
+FSYNC_POLICIES = ("always", "batch", "never")
+
+# Client methods that are replayed as they were called
+REPLAYED_OPERATIONS = frozenset(
+    {
+        "create_task",
+        "delete_task",
+        "create_project",
+        "delete_project",
+        "set_task_as_done",
+        "set_subtask_as_done",
+        "set_project_as_done",
+        "add_subtask",
+        "remove_subtask",
+        "complete_subtask",
+        "add_task_to_project",
+        "create_tasks",
+        "delete_tasks",
+        "set_tasks_as_done",
+        "add_tasks_to_project",
+        "create_folder",
+        "assign_project_to_folder",
+        "assign_projects_to_folder",
+        "set_tag",
+        "add_tag",
+        "remove_tag",
+        "tag_tasks",
+        "untag_tasks",
+        "rename_tag",
+    }
+)
+SETTINGS = ("short_break", "long_break", "pomodoro_length", "long_break_after")
+SNAPSHOT_FILE = "snapshot.ndjson"
+JOURNAL_FILE = "journal.ndjson"
+
+
+class Journal:
+    """
+    This class is an append-only file of events, one JSON object per line.
+
+    The events are kept in memory and written together, when batch_size events are
+    pending or flush_interval seconds passed since the first of them was appended,
+    even if no other event comes. The fsync policy
+    decides when the writes reach the disk: "always" writes and syncs every event,
+    "batch" syncs every write, and "never" leaves it to the operating system.
+    """
+
+    # pylint: disable= too-many-arguments
+    def __init__(
+        self,
+        path: str,
+        fsync: str = "batch",
+        batch_size: int = 64,
+        flush_interval: float = 1.0,
+        clock=time.monotonic,
+    ):
+        """
+        Initializes a new instance of the Journal class.
+
+        Args:
+            path (str): The path of the journal file.
+            fsync (str): One of FSYNC_POLICIES.
+            batch_size (int): The maximum number of events kept in memory.
+            flush_interval (float): The maximum seconds an event is kept in memory.
+            clock (callable): Returns the current time in seconds.
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(
+                f"Unknown fsync policy {fsync}, use one of {FSYNC_POLICIES}"
+            )
+        self.path = path
+        self.fsync = fsync
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.__clock = clock
+        self.__pending = []
+        self.__file = None
+        self.__last_flush = clock()
+        # The timer flushes the events of a process that stopped appending
+        self.__timer = None
+        self.__lock = threading.RLock()
+
+    def append(self, event: dict):
+        """This method adds an event to the journal."""
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self.__lock:
+            self.__pending.append(line)
+            if (
+                self.fsync == "always"
+                or len(self.__pending) >= self.batch_size
+                or self.__clock() - self.__last_flush >= self.flush_interval
+            ):
+                self.flush()
+            elif self.__timer is None:
+                self.__timer = threading.Timer(self.flush_interval, self.flush)
+                self.__timer.daemon = True
+                self.__timer.start()
+
+    def flush(self):
+        """This method writes the pending events to the file."""
+        with self.__lock:
+            if self.__timer is not None:
+                self.__timer.cancel()
+                self.__timer = None
+            self.__last_flush = self.__clock()
+            if not self.__pending:
+                return
+            if self.__file is None:
+                # pylint: disable= consider-using-with
+                self.__file = open(self.path, "a", encoding="UTF-8", newline="")
+            self.__file.write("".join(self.__pending))
+            self.__pending.clear()
+            self.__file.flush()
+            if self.fsync != "never":
+                os.fsync(self.__file.fileno())
+
+    def read(self):
+        """
+        This method yields the events stored in the file.
+
+        A last line that was cut by a crash is ignored, but a broken line in the
+        middle of the file raises a ValueError.
+
+        Yields:
+            dict: The events in the order they were appended.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="UTF-8") as file:
+            broken = None
+            for number, line in enumerate(file, 1):
+                if broken is not None:
+                    raise ValueError(f"Broken journal line {broken} in {self.path}")
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    broken = number
+
+    def truncate(self):
+        """This method writes the pending events and then empties the file."""
+        self.flush()
+        self.close()
+        with open(self.path, "w", encoding="UTF-8") as file:
+            file.flush()
+            if self.fsync != "never":
+                os.fsync(file.fileno())
+
+    def close(self):
+        """This method writes the pending events and closes the file."""
+        with self.__lock:
+            self.flush()
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = None
+
+
+def write_snapshot(client, path: str, seq: int):
+    """
+    This function writes the whole state of a client to a snapshot file.
+
+    The header has the settings, the pomodoro minutes and the completions, which
+    are stored as they are instead of being counted again from the tasks. The
+    snapshot is written to a temporary file that then replaces the previous
+    one, so a crash never leaves a half written snapshot.
+
+    Args:
+        client (ClientABC): A Client or a PremiumDecorator.
+        path (str): The path of the snapshot file.
+        seq (int): The last journal event included in the snapshot.
+    """
+    base = getattr(client, "client", client)
+    header = {
+        "type": "snapshot",
+        "seq": seq,
+        "premium": client.premium,
+        "settings": {name: getattr(base, name) for name in SETTINGS},
+        "pomodoro_minutes": {
+            day.isoformat(): minutes for day, minutes in base.pomodoro_minutes.items()
+        },
+        "completions": {
+            "total": base.completions.total,
+            "days": {day.isoformat(): count for day, count in base.completions.items()},
+        },
+    }
+    temporary = path + ".tmp"
+    with open(temporary, "w", encoding="UTF-8", newline="") as file:
+        file.write(json.dumps(header) + "\n")
+        file.writelines(transfer.iter_ndjson(client))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+class SnapshotFile:
+    """This class keeps the checkpoints of a journaled client in a snapshot file."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def exists(self) -> bool:
+        """This method returns if a checkpoint was already written."""
+        return os.path.exists(self.path)
+
+    def read(self):
+        """This method returns the stored client and its seq, or (None, 0)."""
+        return read_snapshot(self.path)
+
+    def write(self, client, seq: int):
+        """This method replaces the checkpoint with the state of the client."""
+        write_snapshot(client, self.path, seq)
+
+
+class RepositoryCheckpoint:
+    """
+    This class keeps the checkpoints of a journaled client in a Repository, the
+    store that the API also reads and writes. The seq of the last journal event is
+    saved with the client, so only the journal tail after it is replayed.
+    """
+
+    def __init__(self, repository, owner: str):
+        self.repository = repository
+        self.owner = owner
+
+    def exists(self) -> bool:
+        """This method returns if the owner is already stored."""
+        return self.repository.exists(self.owner)
+
+    def read(self):
+        """This method returns the stored client and its seq, or (None, 0)."""
+        client = self.repository.load_client(self.owner)
+        if client is None:
+            return None, 0
+        return client, self.repository.load_journal_seq(self.owner)
+
+    def write(self, client, seq: int):
+        """This method saves the client with the seq of its last journal event."""
+        self.repository.save_client(self.owner, client, journal_seq=seq)
+
+
+def read_snapshot(path: str):
+    """
+    This function builds a client from a snapshot file.
+
+    Returns:
+        tuple: The client and the seq of its last event, or (None, 0) if there is
+        no snapshot.
+    """
+    if not os.path.exists(path):
+        return None, 0
+    with open(path, "r", encoding="UTF-8") as file:
+        header = json.loads(file.readline())
+        client = cliente.Client()
+        for name, value in header["settings"].items():
+            setattr(client, name, value)
+        for day, minutes in header["pomodoro_minutes"].items():
+            client.pomodoro_minutes[datetime.date.fromisoformat(day)] = minutes
+        # Snapshots written before the completions were stored count the tasks
+        stored = header.get("completions")
+        if stored is not None:
+            client.completions = _read_completions(stored)
+        if header["premium"]:
+            client = cliente.PremiumDecorator(client)
+            client.premium = True
+        transfer.import_records(
+            client,
+            transfer.read_ndjson(file),
+            count_completions=stored is None,
+        )
+    return client, header["seq"]
+
+
+def _read_completions(stored: dict):
+    """This function builds a CompletionIndex from the header of a snapshot."""
+    index = completions.CompletionIndex()
+    for day, count in stored["days"].items():
+        index.add(datetime.date.fromisoformat(day), count)
+    # Las tareas sin fecha solo cuentan en el total
+    if stored["total"] > index.total:
+        index.add(None, stored["total"] - index.total)
+    return index
+
+
+def apply_event(client, event: dict):
+    """
+    This function replays an event of the journal on a client.
+
+    The components created or done by the event get the date of the event.
+
+    Returns:
+        ClientABC: The client, which is a new PremiumDecorator after a
+        "premium" event.
+    """
+    operation = event["op"]
+    args = event["args"]
+    base = getattr(client, "client", client)
+    with composite.pinned_today(datetime.date.fromisoformat(event["date"])):
+        if operation in REPLAYED_OPERATIONS:
+            getattr(client, operation)(*args)
+        elif operation == "premium":
+            client = cliente.PremiumDecorator(client)
+            client.premium = True
+        elif operation == "settings":
+            for name, value in zip(SETTINGS, args):
+                setattr(base, name, value)
+        elif operation == "pomodoro_minutes":
+            base.pomodoro_minutes[datetime.date.fromisoformat(args[0])] = args[1]
+        else:
+            raise ValueError(f"Unknown journal operation {operation}")
+    return client
+
+
+class JournaledClient(cliente.ClientABC):
+    """
+    This class records every change made to a client in a Journal. Using the
+    decorator pattern.
+
+    Startup loads the last checkpoint and replays the events written after it, and
+    every snapshot_every events the state is compacted in a new checkpoint and the
+    journal is emptied. Reading attributes like tasks or folders goes to the
+    wrapped client. The changes hold a lock, because the pomodoro minutes are
+    recorded from the thread of the PomodoroScheduler.
+    """
+
+    # pylint: disable= too-many-arguments
+    def __init__(
+        self,
+        client,
+        journal: Journal,
+        checkpoint,
+        seq: int = 0,
+        snapshot_every: int = 1000,
+    ):
+        """
+        Initializes a new instance of the JournaledClient class.
+
+        Args:
+            client (ClientABC): The Client or PremiumDecorator that is changed.
+            journal (Journal): The journal where the changes are appended.
+            checkpoint: The SnapshotFile or RepositoryCheckpoint of the state.
+            seq (int): The number of the last event already applied to the client.
+            snapshot_every (int): The number of events between two snapshots.
+        """
+        self.client = client
+        self.journal = journal
+        self.checkpoint = checkpoint
+        self.seq = seq
+        self.snapshot_every = snapshot_every
+        self.__changes = 0
+        self.__lock = threading.RLock()
+
+    @classmethod
+    def open(cls, directory: str, client=None, checkpoint=None, **options):
+        """
+        This method restores a journaled client from a directory.
+
+        Args:
+            directory (str): The folder with the journal.
+            client (ClientABC): The starting state when there is no checkpoint, a
+                new Client by default.
+            checkpoint: Where the state is compacted, by default a SnapshotFile in
+                the directory.
+            **options: fsync, batch_size and flush_interval for the Journal, and
+                snapshot_every.
+
+        Returns:
+            JournaledClient: The client with the checkpoint and the journal applied.
+        """
+        os.makedirs(directory, exist_ok=True)
+        if checkpoint is None:
+            checkpoint = SnapshotFile(os.path.join(directory, SNAPSHOT_FILE))
+        snapshot_every = options.pop("snapshot_every", 1000)
+        journal = Journal(os.path.join(directory, JOURNAL_FILE), **options)
+        restored, seq = checkpoint.read()
+        if restored is None:
+            restored = client if client is not None else cliente.Client()
+        # Los eventos anteriores al checkpoint ya están incluidos en él
+        for event in journal.read():
+            if event["seq"] > seq:
+                restored = apply_event(restored, event)
+                seq = event["seq"]
+        journaled = cls(restored, journal, checkpoint, seq, snapshot_every)
+        if not checkpoint.exists():
+            journaled.snapshot()
+        return journaled
+
+    def __getattr__(self, name):
+        if name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def record(self, operation: str, args: list):
+        """This method appends an event to the journal."""
+        with self.__lock:
+            self.seq += 1
+            self.journal.append(
+                {
+                    "seq": self.seq,
+                    "op": operation,
+                    "args": args,
+                    "date": datetime.datetime.now().date().isoformat(),
+                }
+            )
+            self.__changes += 1
+            if self.__changes >= self.snapshot_every:
+                self.snapshot()
+
+    def snapshot(self):
+        """This method compacts the state in a checkpoint and empties the journal."""
+        with self.__lock:
+            self.journal.flush()
+            self.checkpoint.write(self.client, self.seq)
+            self.journal.truncate()
+            self.__changes = 0
+
+    def close(self):
+        """This method writes a last checkpoint and closes the journal."""
+        with self.__lock:
+            self.snapshot()
+            self.journal.close()
+
+    def __call(self, operation: str, *args):
+        """This method calls the client and records the call if it changed it."""
+        with self.__lock:
+            result = getattr(self.client, operation)(*args)
+            # Solo True, o un número positivo de elementos, indica un cambio
+            if isinstance(result, list):
+                changed = any(item is True for item in result)
+            elif isinstance(result, bool):
+                changed = result
+            else:
+                changed = isinstance(result, int) and result > 0
+            if changed:
+                self.record(operation, list(args))
+        return result
+
+    def upgrade_to_premium(self):
+        """This method wraps the client in a PremiumDecorator, if it isn't premium."""
+        with self.__lock:
+            if self.client.premium is True:
+                return
+            self.client = cliente.PremiumDecorator(self.client)
+            self.client.premium = True
+            self.record("premium", [])
+
+    def create_task(self, name: str):
+        """This method creates a task."""
+        return self.__call("create_task", name)
+
+    def view_tasks(self, offset: int = 0, limit: int = None, file=None):
+        """This method shows all the tasks."""
+        return self.client.view_tasks(offset, limit, file)
+
+    def search(self, query: str, limit: int = 10):
+        """This method finds the items whose names or tags match a query."""
+        return self.client.search(query, limit)
+
+    def delete_task(self, name: str):
+        """This method deletes a task."""
+        return self.__call("delete_task", name)
+
+    def create_subtask(self, name: str):
+        """This method creates a subtask."""
+        return self.client.create_subtask(name)
+
+    def create_project(self, name: str):
+        """This method creates a project."""
+        return self.__call("create_project", name)
+
+    def delete_project(self, name: str):
+        """This method deletes a project."""
+        return self.__call("delete_project", name)
+
+    def view_projects(self, offset: int = 0, limit: int = None, file=None):
+        """This method shows all the projects."""
+        return self.client.view_projects(offset, limit, file)
+
+    # pylint: disable = redefined-outer-name
+    def start_pomodoro(self, notification, scheduler=None, on_pomodoro=None):
+        """This method starts the pomodoro timer, recording its completed minutes."""
+        if on_pomodoro is None:
+            on_pomodoro = self.add_pomodoro_minutes
+        return self.client.start_pomodoro(notification, scheduler, on_pomodoro)
+
+    def add_pomodoro_minutes(self, minutes: int):
+        """This method adds the minutes of a completed pomodoro to today."""
+        with self.__lock:
+            today = datetime.datetime.now().date()
+            total = self.client.add_pomodoro_minutes(minutes)
+            self.record("pomodoro_minutes", [today.isoformat(), total])
+        return total
+
+    def set_task_as_done(self, name: str):
+        """This method sets a task as done."""
+        return self.__call("set_task_as_done", name)
+
+    def set_subtask_as_done(self, name: str):
+        """This method sets a subtask as done."""
+        return self.__call("set_subtask_as_done", name)
+
+    def set_project_as_done(self, name: str):
+        """This method sets a project as done."""
+        return self.__call("set_project_as_done", name)
+
+    def custom_pomodoro(self):
+        """This method allows the user to set custom values for the pomodoro timer."""
+        result = self.client.custom_pomodoro()
+        base = getattr(self.client, "client", self.client)
+        self.record("settings", [getattr(base, name) for name in SETTINGS])
+        return result
+
+    def view_plans(self, subscription):
+        """This method shows all the plans."""
+        return self.client.view_plans(subscription)
+
+    def pay_for_subscription(self, subscription):
+        """This method allows the user to pay for a subscription."""
+        return self.client.pay_for_subscription(subscription)
+
+    def view_clients_report(self, type_report: str):
+        """This method shows the clients report."""
+        return self.client.view_clients_report(type_report)
+
+    def add_subtask(self, task_name: str, name: str):
+        """This method adds a new subtask to a task."""
+        return self.__call("add_subtask", task_name, name)
+
+    def remove_subtask(self, task_name: str, name: str):
+        """This method removes a subtask from a task."""
+        return self.__call("remove_subtask", task_name, name)
+
+    def complete_subtask(self, task_name: str, name: str):
+        """This method sets a subtask of a task as done."""
+        return self.__call("complete_subtask", task_name, name)
+
+    def add_task_to_project(self, project_name: str, task_name: str):
+        """This method adds a task to a project."""
+        return self.__call("add_task_to_project", project_name, task_name)
+
+    def create_tasks(self, names: list):
+        """This method creates several tasks."""
+        return self.__call("create_tasks", list(names))
+
+    def delete_tasks(self, names: list):
+        """This method deletes several tasks."""
+        return self.__call("delete_tasks", list(names))
+
+    def set_tasks_as_done(self, names: list):
+        """This method sets several tasks as done."""
+        return self.__call("set_tasks_as_done", list(names))
+
+    def add_tasks_to_project(self, project_name: str, task_names: list):
+        """This method adds several tasks to a project."""
+        return self.__call("add_tasks_to_project", project_name, list(task_names))
+
+    def create_folder(self, folder_name: str):
+        """This method creates a folder."""
+        return self.__call("create_folder", folder_name)
+
+    def assign_project_to_folder(self, folder_name: str, project_name: str):
+        """This method assigns a project to a folder."""
+        return self.__call("assign_project_to_folder", folder_name, project_name)
+
+    def assign_projects_to_folder(self, folder_name: str, project_names: list):
+        """This method assigns several projects to a folder."""
+        return self.__call(
+            "assign_projects_to_folder", folder_name, list(project_names)
+        )
+
+    def set_tag(self, task_name: str, tag: str):
+        """This method sets a tag to a task."""
+        return self.__call("set_tag", task_name, tag)
+
+    def add_tag(self, task_name: str, tag: str):
+        """This method adds a tag to a task."""
+        return self.__call("add_tag", task_name, tag)
+
+    def remove_tag(self, task_name: str, tag: str):
+        """This method removes a tag from a task."""
+        return self.__call("remove_tag", task_name, tag)
+
+    def tag_tasks(self, tag: str, task_names: list):
+        """This method adds a tag to several tasks."""
+        return self.__call("tag_tasks", tag, list(task_names))
+
+    def untag_tasks(self, tag: str, task_names: list):
+        """This method removes a tag from several tasks."""
+        return self.__call("untag_tasks", tag, list(task_names))
+
+    def rename_tag(self, tag: str, new_tag: str):
+        """This method replaces a tag by another one in all its tasks."""
+        return self.__call("rename_tag", tag, new_tag)
+
+
+def open_client(repository, owner: str, directory: str, **options):
+    """
+    This function opens the journaled client of a user, as the menu and the command
+    line do. The Repository is the only stored state: the client is loaded from it
+    and the journal tail after its last checkpoint is replayed, and close() saves
+    the client back in it.
+
+    Args:
+        repository (Repository): The store shared with the API.
+        owner (str): The username of the client.
+        directory (str): The folder with the journal of the user.
+        **options: The options of JournaledClient.open.
+
+    Returns:
+        JournaledClient: The client of the user.
+    """
+    checkpoint = RepositoryCheckpoint(repository, owner)
+    return JournaledClient.open(directory, checkpoint=checkpoint, **options)
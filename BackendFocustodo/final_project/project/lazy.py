@@ -0,0 +1,86 @@
+"""
+This module loads the modules of the application lazily: the module object is
+created at once, but its code only runs when one of its attributes is used. The
+CLI uses it so the reports, the pomodoro, the storage and the premium features
+don't slow down the startup when they are not used. Unlike importlib.LazyLoader
+before Python 3.12, the first use can happen in several threads at once.
+Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@udistrital.edu.co>
+"""
+
+import importlib.util
+import sys
+import threading
+import types
+
+
+class _LazyModule(types.ModuleType):
+    """
+    This class is a module whose code runs the first time one of its attributes
+    is used. The other threads that use it meanwhile wait until it is loaded.
+    """
+
+    def __getattribute__(self, attr):
+        spec = object.__getattribute__(self, "__spec__")
+        state = spec.loader_state
+        with state["lock"]:
+            if object.__getattribute__(self, "__class__") is _LazyModule:
+                # El mismo hilo lo usa mientras carga, e.g. el importador
+                if state["loading"]:
+                    return object.__getattribute__(self, attr)
+                state["loading"] = True
+                try:
+                    spec.loader.exec_module(self)
+                finally:
+                    state["loading"] = False
+                # Después de cargarlo ya no se pasa por este método ni por el lock
+                self.__class__ = types.ModuleType
+        return getattr(self, attr)
+
+
+def lazy_import(name: str):
+    """
+    This function returns a module that is loaded the first time it is used.
+
+    Later imports of the same module, e.g. from project import pomodoro, get the
+    same object, so the module is still loaded only once, even if several threads
+    use it for the first time at once.
+
+    Args:
+        name (str): The full name of the module, e.g. "project.pomodoro".
+
+    Returns:
+        module: The module, loaded or not yet.
+
+    Raises:
+        ModuleNotFoundError: If the module doesn't exist.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    spec.loader_state = {"lock": threading.RLock(), "loading": False}
+    module = importlib.util.module_from_spec(spec)
+    module.__class__ = _LazyModule
+    sys.modules[name] = module
+    # Como en un import normal, el módulo queda como atributo de su paquete
+    parent, _, child = name.rpartition(".")
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
+
+
+def is_loaded(name: str) -> bool:
+    """
+    This function checks if the code of a module already ran.
+
+    Returns:
+        bool: False if the module was not imported or it is still lazy.
+    """
+    module = sys.modules.get(name)
+    if module is None:
+        return False
+    # La clase del módulo cambia cuando se usa por primera vez, y type() no usa
+    # sus atributos, así que no lo carga
+    return type(module) is not _LazyModule
@@ -1,9 +1,15 @@
 """
-This module contains the Notification class, which is used to show 
-notifications to an specific user.
+This module contains the Notification class, which is used to show
+notifications to an specific user, and the NotificationDispatcher, which delivers
+them from a bounded queue with worker threads so the caller never waits.
 Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@udistrital.edu.co>
 """
 
+import json
+import queue
+import threading
+import time
+
 
 # pylint: disable= too-few-public-methods
 class Notification:
@@ -17,14 +23,17 @@ class Notification:
         show_notification(message: str): Displays the notification message in the console.
     """
 
-    def __init__(self, username):
+    def __init__(self, username, dispatcher=None):
         """
         Initializes a new instance of the Notification class.
 
         Args:
             username (str): The username associated with the notification.
+            dispatcher (NotificationDispatcher): Delivers the messages in the
+                background. Without it, the messages are printed right away.
         """
         self.username = username
+        self.dispatcher = dispatcher
 
     def show_notification(self, message: str):
         """
@@ -33,4 +42,237 @@ class Notification:
         Args:
             message (str): The message to be displayed in the notification.
         """
+        if self.dispatcher is not None:
+            self.dispatcher.submit(self.username, message)
+            return
         print(f"\nNotification to {self.username}: {message}")
+
+
+class ConsoleSink:
+    """This class prints the notifications, like Notification does."""
+
+    def send(self, username: str, message: str):
+        """This method prints a notification."""
+        print(f"\nNotification to {username}: {message}")
+
+
+class FileSink:
+    """This class appends the notifications to a text file, one per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.__lock = threading.Lock()
+
+    def send(self, username: str, message: str):
+        """This method appends a notification to the file."""
+        line = f"{time.strftime('%Y-%m-%d %H:%M:%S')} {username}: {message}\n"
+        with self.__lock:
+            with open(self.path, "a", encoding="UTF-8") as file:
+                file.write(line)
+
+
+class WebhookSink:
+    """
+    This class stands in for a webhook: every notification becomes a JSON payload
+    that is passed to post, or kept in the sent list when there is no post.
+    """
+
+    def __init__(self, post=None):
+        """
+        Initializes a new instance of the WebhookSink class.
+
+        Args:
+            post (callable): Receives the JSON body of every notification.
+        """
+        self.post = post
+        self.sent = []
+
+    def send(self, username: str, message: str):
+        """This method sends the JSON payload of a notification."""
+        body = json.dumps({"username": username, "message": message})
+        if self.post is not None:
+            self.post(body)
+        else:
+            self.sent.append(body)
+
+
+class _Pending:
+    """This class is a queued notification and the duplicates merged into it."""
+
+    __slots__ = ("username", "message", "count", "submitted")
+
+    def __init__(self, username, message, submitted):
+        self.username = username
+        self.message = message
+        self.count = 1
+        self.submitted = submitted
+
+
+# pylint: disable= too-many-instance-attributes
+class NotificationDispatcher:
+    """
+    This class delivers notifications to the sinks with worker threads.
+
+    submit() only puts the notification in a bounded queue, so pomodoro phase
+    changes and task events never wait for the console, a file or a webhook. A
+    notification equal to one that is still queued is merged into it and shown
+    once with the number of repetitions. When the queue is full the notification
+    is dropped, or submit() waits if block is True, and the stats show it. One
+    worker delivers in the order of submit(); with more workers a sink such as
+    the console may show the pomodoro phases out of order.
+
+    Methods:
+        start(): Starts the worker threads.
+        submit(username, message): Queues a notification.
+        join(): Waits until every queued notification was delivered.
+        shutdown(): Delivers the queued notifications and stops the workers.
+        stats(): Gets the counters of the queue.
+    """
+
+    # pylint: disable= too-many-arguments
+    def __init__(
+        self,
+        sinks=None,
+        maxsize: int = 1000,
+        workers: int = 1,
+        block: bool = False,
+        clock=time.monotonic,
+    ):
+        """
+        Initializes a new instance of the NotificationDispatcher class.
+
+        Args:
+            sinks (list): Objects with a send(username, message) method, the
+                console by default.
+            maxsize (int): The maximum number of queued notifications.
+            workers (int): The number of worker threads, only one keeps the order.
+            block (bool): If submit() waits for space instead of dropping.
+            clock (callable): Returns the current time in seconds.
+        """
+        self.sinks = list(sinks) if sinks is not None else [ConsoleSink()]
+        self.maxsize = maxsize
+        self.workers = workers
+        self.block = block
+        self.__clock = clock
+        self.__queue = queue.Queue(maxsize)
+        self.__pending = {}  # (username, message) -> _Pending
+        self.__lock = threading.Lock()
+        self.__threads = []
+        self.__stats = {
+            "submitted": 0,
+            "coalesced": 0,
+            "dropped": 0,
+            "delivered": 0,
+            "failed": 0,
+            "max_queue_size": 0,
+            "max_wait": 0.0,
+        }
+
+    def start(self):
+        """This method starts the worker threads, if they are not running."""
+        with self.__lock:
+            if self.__threads:
+                return self
+            for number in range(self.workers):
+                thread = threading.Thread(
+                    target=self.__work, name=f"notifications-{number}", daemon=True
+                )
+                thread.start()
+                self.__threads.append(thread)
+        return self
+
+    def submit(self, username: str, message: str) -> bool:
+        """
+        This method queues a notification without waiting for its delivery.
+
+        Returns:
+            bool: False if the queue was full and the notification was dropped.
+        """
+        key = (username, message)
+        with self.__lock:
+            self.__stats["submitted"] += 1
+            pending = self.__pending.get(key)
+            if pending is not None:
+                pending.count += 1
+                self.__stats["coalesced"] += 1
+                return True
+            pending = _Pending(username, message, self.__clock())
+            if not self.block:
+                # Se encola con el lock, así ningún duplicado se une a una
+                # notificación que después se descarta
+                try:
+                    self.__queue.put_nowait(pending)
+                except queue.Full:
+                    self.__stats["dropped"] += 1
+                    return False
+            self.__pending[key] = pending
+        if self.block:
+            # Sin timeout put() no falla, los duplicados unidos se entregan
+            self.__queue.put(pending)
+        with self.__lock:
+            size = self.__queue.qsize()
+            if size > self.__stats["max_queue_size"]:
+                self.__stats["max_queue_size"] = size
+        return True
+
+    def __work(self):
+        """This method delivers the queued notifications until shutdown."""
+        while True:
+            pending = self.__queue.get()
+            try:
+                if pending is None:
+                    return
+                self.__deliver(pending)
+            finally:
+                self.__queue.task_done()
+
+    def __deliver(self, pending):
+        """This method sends a notification to every sink."""
+        with self.__lock:
+            # Desde aquí los duplicados se encolan como una notificación nueva
+            del self.__pending[(pending.username, pending.message)]
+            count = pending.count
+            wait = self.__clock() - pending.submitted
+            if wait > self.__stats["max_wait"]:
+                self.__stats["max_wait"] = wait
+        message = pending.message
+        if count > 1:
+            message = f"{message} (x{count})"
+        for sink in self.sinks:
+            try:
+                sink.send(pending.username, message)
+            except Exception:  # pylint: disable= broad-exception-caught
+                # Un sink con errores no detiene a los demás
+                with self.__lock:
+                    self.__stats["failed"] += 1
+        with self.__lock:
+            self.__stats["delivered"] += 1
+
+    def join(self):
+        """This method waits until every queued notification was delivered."""
+        self.__queue.join()
+
+    def shutdown(self):
+        """This method delivers the queued notifications and stops the workers."""
+        with self.__lock:
+            threads = self.__threads
+            self.__threads = []
+        for _ in threads:
+            self.__queue.put(None)
+        for thread in threads:
+            thread.join()
+
+    def stats(self) -> dict:
+        """
+        This method returns the counters of the dispatcher.
+
+        Returns:
+            dict: The submitted, coalesced, dropped, delivered and failed
+            notifications, the current and the maximum queue size, and the
+            maximum seconds a notification waited in the queue.
+        """
+        with self.__lock:
+            stats = dict(self.__stats)
+        stats["queue_size"] = self.__queue.qsize()
+        stats["maxsize"] = self.maxsize
+        return stats
@@ -1,10 +1,23 @@
 """
-This module contains the Pomodoro class, which is used to create a Pomodoro timer.
+This module contains the Pomodoro class, which is used to create a Pomodoro timer,
+and the PomodoroScheduler, which runs many non-blocking pomodoro sessions at once.
+The clients start their sessions in the scheduler shared by the process.
 Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@udistrital.edu.co>
 """
 
+import heapq
+import itertools
+import logging
+import math
+import threading
 import time
 
+POMODORO = "pomodoro"
+SHORT_BREAK = "short_break"
+LONG_BREAK = "long_break"
+
+logger = logging.getLogger(__name__)
+
 
 class Pomodoro:
     """This class is used to create a Pomodoro timer."""
@@ -17,8 +30,25 @@ class Pomodoro:
         self._seconds = self._pomodoro_length
         self._notification = None
 
+    # pylint: disable= too-many-arguments
+    def schedule(
+        self, scheduler, session_id, notification, rounds=None, on_pomodoro=None
+    ):
+        """This method starts a non-blocking session with this timer's settings."""
+        return scheduler.start(
+            session_id,
+            notification,
+            self._pomodoro_length / 60,
+            self._short_break / 60,
+            self._long_break / 60,
+            self._long_break_after,
+            rounds,
+            on_pomodoro,
+        )
+
     def start_pomodoro(self, notification):
-        """This method starts the Pomodoro timer."""
+        """This method starts the Pomodoro timer.
+        It returns the number of pomodoros that were completed."""
         self._notification = notification
         pomodoro_count = 0
         while True:
@@ -63,15 +93,287 @@ class Pomodoro:
             else:
                 print("\nInvalid choice. Exiting.")
                 break
+        return pomodoro_count
 
     # pylint: disable= consider-using-f-string
     def countdown(self, duration):
-        """Countdown in minutes and seconds."""
-        # pylint: disable= attribute-defined-outside-init
-        self.seconds = duration
-        while self.seconds > -1:
+        """
+        Countdown in minutes and seconds. The remaining time is read from a deadline
+        of the monotonic clock, so it lasts duration seconds even if the sleeps
+        wake up late.
+        """
+        deadline = time.monotonic() + duration
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # pylint: disable= attribute-defined-outside-init
+            self.seconds = math.ceil(remaining)
             mins, secs = divmod(self.seconds, 60)
             timeformat = "{:02d}:{:02d}".format(mins, secs)
             print(timeformat, end="\r")
-            time.sleep(0.1)
-            self.seconds -= 1
+            # Se duerme hasta el siguiente segundo entero del deadline
+            time.sleep(remaining - self.seconds + 1)
+        self.seconds = 0
+        print("00:00", end="\r")
+
+
+# pylint: disable= too-many-instance-attributes
+class PomodoroSession:
+    """
+    This class represents the state of a pomodoro session of one user.
+
+    The current phase ends at a deadline of the monotonic clock, so the remaining
+    time is computed from it instead of counting ticks, and the next deadline is
+    set from the previous one so late wake-ups do not accumulate drift.
+    """
+
+    # pylint: disable= too-many-arguments
+    def __init__(
+        self,
+        session_id,
+        notification,
+        lengths,
+        long_break_after,
+        rounds,
+        on_pomodoro=None,
+    ):
+        """
+        Initializes a new instance of the PomodoroSession class.
+
+        Args:
+            session_id: The identifier of the session, e.g. the username.
+            notification (Notification): Receives the phase changes.
+            lengths (dict): The length in seconds of every phase.
+            long_break_after (int): The number of pomodoros before a long break.
+            rounds (int): The number of pomodoros to run, None to run until stopped.
+            on_pomodoro (callable): Receives the session every time a pomodoro is
+                completed, e.g. to record its minutes.
+        """
+        self.session_id = session_id
+        self.notification = notification
+        self._lengths = lengths
+        self._long_break_after = long_break_after
+        self.rounds = rounds
+        self.on_pomodoro = on_pomodoro
+        self.phase = POMODORO
+        self.pomodoro_count = 0
+        self.deadline = None
+        self.active = True
+
+    def begin(self, now):
+        """This method starts the first pomodoro at the given time."""
+        self.deadline = now + self._lengths[POMODORO]
+
+    def remaining(self, now):
+        """This method returns the seconds left in the current phase."""
+        return max(0.0, self.deadline - now)
+
+    def advance(self):
+        """
+        This method moves the session to the next phase.
+
+        Returns:
+            str: The message for the phase change.
+        """
+        if self.phase == POMODORO:
+            self.pomodoro_count += 1
+            if self.rounds is not None and self.pomodoro_count >= self.rounds:
+                self.active = False
+                return "Time's up!"
+            if self.pomodoro_count % self._long_break_after == 0:
+                self.phase = LONG_BREAK
+                message = "Time's up! It's time for a long break of {} minutes."
+            else:
+                self.phase = SHORT_BREAK
+                message = "Time's up! It's time for a short break of {} minutes."
+        else:
+            self.phase = POMODORO
+            message = "Break is over. Pomodoro timer started for {} minutes."
+        self.deadline += self._lengths[self.phase]
+        return message.format(f"{self._lengths[self.phase] / 60:g}")
+
+
+class PomodoroScheduler:
+    """
+    This class runs the pomodoro sessions of many users in one process.
+
+    The sessions are kept in a heap ordered by deadline, so only the sessions whose
+    phase ended are touched. The scheduler can be driven with run_pending() or run
+    in a background thread with start_thread() and shutdown().
+
+    Methods:
+        start(...): Starts a session and returns it.
+        stop(session_id): Stops a session.
+        remaining(session_id): Returns the seconds left in the current phase.
+        run_pending(now): Fires the phase changes whose deadline passed.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        """
+        Initializes a new instance of the PomodoroScheduler class.
+
+        Args:
+            clock (callable): Returns the current time in seconds.
+        """
+        self._clock = clock
+        self._heap = []
+        self._sessions = {}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def __len__(self):
+        return len(self._sessions)
+
+    # pylint: disable= too-many-arguments
+    def start(
+        self,
+        session_id,
+        notification,
+        pomodoro_length=25,
+        short_break=5,
+        long_break=15,
+        long_break_after=4,
+        rounds=None,
+        on_pomodoro=None,
+    ):
+        """
+        This method starts a session, replacing any session with the same id.
+
+        The lengths are given in minutes, like in the Pomodoro class, and
+        on_pomodoro receives the session after every completed pomodoro.
+
+        Returns:
+            PomodoroSession: The started session.
+        """
+        lengths = {
+            POMODORO: pomodoro_length * 60,
+            SHORT_BREAK: short_break * 60,
+            LONG_BREAK: long_break * 60,
+        }
+        session = PomodoroSession(
+            session_id, notification, lengths, long_break_after, rounds, on_pomodoro
+        )
+        with self._condition:
+            self.stop(session_id)
+            session.begin(self._clock())
+            self._sessions[session_id] = session
+            self._push(session)
+        return session
+
+    def _push(self, session):
+        heapq.heappush(self._heap, (session.deadline, next(self._counter), session))
+        self._condition.notify()
+
+    def stop(self, session_id):
+        """
+        This method stops a session. Its heap entry is discarded when it is popped.
+
+        Returns:
+            bool: True if the session was running, False otherwise.
+        """
+        with self._condition:
+            session = self._sessions.pop(session_id, None)
+            if session is None:
+                return False
+            session.active = False
+            return True
+
+    def get_session(self, session_id):
+        """This method returns the running session with the given id, or None."""
+        return self._sessions.get(session_id)
+
+    def remaining(self, session_id):
+        """This method returns the seconds left in the current phase, or None."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        return session.remaining(self._clock())
+
+    def next_deadline(self):
+        """This method returns the earliest deadline, or None if there is none."""
+        with self._condition:
+            return self._heap[0][0] if self._heap else None
+
+    def run_pending(self, now=None):
+        """
+        This method fires every phase change whose deadline already passed.
+
+        Args:
+            now (float): The current time, read from the clock by default.
+
+        Returns:
+            int: The number of notifications that were fired.
+        """
+        now = self._clock() if now is None else now
+        fired = []
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, _, session = heapq.heappop(self._heap)
+                if session.active is False or deadline != session.deadline:
+                    continue
+                completed = session.phase == POMODORO
+                fired.append((session, session.advance(), completed))
+                if session.active:
+                    self._push(session)
+                else:
+                    self._sessions.pop(session.session_id, None)
+        # Las notificaciones se envían fuera del lock para no bloquear el scheduler
+        for session, message, completed in fired:
+            if completed and session.on_pomodoro is not None:
+                try:
+                    session.on_pomodoro(session)
+                except Exception:  # pylint: disable= broad-exception-caught
+                    logger.exception(
+                        "No fue posible registrar el pomodoro de %s", session.session_id
+                    )
+            try:
+                session.notification.show_notification(message)
+            except Exception:  # pylint: disable= broad-exception-caught
+                # Una notificación con errores no detiene las demás sesiones
+                logger.exception(
+                    "No fue posible notificar la sesión %s", session.session_id
+                )
+        return len(fired)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if self._stopped:
+                    return
+                deadline = self._heap[0][0] if self._heap else None
+                timeout = None if deadline is None else deadline - self._clock()
+                if timeout is None or timeout > 0:
+                    self._condition.wait(timeout)
+                if self._stopped:
+                    return
+            self.run_pending()
+
+    def start_thread(self):
+        """This method runs the scheduler in a background daemon thread."""
+        if self._thread is None:
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def shutdown(self):
+        """This method stops the background thread."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+_default_scheduler = PomodoroScheduler()
+
+
+def get_default_scheduler() -> PomodoroScheduler:
+    """
+    This function returns the scheduler shared by the process. Its thread is
+    started once, e.g. by the menu at startup, with start_thread().
+    """
+    return _default_scheduler
@@ -0,0 +1,125 @@
+"""
+This module contains the NameRegistry class, an ordered collection of named items
+(tasks, projects, folders...) indexed by their name.
+Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@udistrital.edu.co>
+"""
+
+
+class NameRegistry:
+    """
+    This class keeps named items in insertion order and indexes them by name.
+
+    Every item must have a get_name() method. Lookups, duplicate checks and
+    removals by name are O(1), and iterating the registry yields the items in
+    the order they were added, like the lists it replaces.
+
+    Methods:
+        add(item): Adds an item if its name is not registered yet.
+        add_many(items): Adds several items at once.
+        get(name, default): Gets the item with the specified name.
+        remove(name): Removes and returns the item with the specified name.
+        names(): Gets the registered names in insertion order.
+        clear(): Removes all the items.
+    """
+
+    __slots__ = ("_items",)
+
+    def __init__(self, items=None):
+        """
+        Initializes a new instance of the NameRegistry class.
+
+        Args:
+            items (iterable): Optional items to be added in order.
+        """
+        self._items = {}
+        for item in items or ():
+            self.add(item)
+
+    def __iter__(self):
+        return iter(self._items.values())
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item):
+        if isinstance(item, str):
+            return item in self._items
+        return self._items.get(item.get_name()) is item
+
+    def __repr__(self):
+        return f"NameRegistry({list(self._items)!r})"
+
+    def add(self, item):
+        """
+        Adds an item to the registry.
+
+        Args:
+            item: The item to be added.
+
+        Returns:
+            bool: True if the item was added, False if its name already exists.
+        """
+        name = item.get_name()
+        if name in self._items:
+            return False
+        self._items[name] = item
+        return True
+
+    def add_many(self, items):
+        """
+        Adds several items to the registry, in order.
+
+        Args:
+            items (iterable): The items to be added.
+
+        Returns:
+            list: One bool per item, False for the names that already exist.
+        """
+        registered = self._items
+        added = []
+        for item in items:
+            name = item.get_name()
+            if name in registered:
+                added.append(False)
+            else:
+                registered[name] = item
+                added.append(True)
+        return added
+
+    def get(self, name, default=None):
+        """
+        Gets the item with the specified name.
+
+        Args:
+            name (str): The name of the item to retrieve.
+            default: The value returned when the name is not registered.
+
+        Returns:
+            The item with the specified name, or default if not found.
+        """
+        return self._items.get(name, default)
+
+    def remove(self, name):
+        """
+        Removes the item with the specified name.
+
+        Args:
+            name (str): The name of the item to be removed.
+
+        Returns:
+            The removed item, or None if not found.
+        """
+        return self._items.pop(name, None)
+
+    def names(self):
+        """
+        Gets the registered names.
+
+        Returns:
+            list: The names in insertion order.
+        """
+        return list(self._items)
+
+    def clear(self):
+        """Removes all the items from the registry."""
+        self._items.clear()
@@ -0,0 +1,140 @@
+"""
+This module renders the tasks, projects and folders of a client as text lines.
+The tree is walked by generators, and the lines are written in big buffered
+chunks, so the same rendering can feed the terminal, a file or an HTTP stream.
+Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@udistrital.edu.co>
+"""
+
+import itertools
+import sys
+
+BUFFER_SIZE = 64 * 1024
+
+
+def _page(items, offset: int = 0, limit: int = None):
+    """This function returns the items of a page, without copying them."""
+    stop = None if limit is None else offset + limit
+    return itertools.islice(items, offset, stop)
+
+
+def iter_tasks(tasks, offset: int = 0, limit: int = None):
+    """
+    This function yields the lines of the pending tasks and their subtasks.
+
+    Args:
+        tasks (iterable): The tasks of the client.
+        offset (int): The number of pending tasks to be skipped.
+        limit (int): The maximum number of tasks to be rendered, all by default.
+
+    Yields:
+        str: One line, without the line break.
+    """
+    pending = (tarea for tarea in tasks if tarea.status is False)
+    for tarea in _page(pending, offset, limit):
+        yield "Tarea: " + tarea.get_name()
+        for subtarea in tarea.subtasks:
+            if subtarea.status is False:
+                yield "     Subtarea: " + subtarea.get_name()
+                yield ""
+
+
+def iter_projects(projects, offset: int = 0, limit: int = None):
+    """
+    This function yields the lines of the pending projects with their counters.
+
+    Args:
+        projects (iterable): The projects of the client.
+        offset (int): The number of pending projects to be skipped.
+        limit (int): The maximum number of projects to be rendered, all by default.
+
+    Yields:
+        str: One line, without the line break.
+    """
+    pending = (project for project in projects if project.status is False)
+    for project in _page(pending, offset, limit):
+        yield (
+            f"Proyecto: {project.get_name()} "
+            f"({project.get_done_count()}/{project.get_total_count()} realizadas)"
+        )
+        for tarea in project.tasks:
+            if tarea.status is False:
+                yield "     Tarea: " + tarea.get_name()
+                for subtarea in tarea.subtasks:
+                    if subtarea.status is False:
+                        yield "         Subtarea: " + subtarea.get_name()
+                        yield ""
+
+
+def iter_folders(folders, offset: int = 0, limit: int = None):
+    """
+    This function yields the lines of the folders with all their content.
+
+    Args:
+        folders (iterable): The folders of a premium client.
+        offset (int): The number of folders to be skipped.
+        limit (int): The maximum number of folders to be rendered, all by default.
+
+    Yields:
+        str: One line, without the line break.
+    """
+    for folder in _page(folders, offset, limit):
+        yield (
+            f"Carpeta: {folder.get_name()} "
+            f"({folder.get_done_count()}/{folder.get_total_count()} realizadas)"
+        )
+        for project in folder.projects:
+            yield (
+                f"     Proyecto: {project.get_name()} "
+                f"({project.get_done_count()}/{project.get_total_count()} realizadas)"
+            )
+            for task in project.tasks:
+                yield "         Tarea: " + task.get_name()
+                for subtask in task.subtasks:
+                    yield "             Subtarea: " + subtask.get_name()
+
+
+def iter_chunks(lines, buffer_size: int = BUFFER_SIZE, whole_items: bool = False):
+    """
+    This function joins the lines in text chunks of about buffer_size characters.
+
+    Args:
+        lines (iterable): The lines, e.g. from iter_tasks().
+        buffer_size (int): The number of characters of a chunk.
+        whole_items (bool): If a chunk only ends before a top-level line, which
+            is not indented. The renderers then never stop in the middle of the
+            children of an item, so they can change between chunks.
+
+    Yields:
+        str: Several lines, each one ending with a line break.
+    """
+    chunk = []
+    size = 0
+    for line in lines:
+        if whole_items and size >= buffer_size and line[:1].strip():
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+            size = 0
+        chunk.append(line)
+        size += len(line) + 1
+        if not whole_items and size >= buffer_size:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+            size = 0
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+def write_lines(lines, file=None, buffer_size: int = BUFFER_SIZE):
+    """
+    This function writes the lines with one write call per chunk.
+
+    Args:
+        lines (iterable): The lines to be written, without line breaks.
+        file: A text file, the standard output by default.
+        buffer_size (int): The number of characters written at a time.
+    """
+    if file is None:
+        file = sys.stdout
+    for chunk in iter_chunks(lines, buffer_size):
+        file.write(chunk)
+    file.flush()
@@ -4,7 +4,9 @@ Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@u
 
 """
 
+# pylint: disable= import-error
 import datetime
+from project import completions
 
 
 # pylint: disable= line-too-long
@@ -25,28 +27,99 @@ class Report:
     def create_report(self):
         """This method is an abstract definition of a possible general behavior for all reports"""
 
+    def __str__(self):
+        return self.create_report() or ""
+
+
+class TasksSummary:
+    """This class represents the counters of a tasks report."""
+
+    def __init__(self, today, total=0, weekly=0, today_count=0):
+        self.today = today
+        self.total_completed_tasks = total
+        self.weekly_completed_tasks = weekly
+        self.today_completed_tasks = today_count
+
+    def to_dict(self):
+        """This method returns the counters as a dictionary."""
+        return {
+            "date": self.today.isoformat(),
+            "total_completed_tasks": self.total_completed_tasks,
+            "weekly_completed_tasks": self.weekly_completed_tasks,
+            "today_completed_tasks": self.today_completed_tasks,
+        }
+
+
+def summarize_done_tasks(done_tasks, today=None) -> TasksSummary:
+    """
+    This function counts the completed tasks in a single pass.
+
+    Args:
+        done_tasks (iterable): Any iterable or generator of done tasks (objects with
+            a date_done attribute) or of completion dates, e.g. rows streamed from
+            the database. It is consumed once and never stored.
+        today (date): The date the report is computed for, today by default.
+
+    Returns:
+        TasksSummary: The total, weekly and today counters.
+    """
+    if today is None:
+        today = datetime.datetime.now().date()
+    week_start = today - datetime.timedelta(days=7)
+    summary = TasksSummary(today)
+    for task in done_tasks:
+        date_done = getattr(task, "date_done", task)
+        if isinstance(date_done, datetime.datetime):
+            date_done = date_done.date()
+        summary.total_completed_tasks += 1
+        if date_done is None:
+            continue
+        if date_done >= week_start:
+            summary.weekly_completed_tasks += 1
+            if date_done == today:
+                summary.today_completed_tasks += 1
+    return summary
+
+
+def summarize_completion_index(index, today=None) -> TasksSummary:
+    """
+    This function reads the counters from a per-day completion index.
+
+    Args:
+        index (CompletionIndex): The completion histogram of the client.
+        today (date): The date the report is computed for, today by default.
+
+    Returns:
+        TasksSummary: The total, weekly and today counters.
+    """
+    if today is None:
+        today = datetime.datetime.now().date()
+    return TasksSummary(
+        today,
+        index.total,
+        index.count_last_days(7, today),
+        index.count_today(today),
+    )
+
 
 class TasksReport(Report):
     """This class represents a report of the tasks completed by the user"""
 
-    def __init__(self, report_type: str, done_tasks: list):
+    def __init__(self, report_type: str, done_tasks, today=None):
         super().__init__(report_type)
         self.__type = report_type
-        self.__total_completed_tasks = len(done_tasks)
-        self.__weekly_completed_tasks = 0
-        self.__today_completed_tasks = 0
-
-        # Counting the number of tasks completed today
-        for task in done_tasks:
-            if task.date_done == datetime.datetime.now().date():
-                self.__today_completed_tasks += 1
-
-        # Counting the number of tasks completed in the last week
-        for task in done_tasks:
-            if task.date_done >= datetime.datetime.now().date() - datetime.timedelta(
-                days=7
-            ):
-                self.__weekly_completed_tasks += 1
+        # With the completion index the counters don't depend on the number of tasks
+        if isinstance(done_tasks, completions.CompletionIndex):
+            self.__summary = summarize_completion_index(done_tasks, today)
+        else:
+            self.__summary = summarize_done_tasks(done_tasks, today)
+        self.__total_completed_tasks = self.__summary.total_completed_tasks
+        self.__weekly_completed_tasks = self.__summary.weekly_completed_tasks
+        self.__today_completed_tasks = self.__summary.today_completed_tasks
+
+    def get_summary(self) -> TasksSummary:
+        """This method returns the counters of the report."""
+        return self.__summary
 
     def create_report(self):
         """This method creates the report of the tasks completed by the user"""
@@ -69,24 +142,34 @@ class ClientsReport(Report):
 
     Attributes:
         report_type (str): The type of the report.
-        number_clients (list): A list of clients.
+        number_clients (list): A list of clients, or a SubscriptionRegistry.
 
     Methods:
-        __init__(self, report_type: str, number_clients: list): Initializes a ClientsReport object.
+        __init__(self, report_type: str, number_clients): Initializes a ClientsReport object.
         create_report(self): Creates the report of the clients registered in the system.
     """
 
-    def __init__(self, report_type: str, number_clients: list):
+    def __init__(self, report_type: str, number_clients):
         super().__init__(report_type)
-        self.__number_of_clients = number_clients
-        self.__number_of_premium_clients = 0
         self.__type = report_type
 
+        # A SubscriptionRegistry already keeps the counts
+        if hasattr(number_clients, "count_premium"):
+            self.__number_of_clients = number_clients.count_clients()
+            self.__number_of_premium_clients = number_clients.count_premium()
+            return
+        self.__number_of_clients = 0
+        self.__number_of_premium_clients = 0
         # Counting the number of premium clients
-        for client in self.__number_of_clients:
+        for client in number_clients:
+            self.__number_of_clients += 1
             if client.premium is True:
                 self.__number_of_premium_clients += 1
 
+    def get_counts(self):
+        """This method returns the number of clients and of premium clients."""
+        return self.__number_of_clients, self.__number_of_premium_clients
+
     def create_report(self):
         """This method creates the report of the clients registered in the system"""
         self.__title = f"{self.__type} Report"
@@ -97,7 +180,7 @@ class ClientsReport(Report):
             "%Y-%m-%d %H:%M:%S"
         )  # Para mostrar la fecha actual
         self.__content = f"""
-        Number of clients: {len(self.__number_of_clients)}\n
+        Number of clients: {self.__number_of_clients}\n
         Number of premium clients: {self.__number_of_premium_clients}\n
         """
         return f"\n\n     Title: {self.__title}\n\n     Description: {self.__description}\n\n     Date: {self.__date}\n\n     Content: {self.__content}"
@@ -107,10 +190,17 @@ class ReportFactory:
     """This class represents the factory that creates the reports."""
 
     # pylint: disable= redefined-builtin
-    def create_report(self, report_type: str, list: list) -> Report:
-        """This method creates the report of the tasks completed by the user"""
+    def create_report(self, report_type: str, list: list, **options) -> Report:
+        """This method creates the report of the tasks completed by the user.
+        The report is rendered as text with str() or create_report()."""
         if report_type == "Tasks":
-            return TasksReport(report_type, list).create_report()
+            return TasksReport(report_type, list)
         if report_type == "Clients":
-            return ClientsReport(report_type, list).create_report()
+            return ClientsReport(report_type, list)
+        if report_type == "Analytics":
+            # NumPy is only imported when an analytics report is requested
+            # pylint: disable= import-outside-toplevel
+            from project import analytics
+
+            return analytics.AnalyticsReport(report_type, list, **options)
         return None
@@ -0,0 +1,329 @@
+"""
+This module contains the SearchIndex class, an inverted index over the names and
+tags of the tasks, subtasks, projects and folders of a client. It answers exact,
+prefix, multi-term and fuzzy queries without walking the tree.
+Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@udistrital.edu.co>
+"""
+
+import bisect
+import heapq
+import re
+import unicodedata
+from typing import NamedTuple
+
+# Puntaje de cada término según cómo coincide con una palabra del elemento
+EXACT_SCORE = 3.0
+PREFIX_SCORE = 2.0
+FUZZY_SCORE = 1.0
+# Las palabras cortas o numéricas no se buscan con errores de escritura
+FUZZY_MIN_LENGTH = 4
+
+_WORD = re.compile(r"\w+")
+
+
+class SearchResult(NamedTuple):
+    """This class represents an item found by a query."""
+
+    kind: str
+    name: str
+    parent: str
+    score: float
+
+
+def tokenize(text: str) -> list:
+    """
+    This function splits a text in lowercase words without accents.
+
+    Returns:
+        list: The words, in order and with repetitions.
+    """
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return _WORD.findall(text.lower())
+
+
+def _deletions(token: str):
+    """This function returns the token with one character removed, each way."""
+    return {token[:index] + token[index + 1 :] for index in range(len(token))}
+
+
+def _within_one_edit(first: str, second: str) -> bool:
+    """This function checks if two words differ in at most one edit."""
+    if abs(len(first) - len(second)) > 1:
+        return False
+    if len(first) > len(second):
+        first, second = second, first
+    index = 0
+    while index < len(first) and first[index] == second[index]:
+        index += 1
+    if len(first) == len(second):
+        # Sustitución, o una transposición de letras vecinas
+        return first[index + 1 :] == second[index + 1 :] or (
+            first[index : index + 2] == second[index : index + 2][::-1]
+            and first[index + 2 :] == second[index + 2 :]
+        )
+    return first[index:] == second[index + 1 :]
+
+
+def _fuzzy_fits(token: str) -> bool:
+    """This function checks if a token is indexed for fuzzy queries."""
+    return len(token) >= FUZZY_MIN_LENGTH and not token.isdigit()
+
+
+class SearchIndex:
+    """
+    This class keeps an inverted index from words to the items that contain them.
+
+    Every item has a key, e.g. ("task", name) or ("subtask", task, name), and the
+    text indexed for it. The vocabulary is kept sorted, so the prefix queries are a
+    binary search, and the words with one character removed are indexed too, so
+    the fuzzy queries (one typo) are dictionary lookups.
+
+    Methods:
+        add(key, kind, name, parent, text): Indexes an item, replacing it.
+        remove(key): Removes an item from the index.
+        search(query, limit, prefix, fuzzy): Gets the best items for a query.
+        clear(): Removes all the items.
+    """
+
+    __slots__ = ("_items", "_postings", "_vocabulary", "_deletions")
+
+    def __init__(self):
+        # key -> (SearchResult without score, words)
+        self._items = {}
+        # word -> keys of the items that contain it
+        self._postings = {}
+        # The words of the postings, sorted
+        self._vocabulary = []
+        # word with one character removed -> words
+        self._deletions = {}
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    # pylint: disable= too-many-arguments
+    def add(self, key, kind: str, name: str, parent: str = None, text: str = ""):
+        """
+        This method indexes an item, replacing the previous text of the key.
+
+        Args:
+            key (tuple): Identifies the item, e.g. ("task", name).
+            kind (str): The type of the item: task, subtask, project or folder.
+            name (str): The name of the item.
+            parent (str): The name of the task of a subtask.
+            text (str): More text to be searched, e.g. the tags of a task.
+        """
+        self.remove(key)
+        words = frozenset(tokenize(name)) | frozenset(tokenize(text))
+        self._items[key] = (SearchResult(kind, name, parent, 0.0), words)
+        for word in words:
+            keys = self._postings.get(word)
+            if keys is None:
+                self._add_word(word)
+                keys = self._postings[word] = set()
+            keys.add(key)
+
+    def remove(self, key) -> bool:
+        """
+        This method removes an item from the index.
+
+        Returns:
+            bool: False if the key was not indexed.
+        """
+        item = self._items.pop(key, None)
+        if item is None:
+            return False
+        for word in item[1]:
+            keys = self._postings[word]
+            keys.discard(key)
+            if not keys:
+                del self._postings[word]
+                self._remove_word(word)
+        return True
+
+    def clear(self):
+        """This method removes all the items from the index."""
+        self._items.clear()
+        self._postings.clear()
+        self._vocabulary.clear()
+        self._deletions.clear()
+
+    def _add_word(self, word):
+        """This method adds a new word to the vocabulary."""
+        bisect.insort(self._vocabulary, word)
+        if _fuzzy_fits(word):
+            for deletion in _deletions(word):
+                self._deletions.setdefault(deletion, set()).add(word)
+
+    def _remove_word(self, word):
+        """This method removes a word without items from the vocabulary."""
+        index = bisect.bisect_left(self._vocabulary, word)
+        del self._vocabulary[index]
+        if _fuzzy_fits(word):
+            for deletion in _deletions(word):
+                words = self._deletions[deletion]
+                words.discard(word)
+                if not words:
+                    del self._deletions[deletion]
+
+    def _prefixed(self, term):
+        """This method yields the words that start with the term, but are longer."""
+        vocabulary = self._vocabulary
+        index = bisect.bisect_right(vocabulary, term)
+        while index < len(vocabulary) and vocabulary[index].startswith(term):
+            yield vocabulary[index]
+            index += 1
+
+    def _similar(self, term):
+        """This method returns the other words at most one edit away from the term."""
+        candidates = set(self._deletions.get(term, ()))
+        for deletion in _deletions(term):
+            candidates.update(self._deletions.get(deletion, ()))
+            if deletion in self._postings:
+                candidates.add(deletion)
+        candidates.discard(term)
+        return [word for word in candidates if _within_one_edit(term, word)]
+
+    def _match(self, term, prefix, fuzzy):
+        """This method returns the score of every word that matches a term."""
+        scores = {term: EXACT_SCORE} if term in self._postings else {}
+        if prefix:
+            for word in self._prefixed(term):
+                # Las palabras más cercanas al término puntúan más
+                scores[word] = FUZZY_SCORE + (PREFIX_SCORE - FUZZY_SCORE) * len(
+                    term
+                ) / len(word)
+        if fuzzy and _fuzzy_fits(term):
+            for word in self._similar(term):
+                scores.setdefault(word, FUZZY_SCORE)
+        return scores
+
+    def search(
+        self, query: str, limit: int = 10, prefix: bool = True, fuzzy: bool = True
+    ) -> list:
+        """
+        This method finds the items that match every word of the query.
+
+        A word of the query matches a word of an item if they are equal, if it is
+        a prefix of it (with prefix), or if they differ in one typo (with fuzzy).
+
+        Args:
+            query (str): The words to be searched.
+            limit (int): The maximum number of results, all of them with None.
+            prefix (bool): If the words of the query can be prefixes.
+            fuzzy (bool): If the words of the query can have a typo.
+
+        Returns:
+            list: SearchResult objects, the best ones first. Exact matches score
+            more than prefixes, and prefixes more than typos; ties are broken by
+            the shortest name.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        postings = self._postings
+        items = self._items
+        matches = []
+        for term in terms:
+            words = self._match(term, prefix, fuzzy)
+            if not words:
+                return []
+            matches.append((sum(len(postings[word]) for word in words), words))
+        matches.sort(key=lambda match: match[0])
+
+        # Solo se recorren los elementos del término más selectivo, y los demás
+        # términos se comparan con las palabras de cada uno
+        scores = {}
+        for word, score in matches[0][1].items():
+            for key in postings[word]:
+                if scores.get(key, 0.0) < score:
+                    scores[key] = score
+        for _, words in matches[1:]:
+            filtered = {}
+            for key, score in scores.items():
+                best = max((words.get(word, 0.0) for word in items[key][1]))
+                if best:
+                    filtered[key] = score + best
+            scores = filtered
+            if not scores:
+                return []
+
+        items = self._items
+
+        def rank(key):
+            result = items[key][0]
+            return (-scores[key], len(result.name), result.name, result.kind)
+
+        if limit is None:
+            keys = sorted(scores, key=rank)
+        else:
+            keys = heapq.nsmallest(limit, scores, key=rank)
+        return [items[key][0]._replace(score=scores[key]) for key in keys]
+
+
+# Las claves de los elementos de un cliente en el índice
+def add_task(index: SearchIndex, task):
+    """This function indexes a task, with its tags, and its subtasks."""
+    name = task.get_name()
+    index.add(("task", name), "task", name, text=" ".join(task.get_tags()))
+    for subtask in task.subtasks:
+        add_subtask(index, name, subtask)
+
+
+def remove_task(index: SearchIndex, task):
+    """This function removes a task and its subtasks from the index."""
+    name = task.get_name()
+    index.remove(("task", name))
+    for subtask in task.subtasks:
+        remove_subtask(index, name, subtask.get_name())
+
+
+def add_subtask(index: SearchIndex, task_name: str, subtask):
+    """This function indexes a subtask of a task."""
+    name = subtask.get_name()
+    index.add(("subtask", task_name, name), "subtask", name, task_name)
+
+
+def remove_subtask(index: SearchIndex, task_name: str, name: str):
+    """This function removes a subtask of a task from the index."""
+    index.remove(("subtask", task_name, name))
+
+
+def add_project(index: SearchIndex, project):
+    """This function indexes a project."""
+    name = project.get_name()
+    index.add(("project", name), "project", name)
+
+
+def remove_project(index: SearchIndex, name: str):
+    """This function removes a project from the index."""
+    index.remove(("project", name))
+
+
+def add_folder(index: SearchIndex, folder):
+    """This function indexes a folder."""
+    name = folder.get_name()
+    index.add(("folder", name), "folder", name)
+
+
+def build_index(client) -> SearchIndex:
+    """
+    This function indexes the tasks, subtasks, projects and folders of a client.
+
+    Args:
+        client (ClientABC): A Client or a PremiumDecorator.
+
+    Returns:
+        SearchIndex: The new index.
+    """
+    index = SearchIndex()
+    for task in client.tasks:
+        add_task(index, task)
+    for project in client.projects:
+        add_project(index, project)
+    for folder in getattr(client, "folders", ()):
+        add_folder(index, folder)
+    return index
@@ -0,0 +1,260 @@
+"""
+This module contains the SessionManager class, which keeps the clients of many
+users in memory and moves the least recently used ones to the repository.
+Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@udistrital.edu.co>
+"""
+
+# pylint: disable= import-error
+from collections import OrderedDict
+import logging
+import threading
+import time
+from project import client as cliente
+
+logger = logging.getLogger(__name__)
+
+
+class SessionManager:
+    """
+    This class keeps the Client or PremiumDecorator of every active user.
+
+    The clients are kept in least recently used order. When there are more than
+    capacity clients, or a client is idle for more than idle_seconds, it is saved
+    in the repository and dropped from memory; the next request of that user loads
+    it again. A client that can't be saved stays in memory.
+
+    The repository is only used outside the lock of the manager, so loading or
+    saving a client doesn't stall the requests of the other users. While the
+    client of a user is loaded or saved, the other requests of that user wait.
+
+    Methods:
+        get(username): Gets the client of the user, loading or creating it.
+        set(username, client): Replaces the client of the user.
+        evict(username): Saves the client of the user and drops it from memory.
+        evict_idle(): Evicts the clients idle for more than idle_seconds.
+        save_all(): Saves every client in memory without evicting it.
+        clients(): Gets the clients in memory.
+        stats(): Gets the hits, misses and evictions.
+    """
+
+    def __init__(
+        self,
+        repository=None,
+        capacity: int = None,
+        idle_seconds: float = None,
+        clock=time.monotonic,
+    ):
+        """
+        Initializes a new instance of the SessionManager class.
+
+        Args:
+            repository (Repository): Where the evicted clients are saved. Without
+                a repository the clients are never evicted.
+            capacity (int): The maximum number of clients in memory, no limit by
+                default.
+            idle_seconds (float): The seconds a client can be unused before
+                evict_idle() drops it, no limit by default.
+            clock (callable): Returns the current time in seconds.
+        """
+        self.repository = repository
+        self.capacity = capacity
+        self.idle_seconds = idle_seconds
+        self.__clock = clock
+        self.__lock = threading.RLock()
+        # username -> [client, last use]
+        self.__sessions = OrderedDict()
+        # username -> Event, set when its client was loaded or saved
+        self.__in_flight = {}
+        self.__stats = {
+            "hits": 0,
+            "misses": 0,
+            "rehydrations": 0,
+            "evictions": 0,
+            "failed_evictions": 0,
+        }
+
+    def __len__(self):
+        return len(self.__sessions)
+
+    def __contains__(self, username):
+        return username in self.__sessions
+
+    def get(self, username: str) -> cliente.ClientABC:
+        """
+        This method gets the client of the user.
+
+        Returns:
+            ClientABC: The client in memory, the stored one, or a new Client.
+        """
+        while True:
+            with self.__lock:
+                session = self.__sessions.get(username)
+                if session is not None:
+                    self.__stats["hits"] += 1
+                    session[1] = self.__clock()
+                    self.__sessions.move_to_end(username)
+                    return session[0]
+                in_flight = self.__in_flight.get(username)
+                if in_flight is None:
+                    self.__stats["misses"] += 1
+                    self.__in_flight[username] = threading.Event()
+                    break
+            # Otro hilo está cargando o guardando el cliente de este usuario
+            in_flight.wait()
+
+        try:
+            client = None
+            if self.repository is not None:
+                client = self.repository.load_client(username)
+        except BaseException:
+            # Sin el cliente guardado no se crea uno vacío que lo reemplace
+            with self.__lock:
+                self.__in_flight.pop(username).set()
+            raise
+        with self.__lock:
+            if client is None:
+                client = cliente.Client()
+            else:
+                self.__stats["rehydrations"] += 1
+            session = self.__sessions.get(username)
+            if session is not None:
+                # set() lo reemplazó mientras se cargaba
+                client = session[0]
+            else:
+                self.__sessions[username] = [client, self.__clock()]
+            self.__in_flight.pop(username).set()
+        self.__evict_excess(username)
+        return client
+
+    def set(self, username: str, client: cliente.ClientABC):
+        """This method replaces the client of the user, e.g. after paying."""
+        with self.__lock:
+            self.__sessions.pop(username, None)
+            self.__sessions[username] = [client, self.__clock()]
+        self.__evict_excess(username)
+
+    def __evict_excess(self, newest):
+        """This method evicts the least recently used clients over the capacity."""
+        if self.repository is None or self.capacity is None:
+            return
+        # Los que no se pueden guardar se quedan, y se prueba con el siguiente
+        tried = {newest}
+        while True:
+            with self.__lock:
+                if len(self.__sessions) <= self.capacity:
+                    return
+                oldest = next(
+                    (username for username in self.__sessions if username not in tried),
+                    None,
+                )
+            if oldest is None:
+                return
+            tried.add(oldest)
+            self.__evict_safely(oldest)
+
+    def evict(self, username: str) -> bool:
+        """
+        This method saves the client of the user and drops it from memory.
+
+        The client leaves the sessions while it is saved, and the requests of the
+        user wait for it. If saving fails it is put back as the least recently
+        used client.
+
+        Returns:
+            bool: False if the client was not in memory, or it is being loaded
+            or saved.
+
+        Raises:
+            Exception: The error of the repository if the client can't be saved.
+        """
+        with self.__lock:
+            if username in self.__in_flight:
+                return False
+            session = self.__sessions.pop(username, None)
+            if session is None:
+                return False
+            self.__in_flight[username] = threading.Event()
+        saved = False
+        try:
+            if self.repository is not None:
+                self.repository.save_client(username, session[0])
+            saved = True
+        finally:
+            with self.__lock:
+                if saved:
+                    self.__stats["evictions"] += 1
+                elif username not in self.__sessions:
+                    self.__sessions[username] = session
+                    self.__sessions.move_to_end(username, last=False)
+                self.__in_flight.pop(username).set()
+        return True
+
+    def __evict_safely(self, username):
+        """
+        This method evicts a client for another request, so a client that can't
+        be saved is logged and counted instead of failing that request.
+
+        Returns:
+            bool: True if the client was evicted.
+        """
+        try:
+            return self.evict(username)
+        except Exception:  # pylint: disable= broad-exception-caught
+            logger.exception("No fue posible guardar el cliente de %s", username)
+            with self.__lock:
+                self.__stats["failed_evictions"] += 1
+            return False
+
+    def evict_idle(self) -> int:
+        """
+        This method evicts the clients that were not used for idle_seconds.
+
+        A client that can't be saved is logged and stays in memory.
+
+        Returns:
+            int: The number of evicted clients.
+        """
+        if self.repository is None or self.idle_seconds is None:
+            return 0
+        with self.__lock:
+            limit = self.__clock() - self.idle_seconds
+            idle = []
+            # Están ordenados por último uso, así que se para en el primero activo
+            for username, (_, last_use) in self.__sessions.items():
+                if last_use > limit:
+                    break
+                idle.append(username)
+        return sum(self.__evict_safely(username) for username in idle)
+
+    def save_all(self):
+        """This method saves every client in memory, e.g. before shutting down."""
+        if self.repository is None:
+            return
+        with self.__lock:
+            sessions = [
+                (username, client) for username, (client, _) in self.__sessions.items()
+            ]
+        for username, client in sessions:
+            self.repository.save_client(username, client)
+
+    def clients(self) -> list:
+        """This method returns the clients in memory, least recently used first."""
+        with self.__lock:
+            return [client for client, _ in self.__sessions.values()]
+
+    def stats(self) -> dict:
+        """
+        This method returns the statistics of the sessions.
+
+        Returns:
+            dict: The hits, misses, rehydrations (misses found in the repository),
+            evictions, failed_evictions (clients that couldn't be saved),
+            hit_rate and the number of clients in memory.
+        """
+        with self.__lock:
+            stats = dict(self.__stats)
+            requests = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = stats["hits"] / requests if requests else 0.0
+            stats["size"] = len(self.__sessions)
+            stats["capacity"] = self.capacity
+            return stats
@@ -0,0 +1,613 @@
+"""
+This module contains the Repository class, which persists the tasks, subtasks,
+projects and folders of every client in a SQLite database using SQLAlchemy.
+Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@udistrital.edu.co>
+"""
+
+# pylint: disable= import-error
+# pylint: disable= too-few-public-methods
+# The table classes are just the mapping of the database rows
+import datetime
+from typing import Optional
+from sqlalchemy import (
+    Boolean,
+    Date,
+    ForeignKeyConstraint,
+    Integer,
+    String,
+    create_engine,
+    delete,
+    func,
+    insert,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, sessionmaker
+from sqlalchemy.pool import StaticPool
+from project import client as cliente
+from project import composite
+
+
+class Base(DeclarativeBase):
+    """This class is the declarative base of the tables of the repository."""
+
+
+class OwnerRow(Base):
+    """This class represents the settings of a client."""
+
+    __tablename__ = "owners"
+
+    owner: Mapped[str] = mapped_column(String, primary_key=True)
+    premium: Mapped[bool] = mapped_column(Boolean, default=False)
+    short_break: Mapped[int] = mapped_column(Integer)
+    long_break: Mapped[int] = mapped_column(Integer)
+    pomodoro_length: Mapped[int] = mapped_column(Integer)
+    long_break_after: Mapped[int] = mapped_column(Integer)
+    # The last journal event included in the stored state
+    journal_seq: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class TaskRow(Base):
+    """
+    This class represents a task. The primary key is the (owner, position) index,
+    because a task that was done and deleted can have the name of a listed one.
+    """
+
+    __tablename__ = "tasks"
+
+    owner: Mapped[str] = mapped_column(String, primary_key=True)
+    position: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String)
+    # False when the task was deleted from the client but a project still has it
+    listed: Mapped[bool] = mapped_column(Boolean, default=True)
+    status: Mapped[bool] = mapped_column(Boolean, default=False)
+    tag: Mapped[str] = mapped_column(String, default="General")
+    date: Mapped[datetime.date] = mapped_column(Date)
+    date_done: Mapped[Optional[datetime.date]] = mapped_column(Date, nullable=True)
+
+
+class SubtaskRow(Base):
+    """This class represents a subtask. It is indexed by (owner, task, name)."""
+
+    __tablename__ = "subtasks"
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["owner", "task"], ["tasks.owner", "tasks.position"], ondelete="CASCADE"
+        ),
+    )
+
+    owner: Mapped[str] = mapped_column(String, primary_key=True)
+    # The position of the task row
+    task: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    position: Mapped[int] = mapped_column(Integer)
+    status: Mapped[bool] = mapped_column(Boolean, default=False)
+    date: Mapped[datetime.date] = mapped_column(Date)
+    date_done: Mapped[Optional[datetime.date]] = mapped_column(Date, nullable=True)
+
+
+class ProjectRow(Base):
+    """This class represents a project. The primary key is the (owner, name) index."""
+
+    __tablename__ = "projects"
+
+    owner: Mapped[str] = mapped_column(String, primary_key=True)
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    position: Mapped[int] = mapped_column(Integer)
+    status: Mapped[bool] = mapped_column(Boolean, default=False)
+    date: Mapped[datetime.date] = mapped_column(Date)
+    date_done: Mapped[Optional[datetime.date]] = mapped_column(Date, nullable=True)
+
+
+class ProjectTaskRow(Base):
+    """This class represents a task that was added to a project."""
+
+    __tablename__ = "project_tasks"
+
+    owner: Mapped[str] = mapped_column(String, primary_key=True)
+    project_name: Mapped[str] = mapped_column(String, primary_key=True)
+    position: Mapped[int] = mapped_column(Integer, primary_key=True)
+    task: Mapped[int] = mapped_column(Integer)
+
+
+class FolderRow(Base):
+    """This class represents a folder. The primary key is the (owner, name) index."""
+
+    __tablename__ = "folders"
+
+    owner: Mapped[str] = mapped_column(String, primary_key=True)
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    position: Mapped[int] = mapped_column(Integer)
+
+
+class FolderProjectRow(Base):
+    """This class represents a project that was assigned to a folder."""
+
+    __tablename__ = "folder_projects"
+
+    owner: Mapped[str] = mapped_column(String, primary_key=True)
+    folder_name: Mapped[str] = mapped_column(String, primary_key=True)
+    project_name: Mapped[str] = mapped_column(String, primary_key=True)
+    position: Mapped[int] = mapped_column(Integer)
+
+
+class DoneTaskRow(Base):
+    """This class represents an entry of the done_tasks list of a client."""
+
+    __tablename__ = "done_tasks"
+
+    owner: Mapped[str] = mapped_column(String, primary_key=True)
+    position: Mapped[int] = mapped_column(Integer, primary_key=True)
+    task: Mapped[int] = mapped_column(Integer)
+
+
+class PomodoroRow(Base):
+    """This class represents the pomodoro minutes of a client on a day."""
+
+    __tablename__ = "pomodoro_minutes"
+
+    owner: Mapped[str] = mapped_column(String, primary_key=True)
+    day: Mapped[datetime.date] = mapped_column(Date, primary_key=True)
+    minutes: Mapped[int] = mapped_column(Integer)
+
+
+class LazyTask(composite.Task):
+    """
+    This class represents a task loaded from the repository.
+
+    Its subtasks are only read from the database the first time they are used,
+    while its completion counters are loaded upfront with the task.
+    """
+
+    __slots__ = ("_loader", "_subtasks", "row")
+
+    def __init__(self, name, loader, row):
+        """
+        Initializes a new instance of the LazyTask class.
+
+        Args:
+            name (str): The name of the task.
+            loader (callable): Returns the stored subtasks of a task row.
+            row (int): The position of the row of the task, updated on every save.
+        """
+        self._loader = loader
+        self._subtasks = None
+        self.row = row
+        super().__init__(name)
+
+    @property
+    def subtasks(self):
+        """The subtasks of the task, loaded on first access."""
+        if self._loader is not None:
+            loader = self._loader
+            self._loader = None
+            for subtarea in loader(self.row):
+                # The counters of the task already include the stored subtasks
+                self._subtasks.add(subtarea)
+                subtarea.parents = self.parent_tuple
+        return self._subtasks
+
+    @subtasks.setter
+    def subtasks(self, value):
+        self._subtasks = value
+
+    def is_loaded(self):
+        """This method returns if the subtasks were already read."""
+        return self._loader is None
+
+
+def _restore(component, row):
+    """This function copies the stored status and dates to a component."""
+    component.status = row.status
+    component.date = row.date
+    component.date_done = row.date_done
+
+
+class Repository:
+    """
+    This class persists the clients in a SQLite database.
+
+    Every row is indexed by (owner, name), except the tasks, which are indexed by
+    (owner, position). The whole tree of a client is written with bulk inserts in
+    one transaction, and the subtasks are loaded lazily.
+
+    Methods:
+        save_client(owner, client): Replaces the stored data of the owner.
+        load_client(owner): Builds the client of the owner from the database.
+        load_journal_seq(owner): Returns the last journal event that was saved.
+        delete_client(owner): Deletes the stored data of the owner.
+        iter_done_dates(owner): Streams the completion dates of the owner.
+        iter_premium(): Streams every owner and whether it is premium.
+        exists(owner): Returns if the owner has stored data.
+    """
+
+    def __init__(self, url: str = "sqlite:///focustodo.db", engine=None):
+        """
+        Initializes a new instance of the Repository class.
+
+        Args:
+            url (str): The database URL, by default a SQLite file.
+            engine: An already created SQLAlchemy engine, used instead of the url.
+        """
+        if engine is None:
+            if url in ("sqlite://", "sqlite:///:memory:"):
+                # An in-memory database only exists in its own connection
+                engine = create_engine(
+                    url,
+                    connect_args={"check_same_thread": False},
+                    poolclass=StaticPool,
+                )
+            else:
+                engine = create_engine(url)
+        self.engine = engine
+        Base.metadata.create_all(self.engine)
+        # Databases created before the journal checkpoints lack the column
+        columns = inspect(self.engine).get_columns(OwnerRow.__tablename__)
+        if "journal_seq" not in {column["name"] for column in columns}:
+            with self.engine.begin() as connection:
+                connection.execute(
+                    text("ALTER TABLE owners ADD COLUMN journal_seq INTEGER DEFAULT 0")
+                )
+        self._session = sessionmaker(self.engine)
+
+    def exists(self, owner: str) -> bool:
+        """This method returns if the owner has stored data."""
+        with self._session() as session:
+            return session.get(OwnerRow, owner) is not None
+
+    def delete_client(self, owner: str):
+        """This method deletes all the stored data of the owner."""
+        with self._session.begin() as session:
+            self._delete_rows(session, owner)
+
+    @staticmethod
+    def _delete_rows(session, owner):
+        for table in (
+            PomodoroRow,
+            DoneTaskRow,
+            FolderProjectRow,
+            FolderRow,
+            ProjectTaskRow,
+            ProjectRow,
+            SubtaskRow,
+            TaskRow,
+            OwnerRow,
+        ):
+            session.execute(delete(table).where(table.owner == owner))
+
+    # pylint: disable= too-many-locals
+    def save_client(
+        self, owner: str, client: cliente.ClientABC, journal_seq: int = None
+    ):
+        """
+        This method replaces the stored data of the owner with the client state.
+
+        Args:
+            owner (str): The username of the client.
+            client (ClientABC): A Client or a PremiumDecorator.
+            journal_seq (int): The last journal event included in the state, or
+                None to keep the stored one, e.g. when the API saves the client.
+        """
+        base = getattr(client, "client", client)
+        folders = getattr(client, "folders", ())
+
+        # Tasks can be referenced by projects or done_tasks after being deleted, so
+        # they are identified by object and not by name
+        saved = {id(task): task for task in base.tasks}
+        listed = len(saved)
+        for project in base.projects:
+            for task in project.tasks:
+                saved.setdefault(id(task), task)
+        for task in base.done_tasks:
+            saved.setdefault(id(task), task)
+        positions = {key: position for position, key in enumerate(saved)}
+
+        task_rows = []
+        subtask_rows = []
+        # Old row -> new row of the tasks whose subtasks were never loaded
+        kept = {}
+        for position, task in enumerate(saved.values()):
+            task_rows.append(
+                {
+                    "owner": owner,
+                    "position": position,
+                    "name": task.get_name(),
+                    "listed": position < listed,
+                    "status": task.status,
+                    "tag": composite.join_tags(task.get_tags()),
+                    "date": task.date,
+                    "date_done": task.date_done,
+                }
+            )
+            if isinstance(task, LazyTask) and not task.is_loaded():
+                kept[task.row] = position
+                continue
+            for subtask_position, subtask in enumerate(task.subtasks):
+                subtask_rows.append(
+                    {
+                        "owner": owner,
+                        "task": position,
+                        "name": subtask.get_name(),
+                        "position": subtask_position,
+                        "status": subtask.status,
+                        "date": subtask.date,
+                        "date_done": subtask.date_done,
+                    }
+                )
+        project_rows = []
+        project_task_rows = []
+        for position, project in enumerate(base.projects):
+            project_rows.append(
+                {
+                    "owner": owner,
+                    "name": project.get_name(),
+                    "position": position,
+                    "status": project.status,
+                    "date": project.date,
+                    "date_done": project.date_done,
+                }
+            )
+            for task_position, task in enumerate(project.tasks):
+                project_task_rows.append(
+                    {
+                        "owner": owner,
+                        "project_name": project.get_name(),
+                        "position": task_position,
+                        "task": positions[id(task)],
+                    }
+                )
+        folder_rows = []
+        folder_project_rows = []
+        for position, folder in enumerate(folders):
+            folder_rows.append(
+                {"owner": owner, "name": folder.get_name(), "position": position}
+            )
+            # A deleted project can still be in a folder if it was changed by hand
+            stored = [
+                project
+                for project in folder.projects
+                if base.projects.get(project.get_name()) is project
+            ]
+            for project_position, project in enumerate(stored):
+                folder_project_rows.append(
+                    {
+                        "owner": owner,
+                        "folder_name": folder.get_name(),
+                        "project_name": project.get_name(),
+                        "position": project_position,
+                    }
+                )
+        done_rows = [
+            {"owner": owner, "position": position, "task": positions[id(task)]}
+            for position, task in enumerate(base.done_tasks)
+        ]
+        pomodoro_rows = [
+            {"owner": owner, "day": day, "minutes": minutes}
+            for day, minutes in base.pomodoro_minutes.items()
+        ]
+
+        with self._session.begin() as session:
+            # Subtasks that were never loaded are kept, moved to the new task rows
+            if kept:
+                for row in session.execute(
+                    select(*SubtaskRow.__table__.columns).where(
+                        SubtaskRow.owner == owner, SubtaskRow.task.in_(kept)
+                    )
+                ):
+                    stored = row._asdict()  # pylint: disable= protected-access
+                    stored["task"] = kept[stored["task"]]
+                    subtask_rows.append(stored)
+            if journal_seq is None:
+                journal_seq = (
+                    session.scalar(
+                        select(OwnerRow.journal_seq).where(OwnerRow.owner == owner)
+                    )
+                    or 0
+                )
+            self._delete_rows(session, owner)
+            session.execute(
+                insert(OwnerRow),
+                [
+                    {
+                        "owner": owner,
+                        "premium": client.premium,
+                        "short_break": base.short_break,
+                        "long_break": base.long_break,
+                        "pomodoro_length": base.pomodoro_length,
+                        "long_break_after": base.long_break_after,
+                        "journal_seq": journal_seq,
+                    }
+                ],
+            )
+            for table, rows in (
+                (TaskRow, task_rows),
+                (SubtaskRow, subtask_rows),
+                (ProjectRow, project_rows),
+                (ProjectTaskRow, project_task_rows),
+                (FolderRow, folder_rows),
+                (FolderProjectRow, folder_project_rows),
+                (DoneTaskRow, done_rows),
+                (PomodoroRow, pomodoro_rows),
+            ):
+                if rows:
+                    session.execute(insert(table), rows)
+        for task in saved.values():
+            if isinstance(task, LazyTask) and not task.is_loaded():
+                task.row = positions[id(task)]
+
+    def iter_done_dates(self, owner: str, batch_size: int = 1000):
+        """
+        This method streams the completion dates of the done_tasks of the owner.
+
+        The rows are fetched in batches, so it can feed a TasksReport without
+        loading the client.
+
+        Args:
+            owner (str): The username of the client.
+            batch_size (int): The number of rows fetched at a time.
+
+        Yields:
+            date: The date_done of every entry of done_tasks.
+        """
+        with self._session() as session:
+            yield from session.execute(
+                select(TaskRow.date_done)
+                .join(
+                    DoneTaskRow,
+                    (DoneTaskRow.owner == TaskRow.owner)
+                    & (DoneTaskRow.task == TaskRow.position),
+                )
+                .where(TaskRow.owner == owner)
+                .order_by(DoneTaskRow.position)
+                .execution_options(yield_per=batch_size)
+            ).scalars()
+
+    def iter_premium(self):
+        """
+        This method streams the stored owners, e.g. to fill a SubscriptionRegistry.
+
+        Yields:
+            tuple: The owner and whether it is premium.
+        """
+        with self._session() as session:
+            yield from session.execute(select(OwnerRow.owner, OwnerRow.premium))
+
+    def load_journal_seq(self, owner: str) -> int:
+        """
+        This method returns the last journal event included in the stored state.
+
+        Returns:
+            int: The seq saved with the client, or 0 if the owner has no stored
+            data or it was never saved from a journal.
+        """
+        with self._session() as session:
+            seq = session.scalar(
+                select(OwnerRow.journal_seq).where(OwnerRow.owner == owner)
+            )
+        return seq or 0
+
+    def _subtask_loader(self, owner):
+        """This method returns a function that reads the subtasks of a task row."""
+
+        def loader(task):
+            with self._session() as session:
+                rows = session.execute(
+                    select(SubtaskRow)
+                    .where(SubtaskRow.owner == owner, SubtaskRow.task == task)
+                    .order_by(SubtaskRow.position)
+                ).scalars()
+                subtareas = []
+                for row in rows:
+                    subtarea = composite.Subtask(row.name)
+                    _restore(subtarea, row)
+                    subtareas.append(subtarea)
+                return subtareas
+
+        return loader
+
+    # pylint: disable= too-many-branches
+    def load_client(self, owner: str) -> Optional[cliente.ClientABC]:
+        """
+        This method builds the client of the owner from the database.
+
+        The subtasks are not read until each task needs them.
+
+        Args:
+            owner (str): The username of the client.
+
+        Returns:
+            ClientABC: A Client, or a PremiumDecorator for premium owners, or None
+            if the owner has no stored data.
+        """
+        with self._session() as session:
+            settings = session.get(OwnerRow, owner)
+            if settings is None:
+                return None
+            client = cliente.Client()
+            client.short_break = settings.short_break
+            client.long_break = settings.long_break
+            client.pomodoro_length = settings.pomodoro_length
+            client.long_break_after = settings.long_break_after
+
+            for row in session.execute(
+                select(PomodoroRow.day, PomodoroRow.minutes).where(
+                    PomodoroRow.owner == owner
+                )
+            ):
+                client.pomodoro_minutes[row.day] = row.minutes
+
+            loader = self._subtask_loader(owner)
+            tasks = {}
+            for row in session.execute(
+                select(TaskRow).where(TaskRow.owner == owner).order_by(TaskRow.position)
+            ).scalars():
+                task = LazyTask(row.name, loader, row.position)
+                _restore(task, row)
+                task.set_tags(composite.split_tags(row.tag))
+                tasks[row.position] = task
+                if row.listed:
+                    client.tasks.add(task)
+
+            # The counters are aggregated in the database so subtasks stay unloaded
+            for task, status, date_done, count in session.execute(
+                select(
+                    SubtaskRow.task,
+                    SubtaskRow.status,
+                    SubtaskRow.date_done,
+                    func.count(),
+                )
+                .where(SubtaskRow.owner == owner)
+                .group_by(SubtaskRow.task, SubtaskRow.status, SubtaskRow.date_done)
+            ):
+                # The task has no containers yet, so this only updates the task
+                if status:
+                    tasks[task].update_counters(count, count, {date_done: count})
+                else:
+                    tasks[task].update_counters(count, 0, {})
+
+            projects = {}
+            for row in session.execute(
+                select(ProjectRow)
+                .where(ProjectRow.owner == owner)
+                .order_by(ProjectRow.position)
+            ).scalars():
+                project = composite.Project(row.name)
+                _restore(project, row)
+                projects[row.name] = project
+                client.projects.add(project)
+            for project_name, task in session.execute(
+                select(ProjectTaskRow.project_name, ProjectTaskRow.task)
+                .where(ProjectTaskRow.owner == owner)
+                .order_by(ProjectTaskRow.project_name, ProjectTaskRow.position)
+            ):
+                projects[project_name].add_component(tasks[task])
+
+            for task in session.execute(
+                select(DoneTaskRow.task)
+                .where(DoneTaskRow.owner == owner)
+                .order_by(DoneTaskRow.position)
+            ).scalars():
+                client.done_tasks.append(tasks[task])
+                client.completions.add(tasks[task].date_done)
+
+            if settings.premium is False:
+                return client
+            client.premium = True
+            premium = cliente.PremiumDecorator(client)
+            folders = {}
+            for name in session.execute(
+                select(FolderRow.name)
+                .where(FolderRow.owner == owner)
+                .order_by(FolderRow.position)
+            ).scalars():
+                folder = composite.Folder(name)
+                folders[name] = folder
+                premium.folders.add(folder)
+            for folder_name, project_name in session.execute(
+                select(FolderProjectRow.folder_name, FolderProjectRow.project_name)
+                .where(FolderProjectRow.owner == owner)
+                .order_by(FolderProjectRow.folder_name, FolderProjectRow.position)
+            ):
+                folders[folder_name].add_project(projects[project_name])
+            return premium
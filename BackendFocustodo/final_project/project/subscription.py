@@ -1,37 +1,233 @@
 """
-This module contains the Subscription class, which allows to add and remove clients, 
+This module contains the Subscription class, which allows to add and remove clients,
 and get all the plans.
 Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@udistrital.edu.co>
 
 """
 
+import json
+from types import MappingProxyType
+from typing import NamedTuple
+
 
 # pylint: disable= too-few-public-methods
 # This class just represent the plans that could be created, it's a guide to create a plan
-class Plan:
-    """This class represents the plans that could be created."""
+class Plan(NamedTuple):
+    """This class represents the plans that could be created. A plan can't be changed."""
+
+    id_plan: int
+    name: str
+    price: float
+    description: str
+
+
+DEFAULT_PLANS = (
+    Plan(1, "Plan básico", 10000, "1 mes"),
+    Plan(2, "Plan anual", 30000, "12 meses"),
+)
+
+
+class PlanCatalog:
+    """
+    This class is the read-only catalog of plans, indexed by id_plan.
+
+    The catalog is built once and shared by every Subscription, so showing the
+    plans never creates them again, and a plan or its price is found in O(1).
+
+    Methods:
+        get(id_plan): Gets the plan with that id_plan.
+        get_price(id_plan): Gets the price of the plan with that id_plan.
+        from_file(path): Loads a catalog from a JSON file.
+    """
+
+    def __init__(self, plans=DEFAULT_PLANS):
+        """
+        Initializes a new instance of the PlanCatalog class.
+
+        Args:
+            plans (iterable): The plans, in the order they are shown.
+        """
+        by_id = {}
+        for plan in plans:
+            if plan.id_plan in by_id:
+                raise ValueError(f"Duplicated plan id {plan.id_plan}")
+            by_id[plan.id_plan] = plan
+        self.__by_id = MappingProxyType(by_id)
+        self.__plans = tuple(by_id.values())
+
+    @classmethod
+    def from_file(cls, path: str):
+        """
+        This method loads a catalog from a JSON list of plans.
+
+        Args:
+            path (str): A file with objects with id_plan, name, price and description.
+
+        Returns:
+            PlanCatalog: The catalog of the plans in the file.
+        """
+        with open(path, "r", encoding="UTF-8") as file:
+            return cls(Plan(**plan) for plan in json.load(file))
+
+    def __iter__(self):
+        return iter(self.__plans)
+
+    def __len__(self):
+        return len(self.__plans)
+
+    def __contains__(self, id_plan):
+        return id_plan in self.__by_id
+
+    @property
+    def plans(self) -> tuple:
+        """The plans in the order they are shown."""
+        return self.__plans
+
+    @property
+    def by_id(self):
+        """A read-only mapping from id_plan to plan."""
+        return self.__by_id
+
+    def get(self, id_plan: int):
+        """This method returns the plan with that id_plan, or None."""
+        return self.__by_id.get(id_plan)
+
+    def get_price(self, id_plan: int):
+        """This method returns the price of the plan with that id_plan, or None."""
+        plan = self.__by_id.get(id_plan)
+        return plan.price if plan is not None else None
+
+
+# Catálogo compartido por todas las suscripciones, se crea una sola vez
+_default_catalog = PlanCatalog()
+
+
+def get_default_catalog() -> PlanCatalog:
+    """This function returns the catalog shared by the whole application."""
+    return _default_catalog
+
+
+def load_default_catalog(path: str) -> PlanCatalog:
+    """This function replaces the shared catalog with the plans of a JSON file."""
+    global _default_catalog  # pylint: disable= global-statement
+    _default_catalog = PlanCatalog.from_file(path)
+    return _default_catalog
 
-    def __init__(self, id_plan: int, name: str, price: float, description: str):
-        self.id_plan = id_plan
-        self.name = name
-        self.price = price
-        self.description = description
+
+class SubscriptionRegistry:
+    """
+    This class keeps every known user and whether it is premium.
+
+    The number of clients and of premium clients are updated when a user is
+    registered, subscribes or cancels, so the clients report is built in O(1).
+
+    Methods:
+        register(username, premium): Adds a user to the registry.
+        subscribe(username): Makes the user premium.
+        cancel(username): Makes the user not premium.
+        is_premium(username): Returns if the user is premium.
+        count_clients(): Returns the number of users.
+        count_premium(): Returns the number of premium users.
+    """
+
+    def __init__(self):
+        self.__premium = {}  # username -> bool
+        self.__premium_count = 0
+
+    def __contains__(self, username):
+        return username in self.__premium
+
+    def __len__(self):
+        return len(self.__premium)
+
+    def register_all(self, users):
+        """This method registers (username, premium) pairs, e.g. the stored clients."""
+        for username, premium in users:
+            self.register(username, premium)
+
+    def register(self, username: str, premium: bool = False) -> bool:
+        """
+        This method adds a user to the registry.
+
+        Args:
+            username (str): The username.
+            premium (bool): If the user is already premium, e.g. a stored client.
+
+        Returns:
+            bool: False if the user was already registered.
+        """
+        new = username not in self.__premium
+        if new:
+            self.__premium[username] = False
+        if premium:
+            self.subscribe(username)
+        return new
+
+    def subscribe(self, username: str) -> bool:
+        """This method makes the user premium, False if it already was."""
+        if self.__premium.get(username) is True:
+            return False
+        self.__premium[username] = True
+        self.__premium_count += 1
+        return True
+
+    def cancel(self, username: str) -> bool:
+        """This method makes the user not premium, False if it wasn't premium."""
+        if self.__premium.get(username) is not True:
+            return False
+        self.__premium[username] = False
+        self.__premium_count -= 1
+        return True
+
+    def is_premium(self, username: str) -> bool:
+        """This method returns if the user is premium."""
+        return self.__premium.get(username, False)
+
+    def count_clients(self) -> int:
+        """This method returns the number of registered users."""
+        return len(self.__premium)
+
+    def count_premium(self) -> int:
+        """This method returns the number of premium users."""
+        return self.__premium_count
+
+
+# Registro compartido por todas las suscripciones del proceso
+_default_registry = SubscriptionRegistry()
+
+
+def get_default_registry() -> SubscriptionRegistry:
+    """This function returns the registry shared by the whole application."""
+    return _default_registry
 
 
 class Subscription:
     """This class represents the Subscription class, which allows the Admin to add and
     remove clients, and get all the plans."""
 
-    def __init__(self, username: str):
+    def __init__(
+        self,
+        username: str,
+        registry: SubscriptionRegistry = None,
+        catalog: PlanCatalog = None,
+        premium: bool = False,
+    ):
         self.username = username
-        self.clients = []
-        self.plans = []
+        self.clients = set()
+        self.catalog = catalog if catalog is not None else _default_catalog
+        self.plans = self.catalog.plans
+        self.registry = registry if registry is not None else _default_registry
+        self.registry.register(username, premium)
+        # Un cliente premium restaurado ya pagó, no se le cobra de nuevo
+        if premium:
+            self.clients.add(username)
 
     def add_client(self):
         """This method allows the Admin to add a client."""
         if self.username in self.clients:  # Verificar si el cliente ya está registrado
             return False
-        self.clients.append(self.username)
+        self.clients.add(self.username)
+        self.registry.subscribe(self.username)
         return True
 
     def get_clients(self):
@@ -42,18 +238,22 @@ class Subscription:
     def remove_client(self):
         """This method allows the Admin to remove a client."""
         self.clients.remove(self.username)
+        self.registry.cancel(self.username)
 
     def set_plans(self):
-        """This method allows to create a plan."""
-        # Agregar planes default
-        plan = Plan(1, "Plan básico", 10000, "1 mes")
-        plan2 = Plan(2, "Plan anual", 30000, "12 meses")
-        self.plans.append(plan)
-        self.plans.append(plan2)
+        """This method sets the plans of the catalog, it can be called many times."""
+        self.plans = self.catalog.plans
+
+    def get_plan(self, id_plan: int):
+        """This method returns the plan with that id_plan, or None."""
+        return self.catalog.get(id_plan)
+
+    def get_price(self, id_plan: int):
+        """This method returns the price of the plan with that id_plan, or None."""
+        return self.catalog.get_price(id_plan)
 
     def get_plans(self):
         """This method shows all the plans."""
-        self.set_plans()
         for plan in self.plans:
             print(
                 f"Plan: {plan.name} - Precio: {plan.price} - Descripción: {plan.description}"
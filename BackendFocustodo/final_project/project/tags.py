@@ -0,0 +1,166 @@
+"""
+This module contains the TagIndex class, which indexes the tasks of a client by
+their tags, so the tasks with a tag are listed and counted without walking every
+task.
+Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@udistrital.edu.co>
+"""
+
+
+class TagIndex:
+    """
+    This class keeps the tasks of every tag, in the order they got the tag.
+
+    A task is indexed under all the tags returned by its get_tags() method, so
+    the tasks without tags are under DEFAULT_TAG. After the tags of a task change,
+    retag() moves it to its new tags. The pending tasks of every tag are also kept
+    apart, so after a task is set as done refresh() must be called with it.
+
+    Methods:
+        add(task): Indexes a task under its tags.
+        remove(task): Removes a task from the index.
+        retag(task, old_tags): Updates the tags of an indexed task.
+        refresh(task): Updates the pending tasks after the status of a task changed.
+        tasks(tag): Gets the tasks with a tag.
+        count(tag, pending): Gets the number of tasks with a tag.
+        counts(): Gets the number of tasks and pending tasks of every tag.
+        clear(): Removes all the tasks.
+    """
+
+    __slots__ = ("_tasks", "_pending")
+
+    def __init__(self, tasks=None):
+        """
+        Initializes a new instance of the TagIndex class.
+
+        Args:
+            tasks (iterable): Optional tasks to be indexed.
+        """
+        # tag -> {task name -> task}
+        self._tasks = {}
+        # tag -> {task name -> task}, only the pending tasks
+        self._pending = {}
+        for task in tasks or ():
+            self.add(task)
+
+    def __contains__(self, tag):
+        return tag in self._tasks
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def add(self, task):
+        """This method indexes a task under its tags."""
+        name = task.get_name()
+        for tag in task.get_tags():
+            self._add(tag, name, task)
+
+    def _add(self, tag, name, task):
+        self._tasks.setdefault(tag, {})[name] = task
+        pending = self._pending.setdefault(tag, {})
+        if task.status is False:
+            pending[name] = task
+
+    def remove(self, task, tags=None):
+        """
+        This method removes a task from the index.
+
+        Args:
+            task (Task): The task to be removed.
+            tags (iterable): The tags to remove it from, its current tags by default.
+        """
+        name = task.get_name()
+        for tag in task.get_tags() if tags is None else tags:
+            tasks = self._tasks.get(tag)
+            if tasks is not None and tasks.get(name) is task:
+                del tasks[name]
+                self._pending[tag].pop(name, None)
+                if not tasks:
+                    del self._tasks[tag]
+                    del self._pending[tag]
+
+    def retag(self, task, old_tags):
+        """
+        This method updates the tags of an indexed task.
+
+        The task keeps its position in the tags it still has.
+
+        Args:
+            task (Task): The task whose tags changed.
+            old_tags (tuple): The result of task.get_tags() before the change.
+        """
+        new_tags = task.get_tags()
+        self.remove(task, [tag for tag in old_tags if tag not in new_tags])
+        name = task.get_name()
+        for tag in new_tags:
+            if tag not in old_tags:
+                self._add(tag, name, task)
+
+    def refresh(self, task):
+        """
+        This method updates the pending tasks of the tags of an indexed task.
+
+        Args:
+            task (Task): The task whose status changed, e.g. it was set as done.
+        """
+        name = task.get_name()
+        for tag in task.get_tags():
+            tasks = self._tasks.get(tag)
+            if tasks is None or tasks.get(name) is not task:
+                continue
+            if task.status is False:
+                self._pending[tag][name] = task
+            else:
+                self._pending[tag].pop(name, None)
+
+    def tasks(self, tag: str, pending: bool = None) -> list:
+        """
+        This method returns the tasks with a tag.
+
+        Args:
+            tag (str): The tag of the tasks.
+            pending (bool): True for the pending tasks only, False for the done
+                tasks only, all of them by default.
+
+        Returns:
+            list: The tasks, in the order they got the tag.
+        """
+        if pending is True:
+            return list(self._pending.get(tag, {}).values())
+        tasks = self._tasks.get(tag, {}).values()
+        if pending is None:
+            return list(tasks)
+        return [task for task in tasks if task.status is True]
+
+    def count(self, tag: str, pending: bool = None) -> int:
+        """
+        This method returns the number of tasks with a tag.
+
+        Args:
+            tag (str): The tag of the tasks.
+            pending (bool): Counts only the pending or the done tasks.
+
+        Returns:
+            int: The number of tasks.
+        """
+        total = len(self._tasks.get(tag, ()))
+        if pending is None:
+            return total
+        pending_count = len(self._pending.get(tag, ()))
+        return pending_count if pending else total - pending_count
+
+    def counts(self) -> dict:
+        """
+        This method returns the counters of every tag.
+
+        Returns:
+            dict: The tags, sorted, with a (pending tasks, total tasks) tuple.
+        """
+        return {
+            tag: (len(self._pending[tag]), len(tasks))
+            for tag, tasks in sorted(self._tasks.items())
+        }
+
+    def clear(self):
+        """This method removes all the tasks from the index."""
+        self._tasks.clear()
+        self._pending.clear()
@@ -0,0 +1,295 @@
+"""
+This module imports and exports the whole tree of a client (tasks, subtasks,
+projects and folders) as NDJSON or CSV. Both directions work with generators, one
+record at a time, so big exports are never built in memory.
+Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@udistrital.edu.co>
+"""
+
+# pylint: disable= import-error
+import csv
+import datetime
+import io
+import json
+from project import composite
+
+# Every record has the same fields, so NDJSON and CSV share the format:
+#   task            name, status, tag (all the tags), date, date_done, listed,
+#                   task_id, done_position (its place in done_tasks, if it is there)
+#   subtask         name, parent (task), status, date, date_done, task_id
+#   project         name, status, date, date_done
+#   project_task    name (task), parent (project), task_id
+#   folder          name
+#   folder_project  name (project), parent (folder)
+# A deleted task can have the name of a listed one, so the records of the tasks
+# reference them by task_id; files without it are read by name.
+FIELDS = (
+    "type",
+    "name",
+    "parent",
+    "status",
+    "tag",
+    "date",
+    "date_done",
+    "listed",
+    "task_id",
+    "done_position",
+)
+
+
+def _component_record(record_type, component, parent=None):
+    """This function returns the record of a task, subtask or project."""
+    return {
+        "type": record_type,
+        "name": component.get_name(),
+        "parent": parent,
+        "status": component.status,
+        "tag": None,
+        "date": component.date.isoformat(),
+        "date_done": component.date_done.isoformat() if component.date_done else None,
+        "listed": None,
+        "task_id": None,
+        "done_position": None,
+    }
+
+
+def _link_record(record_type, name, parent):
+    """This function returns the record of an item added to a container."""
+    return dict.fromkeys(FIELDS) | {"type": record_type, "name": name, "parent": parent}
+
+
+def iter_records(client):
+    """
+    This function yields the records of the tree of a client.
+
+    The tasks come first, each one followed by its subtasks, then the projects and
+    their tasks and then the folders and their projects, so every record only
+    references items that were already yielded.
+
+    Args:
+        client (ClientABC): A Client or a PremiumDecorator.
+
+    Yields:
+        dict: One record with the FIELDS keys.
+    """
+    # Tasks deleted from the client can still be in a project or in done_tasks,
+    # so they are identified by object and not by name
+    tasks = {id(task): task for task in client.tasks}
+    listed = len(tasks)
+    for project in client.projects:
+        for task in project.tasks:
+            tasks.setdefault(id(task), task)
+    for task in client.done_tasks:
+        tasks.setdefault(id(task), task)
+    task_ids = {key: task_id for task_id, key in enumerate(tasks)}
+    done_positions = {
+        id(task): position for position, task in enumerate(client.done_tasks)
+    }
+
+    for task_id, task in enumerate(tasks.values()):
+        record = _component_record("task", task)
+        record["tag"] = composite.join_tags(task.get_tags())
+        record["listed"] = task_id < listed
+        record["task_id"] = task_id
+        record["done_position"] = done_positions.get(id(task))
+        yield record
+        for subtask in task.subtasks:
+            record = _component_record("subtask", subtask, task.get_name())
+            record["task_id"] = task_id
+            yield record
+    for project in client.projects:
+        yield _component_record("project", project)
+        for task in project.tasks:
+            record = _link_record("project_task", task.get_name(), project.get_name())
+            record["task_id"] = task_ids[id(task)]
+            yield record
+    for folder in getattr(client, "folders", ()):
+        yield _link_record("folder", folder.get_name(), None)
+        for project in folder.projects:
+            # Only the projects of the client are exported, as in the repository
+            if client.projects.get(project.get_name()) is project:
+                yield _link_record(
+                    "folder_project", project.get_name(), folder.get_name()
+                )
+
+
+def iter_ndjson(client):
+    """This function yields the records of a client as NDJSON lines."""
+    for record in iter_records(client):
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def iter_csv(client):
+    """This function yields the records of a client as CSV lines, header first."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+    writer.writeheader()
+    for record in iter_records(client):
+        writer.writerow(record)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_ndjson(client, file):
+    """This function writes the tree of a client to a text file as NDJSON."""
+    file.writelines(iter_ndjson(client))
+
+
+def export_csv(client, file):
+    """This function writes the tree of a client to a text file as CSV."""
+    file.writelines(iter_csv(client))
+
+
+def read_ndjson(file):
+    """This function yields the records of an NDJSON text file."""
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_csv(file):
+    """This function yields the records of a CSV text file."""
+    for row in csv.DictReader(file):
+        yield {field: (value if value != "" else None) for field, value in row.items()}
+
+
+def _parse_bool(value):
+    """This function reads a bool written as JSON or as CSV text."""
+    if isinstance(value, str):
+        return value == "True"
+    return bool(value)
+
+
+def _parse_date(value):
+    """This function reads an ISO date, or None."""
+    return datetime.date.fromisoformat(value) if value else None
+
+
+def _task_key(record, name):
+    """This function returns the key of the task of a record, its task_id or name."""
+    task_id = record.get("task_id")
+    return name if task_id is None else int(task_id)
+
+
+def _restore(component, record):
+    """This function copies the status and dates of a record to a component."""
+    component.status = _parse_bool(record["status"])
+    component.date = _parse_date(record["date"]) or component.date
+    component.date_done = _parse_date(record.get("date_done"))
+
+
+# pylint: disable= too-many-branches, too-many-locals, too-many-statements
+def import_records(
+    client, records, batch_size: int = 1000, count_completions: bool = True
+) -> dict:
+    """
+    This function adds the records to the tree of a client.
+
+    The new tasks are added to the client index in batches. Items whose name
+    already exists in the client are skipped with their subtasks, and folders are
+    skipped for clients that are not premium. The tasks that were in done_tasks
+    are added to it again in the same order.
+
+    Args:
+        client (ClientABC): A Client or a PremiumDecorator.
+        records (iterable): Records with the FIELDS keys, e.g. from read_ndjson.
+        batch_size (int): The number of tasks added to the index at a time.
+        count_completions (bool): If the done tasks are counted in the
+            completions of the client, False when they are restored apart.
+
+    Returns:
+        dict: The number of imported and skipped records per type.
+    """
+    counts = {"skipped": 0}
+    folders = getattr(client, "folders", None)
+    # Items created by this import, the tasks by task_id or name
+    tasks = {}
+    listed_names = set()
+    projects = {}
+    new_folders = {}
+    batch = []
+    done = []
+
+    for record in records:
+        record_type = record["type"]
+        imported = False
+        if record_type == "task":
+            name = record["name"]
+            listed = record.get("listed") is None or _parse_bool(record["listed"])
+            # A deleted task is imported along with a listed task of the same name
+            if listed:
+                new = name not in client.tasks and name not in listed_names
+            else:
+                new = name not in client.tasks or name in listed_names
+            if new:
+                task = composite.Task(name)
+                _restore(task, record)
+                task.set_tags(composite.split_tags(record.get("tag")))
+                tasks[_task_key(record, name)] = task
+                # Files without done_position count every done task
+                if "done_position" not in record:
+                    position = len(done) if task.status is True else None
+                else:
+                    position = record["done_position"]
+                if position is not None:
+                    done.append((int(position), len(done), task))
+                if listed:
+                    listed_names.add(name)
+                    batch.append(task)
+                    if len(batch) >= batch_size:
+                        client.tasks.add_many(batch)
+                        batch.clear()
+                imported = True
+        elif record_type == "subtask":
+            task = tasks.get(_task_key(record, record["parent"]))
+            if task is not None:
+                subtask = composite.Subtask(record["name"])
+                _restore(subtask, record)
+                imported = task.add_component(subtask)
+        elif record_type == "project":
+            if record["name"] not in client.projects:
+                project = composite.Project(record["name"])
+                _restore(project, record)
+                imported = client.projects.add(project)
+                projects[project.get_name()] = project
+        elif record_type == "project_task":
+            project = projects.get(record["parent"])
+            task = tasks.get(_task_key(record, record["name"])) or client.tasks.get(
+                record["name"]
+            )
+            if project is not None and task is not None:
+                imported = project.add_component(task)
+        elif record_type == "folder":
+            if folders is not None and record["name"] not in folders:
+                folder = composite.Folder(record["name"])
+                imported = folders.add(folder)
+                new_folders[folder.get_name()] = folder
+        elif record_type == "folder_project":
+            folder = new_folders.get(record["parent"])
+            project = client.projects.get(record["name"])
+            if folder is not None and project is not None:
+                imported = folder.add_project(project)
+        if imported:
+            counts[record_type] = counts.get(record_type, 0) + 1
+        else:
+            counts["skipped"] += 1
+    client.tasks.add_many(batch)
+    for _, _, task in sorted(done, key=lambda item: item[:2]):
+        client.done_tasks.append(task)
+        if count_completions:
+            client.completions.add(task.date_done)
+    # Los elementos importados no pasaron por el índice de búsqueda
+    client.reindex()
+    return counts
+
+
+def import_ndjson(client, file, batch_size: int = 1000) -> dict:
+    """This function adds the tree stored in an NDJSON text file to a client."""
+    return import_records(client, read_ndjson(file), batch_size)
+
+
+def import_csv(client, file, batch_size: int = 1000) -> dict:
+    """This function adds the tree stored in a CSV text file to a client."""
+    return import_records(client, read_csv(file), batch_size)
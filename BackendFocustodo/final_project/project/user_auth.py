@@ -3,7 +3,10 @@ This module contains the User class. This class is used to represent the user in
 Authors: Andres Acevedo <ajacevedoa@udistrital.edu.co> Javier Murcia <jmurcian@udistrital.edu.co>
 """
 
+import hashlib
+import hmac
 import json
+import os
 
 
 class User:
@@ -22,27 +25,114 @@ class User:
         return self.__grants[grant]
 
 
+def hash_password(password: str, salt: bytes = None, iterations: int = 100_000):
+    """
+    This function returns the salted hash of a password.
+
+    Args:
+        password (str): The password to be hashed.
+        salt (bytes): The salt, a random one by default.
+        iterations (int): The number of PBKDF2 iterations.
+
+    Returns:
+        tuple: The salt and the hash.
+    """
+    if salt is None:
+        salt = os.urandom(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("UTF-8"), salt, iterations)
+    return salt, digest
+
+
+class CredentialStore:
+    """
+    This class keeps the users file in memory, indexed by username.
+
+    The file is only read again when its modification time changes. Passwords are
+    kept as salted hashes: entries with "salt" and "password_hash" (hex), and
+    optionally "iterations", are used as they are, and plaintext "password" entries
+    are hashed the first time their user is verified, so reloading a file with
+    many plaintext users doesn't hash all of them.
+    """
+
+    def __init__(self, path: str = "final_project/users.json", iterations=100_000):
+        self.path = path
+        self.iterations = iterations
+        self.__mtime = None
+        self.__users = {}
+        self.__dummy = None
+
+    def __refresh(self):
+        """This method reloads the users file if it changed."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None  # Sin fecha de modificación no se puede usar la caché
+        if mtime is not None and mtime == self.__mtime:
+            return
+        with open(self.path, "r", encoding="UTF-8") as file:
+            users = json.load(file)
+
+        indexed = {}
+        for user in users:
+            if "password_hash" in user:
+                salt = bytes.fromhex(user["salt"])
+                digest = bytes.fromhex(user["password_hash"])
+                iterations = user.get("iterations", self.iterations)
+            else:
+                # Sin sal, la contraseña aún está en texto plano
+                salt, digest = None, user["password"]
+                iterations = self.iterations
+            indexed[user["username"]] = (salt, digest, iterations, user["grants"])
+        self.__users = indexed
+        self.__mtime = mtime
+
+    def verify(self, username: str, password: str):
+        """
+        This method validates the user credentials.
+
+        Args:
+            username (str): The username.
+            password (str): The password in plaintext.
+
+        Returns:
+            dict: The grants of the user, or None if the credentials are invalid.
+        """
+        self.__refresh()
+        entry = self.__users.get(username)
+        if entry is None:
+            # Unknown usernames are hashed too, so they take the same time
+            if self.__dummy is None:
+                self.__dummy = hash_password("", iterations=self.iterations)
+            entry = (*self.__dummy, self.iterations, None)
+        salt, digest, iterations, grants = entry
+        if salt is None:
+            salt, digest = hash_password(digest, iterations=iterations)
+            self.__users[username] = (salt, digest, iterations, grants)
+        _, candidate = hash_password(password, salt, iterations)
+        if hmac.compare_digest(candidate, digest) and grants is not None:
+            return grants
+        return None
+
+
+_default_store = CredentialStore()
+
+
 class Authentication:
     """This class is used to validate users authentication."""
 
-    def __init__(self, username: str, password: str):
+    def __init__(self, username: str, password: str, store: CredentialStore = None):
         self.__username = username
         self.__password = password
         self.__grants = None
+        self.__store = store if store is not None else _default_store
 
     def authenticate(self) -> bool:
         """This method validates the user credentials."""
-        with open("final_project/users.json", "r", encoding="UTF-8") as file:
-            users = json.load(file)
-
-        for user in users:
-            if (
-                user["username"] == self.__username
-                and user["password"] == self.__password
-            ):
-                self.__grants = user["grants"]
-                return True
-        return False
+        grants = self.__store.verify(self.__username, self.__password)
+        if grants is None:
+            return False
+        self.__grants = grants
+        return True
 
     def userdata(self) -> User:
         """This method returns the user data."""
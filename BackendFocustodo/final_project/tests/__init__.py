@@ -1,13 +1,39 @@
+import asyncio
+import importlib
+import json
+import os
+import queue
 import sys
+import tempfile
+import threading
+import time
 import unittest
-from datetime import datetime, timedelta
+import datetime
+from datetime import timedelta
 
-from project.user_auth import Authentication, User
-from project.subscription import Subscription
+from project.user_auth import Authentication, CredentialStore, User, hash_password
+from project.subscription import PlanCatalog, Subscription, SubscriptionRegistry
 from project.report_factory import ClientsReport, ReportFactory, TasksReport
-from project.pomodoro import Pomodoro
+from project.pomodoro import LONG_BREAK, SHORT_BREAK, Pomodoro, PomodoroScheduler
 from project.composite import Component, Folder, Project, Subtask, Task
-from project.notification import Notification
+from project.notification import (
+    FileSink,
+    Notification,
+    NotificationDispatcher,
+    WebhookSink,
+)
+from project.client import Client, PremiumDecorator
+from project.registry import NameRegistry
+from project.completions import CompletionIndex
+from project.analytics import AnalyticsReport
+from benchmarks import hotpaths, memory, startup
+from project.storage import LazyTask, Repository
+from project.api import Sessions, create_app
+from project.sessions import SessionManager
+from project.concurrency import ReadWriteLock, ThreadSafeClient
+from project import cli, composite, journal, lazy, renderer, search, transfer
+from project import client as cliente
+from fastapi.testclient import TestClient as HttpClient
 from io import StringIO
 from unittest.mock import mock_open, patch, Mock
 
@@ -49,6 +75,32 @@ class TestComponentes(unittest.TestCase):
         self.assertEqual(len(self.folder1.projects), 1)
         proyecto_encontrado = self.folder1.get_project("Project 1")
         self.assertEqual(proyecto_encontrado.get_name(), "Project 1")
+        self.assertFalse(self.folder1.add_project(Project("Project 1")))
+        self.assertIs(self.folder1.remove_project("Project 1"), self.project1)
+        self.assertIsNone(self.folder1.get_project("Project 1"))
+
+    def test_slots(self):
+        for component in (self.subtask1, self.task1, self.project1, self.folder1):
+            self.assertFalse(hasattr(component, "__dict__"))
+        self.task1.add_component(self.subtask1)
+        self.task1.add_component(self.subtask2)
+        self.assertIs(self.subtask1.parents, self.subtask2.parents)
+        self.assertEqual(self.subtask1.get_total_count(), 0)
+
+    def test_get_and_remove_component(self):
+        self.task1.add_component(self.subtask1)
+        self.task1.add_component(self.subtask2)
+        self.assertFalse(self.task1.add_component(Subtask("Subtask 1")))
+        self.assertIs(self.task1.get_component("Subtask 2"), self.subtask2)
+        self.assertTrue(self.task1.remove_component("Subtask 1"))
+        self.assertFalse(self.task1.remove_component("Subtask 1"))
+        self.assertEqual([sub.get_name() for sub in self.task1.subtasks], ["Subtask 2"])
+
+        self.project1.add_component(self.task1)
+        self.project1.add_component(self.task2)
+        self.assertIs(self.project1.get_component("Task 2"), self.task2)
+        self.assertIs(self.project1.remove_component("Task 1"), self.task1)
+        self.assertIsNone(self.project1.get_component("Task 1"))
 
     def test_dates(self):
         fecha_actual = datetime.datetime.now().date()
@@ -60,6 +112,37 @@ class TestComponentes(unittest.TestCase):
         self.task1.set_as_done()
         self.assertEqual(self.task1.date_done, fecha_actual)
 
+    def test_completion_counters(self):
+        self.task1.add_component(self.subtask1)
+        self.task1.add_component(self.subtask2)
+        self.project1.add_component(self.task1)
+        self.project1.add_component(self.task2)
+        self.folder1.add_project(self.project1)
+        self.assertEqual(self.project1.get_total_count(), 4)
+        self.assertEqual(self.folder1.get_total_count(), 5)
+        self.assertEqual(self.folder1.get_done_count(), 0)
+
+        self.subtask1.set_as_done()
+        self.assertEqual(self.task1.get_done_count(), 1)
+        self.assertEqual(self.project1.get_done_count(), 1)
+        self.assertEqual(self.folder1.get_done_count(), 1)
+        self.assertEqual(self.task1.get_progress(), 0.5)
+
+        self.task1.set_as_done()
+        self.assertEqual(self.project1.get_done_count(), 3)
+        today = datetime.datetime.now().date()
+        self.assertEqual(self.folder1.done_dates, {today: 3})
+
+        self.project1.remove_component("Task 1")
+        self.assertEqual(self.project1.get_total_count(), 1)
+        self.assertEqual(self.folder1.get_total_count(), 2)
+        self.assertEqual(self.folder1.get_done_count(), 0)
+        self.assertEqual(self.folder1.done_dates, {})
+        self.assertEqual(self.task1.parents, ())
+
+        self.project1.set_as_done()
+        self.assertEqual(self.folder1.get_progress(), 1.0)
+
 
 class TestNotification(unittest.TestCase):
     def setUp(self):
@@ -75,6 +158,116 @@ class TestNotification(unittest.TestCase):
         self.assertEqual(captured_output.getvalue(), expected_output)
 
 
+class TestNotificationDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.sink = WebhookSink()
+        self.dispatcher = NotificationDispatcher([self.sink], maxsize=2)
+
+    def tearDown(self):
+        self.dispatcher.shutdown()
+
+    def messages(self):
+        return [json.loads(body)["message"] for body in self.sink.sent]
+
+    def test_notification_uses_dispatcher(self):
+        Notification("usuario_test", self.dispatcher).show_notification("Hola")
+        self.dispatcher.start().join()
+        self.assertEqual(
+            self.sink.sent,
+            [json.dumps({"username": "usuario_test", "message": "Hola"})],
+        )
+
+    def test_duplicates_are_coalesced(self):
+        for _ in range(3):
+            self.assertTrue(self.dispatcher.submit("usuario_test", "Time's up!"))
+        self.dispatcher.start().join()
+        self.assertEqual(self.messages(), ["Time's up! (x3)"])
+        stats = self.dispatcher.stats()
+        self.assertEqual(stats["submitted"], 3)
+        self.assertEqual(stats["coalesced"], 2)
+        self.assertEqual(stats["delivered"], 1)
+
+    def test_full_queue_drops(self):
+        self.assertTrue(self.dispatcher.submit("usuario_test", "1"))
+        self.assertTrue(self.dispatcher.submit("usuario_test", "2"))
+        self.assertFalse(self.dispatcher.submit("usuario_test", "3"))
+        self.dispatcher.start().join()
+        self.assertEqual(sorted(self.messages()), ["1", "2"])
+        stats = self.dispatcher.stats()
+        self.assertEqual(stats["dropped"], 1)
+        self.assertEqual(stats["max_queue_size"], 2)
+        self.assertEqual(stats["queue_size"], 0)
+
+    def test_duplicate_of_a_dropped_notification(self):
+        queued = self.dispatcher._NotificationDispatcher__queue
+        put = queued.put
+        duplicates, threads = [], []
+
+        def full_once(item, block=True, timeout=None):
+            # El duplicado llega mientras la cola está llena
+            queued.put = put
+            thread = threading.Thread(
+                target=lambda: duplicates.append(
+                    self.dispatcher.submit("usuario_test", "Hola")
+                )
+            )
+            thread.start()
+            thread.join(0.2)
+            threads.append(thread)
+            raise queue.Full
+
+        queued.put = full_once
+        self.assertFalse(self.dispatcher.submit("usuario_test", "Hola"))
+        threads[0].join()
+        self.assertEqual(duplicates, [True])
+        self.dispatcher.start().join()
+        self.assertEqual(self.messages(), ["Hola"])
+        self.assertEqual(self.dispatcher.stats()["dropped"], 1)
+
+    def test_delivery_keeps_the_order(self):
+        messages = []
+
+        def send(username, message):
+            # Los mensajes impares tardan más, como una consola ocupada
+            time.sleep(0.002 * (int(message) % 2))
+            messages.append(message)
+
+        dispatcher = NotificationDispatcher([Mock(send=send)]).start()
+        for number in range(20):
+            dispatcher.submit("usuario_test", str(number))
+        dispatcher.shutdown()
+        self.assertEqual(messages, [str(number) for number in range(20)])
+
+    def test_failing_sink_does_not_stop_the_others(self):
+        broken = Mock()
+        broken.send.side_effect = OSError("sin conexión")
+        self.dispatcher.sinks.insert(0, broken)
+        self.dispatcher.start()
+        self.dispatcher.submit("usuario_test", "Hola")
+        self.dispatcher.join()
+        self.assertEqual(self.messages(), ["Hola"])
+        self.assertEqual(self.dispatcher.stats()["failed"], 1)
+
+    def test_file_sink(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "notifications.log")
+            dispatcher = NotificationDispatcher([FileSink(path)], workers=3).start()
+            for number in range(20):
+                dispatcher.submit("usuario_test", f"Mensaje {number}")
+            dispatcher.shutdown()
+            with open(path, encoding="UTF-8") as file:
+                lines = file.read().splitlines()
+        messages = {line.split(" usuario_test: ")[1] for line in lines}
+        self.assertEqual(messages, {f"Mensaje {number}" for number in range(20)})
+
+    def test_client_send_notification(self):
+        client = Client()
+        client.user = "usuario_test"
+        client.send_notification("Hola", self.dispatcher)
+        self.dispatcher.start().join()
+        self.assertEqual(self.messages(), ["Hola"])
+
+
 class TestPomodoro(unittest.TestCase):
     def setUp(self):
         self.short_break = 1
@@ -89,21 +282,106 @@ class TestPomodoro(unittest.TestCase):
             self.long_break_after,
         )
 
+    @patch.object(Pomodoro, "countdown")
     @patch("builtins.input", side_effect=["1", "0"])
     @patch("builtins.print")
-    def test_start_pomodoro(self, mock_print, mock_input):
+    def test_start_pomodoro(self, mock_print, mock_input, mock_countdown):
         self.pomodoro.start_pomodoro(self.notification)
+        mock_countdown.assert_called_with(60)
         self.notification.show_notification.assert_called_with("\nTime's up!")
 
-    @patch("time.sleep")
-    def test_countdown(self, mock_sleep):
-        duration = 60
-        self.pomodoro.countdown(duration)
-        mock_sleep.assert_called_with(0.1)
+    @patch("builtins.print")
+    def test_countdown(self, mock_print):
+        now = [0.0]
 
+        def sleep(seconds):
+            # Cada espera despierta tarde
+            now[0] += seconds + 0.3
 
-import datetime
-from unittest.mock import Mock
+        with patch("time.monotonic", lambda: now[0]), patch(
+            "time.sleep", side_effect=sleep
+        ):
+            self.pomodoro.countdown(3)
+        self.assertLess(now[0], 3.5)
+        self.assertEqual(self.pomodoro.seconds, 0)
+        printed = [call.args[0] for call in mock_print.call_args_list]
+        self.assertEqual(printed, ["00:03", "00:02", "00:01", "00:00"])
+
+
+class TestPomodoroScheduler(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.scheduler = PomodoroScheduler(clock=lambda: self.now)
+        self.notification = Mock()
+
+    def test_phases(self):
+        session = self.scheduler.start("user", self.notification, 25, 5, 15, 2)
+        self.now = 60
+        self.assertEqual(self.scheduler.remaining("user"), 24 * 60)
+        self.assertEqual(self.scheduler.run_pending(), 0)
+        self.now = 25 * 60
+        self.assertEqual(self.scheduler.run_pending(), 1)
+        self.assertEqual(session.phase, SHORT_BREAK)
+        self.notification.show_notification.assert_called_with(
+            "Time's up! It's time for a short break of 5 minutes."
+        )
+        # A late wake-up catches up without moving the following deadlines
+        self.now = 60 * 60
+        self.assertEqual(self.scheduler.run_pending(), 2)
+        self.assertEqual(session.phase, LONG_BREAK)
+        self.assertEqual(session.deadline, 70 * 60)
+
+    def test_rounds_and_stop(self):
+        self.scheduler.start("user 1", self.notification, 1, 1, 1, 4, rounds=1)
+        self.scheduler.start("user 2", self.notification, 1, 1, 1, 4)
+        self.assertTrue(self.scheduler.stop("user 2"))
+        self.assertFalse(self.scheduler.stop("user 2"))
+        self.now = 60
+        self.assertEqual(self.scheduler.run_pending(), 1)
+        self.notification.show_notification.assert_called_once_with("Time's up!")
+        self.assertEqual(len(self.scheduler), 0)
+
+    def test_many_sessions(self):
+        for user in range(5000):
+            self.scheduler.start(user, self.notification, 25, 5, 15, 4)
+        self.now = 25 * 60
+        self.assertEqual(self.scheduler.run_pending(), 5000)
+        self.assertEqual(self.scheduler.next_deadline(), 30 * 60)
+
+    def test_failing_notification_does_not_stop_the_others(self):
+        broken = Mock()
+        broken.show_notification.side_effect = OSError("sin consola")
+        self.scheduler.start("user 1", broken, 1, 1, 1, 4)
+        self.scheduler.start("user 2", self.notification, 1, 1, 1, 4)
+        self.now = 60
+        with self.assertLogs("project.pomodoro", "ERROR"):
+            self.assertEqual(self.scheduler.run_pending(), 2)
+        self.notification.show_notification.assert_called_once()
+        self.assertEqual(len(self.scheduler), 2)
+
+    def test_completed_pomodoros(self):
+        completed = Mock()
+        session = self.scheduler.start(
+            "user", self.notification, 25, 5, 15, 4, rounds=2, on_pomodoro=completed
+        )
+        self.now = 30 * 60
+        self.assertEqual(self.scheduler.run_pending(), 2)
+        completed.assert_called_once_with(session)
+        self.now = 55 * 60
+        self.assertEqual(self.scheduler.run_pending(), 1)
+        self.assertEqual(completed.call_count, 2)
+
+    def test_background_thread(self):
+        scheduler = PomodoroScheduler()
+        notification = Mock()
+        scheduler.start_thread()
+        Pomodoro(1, 1, 0.001, 4).schedule(scheduler, "user", notification, rounds=1)
+        for _ in range(100):
+            if notification.show_notification.called:
+                break
+            time.sleep(0.01)
+        scheduler.shutdown()
+        notification.show_notification.assert_called_once_with("Time's up!")
 
 
 class TestReport(unittest.TestCase):
@@ -127,6 +405,43 @@ class TestReport(unittest.TestCase):
         self.assertIn(f"Weekly completed tasks: 2", report_content)
         self.assertIn(f"Total completed tasks: 3", report_content)
 
+    def test_tasks_report_streaming(self):
+        today = datetime.date(2024, 6, 10)
+        dates = (today - datetime.timedelta(days=day % 30) for day in range(3000))
+        summary = TasksReport(self.report_type, dates, today).get_summary()
+        self.assertEqual(summary.total_completed_tasks, 3000)
+        self.assertEqual(summary.weekly_completed_tasks, 800)
+        self.assertEqual(summary.today_completed_tasks, 100)
+        self.assertEqual(summary.to_dict()["date"], "2024-06-10")
+
+    def test_analytics_report(self):
+        today = datetime.date(2024, 6, 10)  # Monday
+        tasks = []
+        for day in [0, 1, 2, 5, 6, 7, 8]:
+            task = Task(f"Task {day}")
+            task.status = True
+            task.date_done = today - datetime.timedelta(days=day)
+            task.set_tag("Work" if day % 2 else "Home")
+            tasks.append(task)
+        tasks.append(Task("Pending"))
+        minutes = {today: 50, today - datetime.timedelta(days=1): 25}
+        report = ReportFactory().create_report(
+            "Analytics", tasks, pomodoro_minutes=minutes, today=today
+        )
+        self.assertIsInstance(report, AnalyticsReport)
+        summary = report.get_summary()
+        self.assertEqual(summary["completed_tasks"], 7)
+        self.assertEqual(summary["current_streak"], 3)
+        self.assertEqual(summary["longest_streak"], 4)
+        self.assertEqual(summary["weekday_distribution"]["Mon"], 2)
+        self.assertEqual(summary["weekday_distribution"]["Sun"], 2)
+        self.assertAlmostEqual(summary["rolling_average_7"], 5 / 7)
+        self.assertAlmostEqual(summary["rolling_average_30"], 7 / 30)
+        self.assertEqual(summary["tag_completion_rates"]["Work"], 1.0)
+        self.assertEqual(summary["tag_completion_rates"]["General"], 0.0)
+        self.assertEqual(summary["pomodoro_minutes"], 75)
+        self.assertIn("Longest streak: 4 days", str(report))
+
     def test_clients_report(self):
         clients = [Mock(premium=True), Mock(premium=False), Mock(premium=True)]
         clients_report = ClientsReport("Clients", clients)
@@ -168,6 +483,64 @@ class TestSubscription(unittest.TestCase):
             self.subscription.get_clients()
             mock_print.assert_called_with(f"Cliente: {self.username}")
 
+    def test_registry_counts(self):
+        registry = SubscriptionRegistry()
+        alice = Subscription("alice", registry)
+        Subscription("bob", registry)
+        self.assertEqual((registry.count_clients(), registry.count_premium()), (2, 0))
+        self.assertTrue(alice.add_client())
+        self.assertFalse(alice.add_client())
+        self.assertTrue(registry.is_premium("alice"))
+        self.assertFalse(registry.register("bob", premium=True))
+        self.assertEqual(registry.count_premium(), 2)
+        alice.remove_client()
+        self.assertFalse(registry.cancel("alice"))
+        self.assertEqual((registry.count_clients(), registry.count_premium()), (2, 1))
+        report = ClientsReport("Clients", registry)
+        self.assertEqual(report.get_counts(), (2, 1))
+        self.assertIn("Number of premium clients: 1", str(report))
+
+    def test_restored_premium_client(self):
+        registry = SubscriptionRegistry()
+        alice = Subscription("alice", registry, premium=True)
+        self.assertTrue(registry.is_premium("alice"))
+        self.assertFalse(alice.add_client())
+        self.assertIs(PremiumDecorator(Client()).pay_for_subscription(alice), False)
+        self.assertEqual(registry.count_premium(), 1)
+
+    def test_plan_catalog(self):
+        other = Subscription("other")
+        with patch("builtins.print") as mock_print:
+            self.subscription.get_plans()
+            self.subscription.get_plans()
+        self.assertEqual(mock_print.call_count, 4)
+        self.subscription.set_plans()
+        self.assertEqual(len(self.subscription.plans), 2)
+        self.assertIs(self.subscription.plans, other.plans)
+        self.assertEqual(self.subscription.get_plan(2).price, 30000)
+        self.assertEqual(self.subscription.get_price(1), 10000)
+        self.assertIsNone(self.subscription.get_plan(3))
+        with self.assertRaises(AttributeError):
+            self.subscription.plans[0].price = 0
+        with self.assertRaises(TypeError):
+            self.subscription.catalog.by_id[3] = self.subscription.plans[0]
+
+    def test_plan_catalog_from_file(self):
+        handle, path = tempfile.mkstemp(suffix=".json")
+        self.addCleanup(os.remove, path)
+        with os.fdopen(handle, "w") as file:
+            json.dump(
+                [{"id_plan": 7, "name": "Plan", "price": 5, "description": "1 día"}],
+                file,
+            )
+        catalog = PlanCatalog.from_file(path)
+        subscription = Subscription("catalog user", catalog=catalog)
+        self.assertEqual([plan.id_plan for plan in subscription.plans], [7])
+        self.assertIn(7, catalog)
+        self.assertEqual(catalog.get_price(7), 5)
+        with self.assertRaises(ValueError):
+            PlanCatalog(catalog.plans * 2)
+
     def test_set_plans(self):
         self.subscription.set_plans()
         self.assertEqual(len(self.subscription.plans), 2)
@@ -229,5 +602,1579 @@ class TestAuthentication(unittest.TestCase):
         self.assertFalse(self.authentication.authenticate())
 
 
+class TestCredentialStore(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".json")
+        os.close(handle)
+        salt, digest = hash_password("hashedpassword", iterations=1000)
+        self.write_users(
+            [
+                {"username": "testuser", "password": "testpassword", "grants": {}},
+                {
+                    "username": "hasheduser",
+                    "salt": salt.hex(),
+                    "password_hash": digest.hex(),
+                    "iterations": 1000,
+                    "grants": {"admin": True},
+                },
+            ]
+        )
+        self.store = CredentialStore(self.path, iterations=1000)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def write_users(self, users, mtime_ns=None):
+        with open(self.path, "w", encoding="UTF-8") as file:
+            json.dump(users, file)
+        if mtime_ns is not None:
+            os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def test_verify(self):
+        self.assertEqual(self.store.verify("testuser", "testpassword"), {})
+        self.assertEqual(
+            self.store.verify("hasheduser", "hashedpassword"), {"admin": True}
+        )
+        self.assertIsNone(self.store.verify("testuser", "wrong"))
+        self.assertIsNone(self.store.verify("unknown", "testpassword"))
+
+    def test_file_is_cached_until_it_changes(self):
+        self.store.verify("testuser", "testpassword")
+        with patch("builtins.open", wraps=open) as mock_file:
+            self.store.verify("testuser", "testpassword")
+            mock_file.assert_not_called()
+        self.write_users(
+            [{"username": "newuser", "password": "newpassword", "grants": {}}],
+            mtime_ns=os.stat(self.path).st_mtime_ns + 10**9,
+        )
+        self.assertIsNone(self.store.verify("testuser", "testpassword"))
+        self.assertEqual(self.store.verify("newuser", "newpassword"), {})
+
+    def test_plaintext_passwords_are_hashed_on_first_use(self):
+        self.write_users(
+            [
+                {"username": f"user{number}", "password": "secret", "grants": {}}
+                for number in range(50)
+            ]
+        )
+        with patch("project.user_auth.hash_password", wraps=hash_password) as hashed:
+            self.assertEqual(self.store.verify("user7", "secret"), {})
+            # The stored password and the candidate
+            self.assertEqual(hashed.call_count, 2)
+            self.assertIsNone(self.store.verify("user7", "wrong"))
+            self.assertEqual(hashed.call_count, 3)
+
+    def test_authentication_with_store(self):
+        authentication = Authentication("testuser", "testpassword", self.store)
+        self.assertTrue(authentication.authenticate())
+        self.assertFalse(Authentication("testuser", "bad", self.store).authenticate())
+
+
+class TestNameRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = NameRegistry([Task("Task 1"), Task("Task 2")])
+
+    def test_add_and_get(self):
+        self.assertFalse(self.registry.add(Task("Task 1")))
+        self.assertTrue(self.registry.add(Task("Task 3")))
+        self.assertEqual(self.registry.get("Task 3").get_name(), "Task 3")
+        self.assertIsNone(self.registry.get("Task 4"))
+        self.assertEqual(self.registry.names(), ["Task 1", "Task 2", "Task 3"])
+
+    def test_remove(self):
+        removed = self.registry.remove("Task 1")
+        self.assertEqual(removed.get_name(), "Task 1")
+        self.assertIsNone(self.registry.remove("Task 1"))
+        self.assertEqual(len(self.registry), 1)
+        self.assertNotIn("Task 1", self.registry)
+        self.assertNotIn(removed, self.registry)
+
+    def test_add_many(self):
+        added = self.registry.add_many([Task("Task 2"), Task("Task 3"), Task("Task 3")])
+        self.assertEqual(added, [False, True, False])
+        self.assertEqual(self.registry.names(), ["Task 1", "Task 2", "Task 3"])
+
+
+class TestCompletionIndex(unittest.TestCase):
+    def setUp(self):
+        self.today = datetime.date(2024, 6, 10)
+        self.index = CompletionIndex(
+            self.today - datetime.timedelta(days=day % 40) for day in range(400)
+        )
+
+    def test_counts(self):
+        self.assertEqual(len(self.index), 400)
+        self.assertEqual(self.index.count_today(self.today), 10)
+        self.assertEqual(self.index.count_last_days(7, self.today), 80)
+        self.assertEqual(self.index.count_month(2024, 6), 100)
+        self.assertEqual(
+            self.index.count_between(datetime.date(2000, 1, 1), self.today), 400
+        )
+        self.assertEqual(
+            self.index.count_between(self.today, self.today - timedelta(1)), 0
+        )
+
+    def test_remove(self):
+        self.index.remove(self.today, 10)
+        self.assertEqual(self.index.count_today(self.today), 0)
+        self.assertEqual(len(self.index), 390)
+
+
+class TestClient(unittest.TestCase):
+    def setUp(self):
+        self.client = Client()
+
+    def test_create_and_delete_task(self):
+        self.assertTrue(self.client.create_task("Task 1"))
+        self.assertFalse(self.client.create_task("Task 1"))
+        self.assertTrue(self.client.delete_task("Task 1"))
+        self.assertFalse(self.client.delete_task("Task 1"))
+        self.assertTrue(self.client.create_task("Task 1"))
+
+    def test_set_task_as_done(self):
+        self.client.create_task("Task 1")
+        self.assertTrue(self.client.set_task_as_done("Task 1"))
+        self.assertFalse(self.client.set_task_as_done("Task 2"))
+        self.assertTrue(self.client.tasks.get("Task 1").get_status())
+        self.assertEqual(len(self.client.done_tasks), 1)
+
+    def test_completion_index(self):
+        premium = PremiumDecorator(self.client)
+        self.client.create_task("Task 1")
+        self.client.set_task_as_done("Task 1")
+        self.client.set_task_as_done("Task 1")
+        self.assertEqual(len(self.client.done_tasks), 1)
+        self.assertEqual(premium.completions.count_today(), 1)
+        self.assertIn(
+            "Today completed tasks: 1", str(premium.view_productivity_stats())
+        )
+
+    def test_projects(self):
+        self.assertTrue(self.client.create_project("Project 1"))
+        self.assertFalse(self.client.create_project("Project 1"))
+        self.assertTrue(self.client.set_project_as_done("Project 1"))
+        self.assertTrue(self.client.delete_project("Project 1"))
+        self.assertFalse(self.client.set_project_as_done("Project 1"))
+
+    def test_batch_operations(self):
+        premium = PremiumDecorator(self.client)
+        self.client.create_task("Task 1")
+        self.assertEqual(
+            premium.create_tasks(["Task 1", "Task 2", "Task 3", "Task 3"]),
+            [False, True, True, False],
+        )
+        self.assertEqual(
+            premium.set_tasks_as_done(["Task 2", "Task 4", "Task 2", "Task 3"]),
+            [True, False, True, True],
+        )
+        self.assertEqual(len(self.client.done_tasks), 2)
+        self.assertEqual(self.client.completions.count_today(), 2)
+        self.client.create_project("Project 1")
+        self.assertEqual(
+            premium.add_tasks_to_project("Project 1", ["Task 1", "Task 1", "Task 5"]),
+            [True, False, False],
+        )
+        self.assertEqual(premium.add_tasks_to_project("Project 2", ["Task 1"]), [False])
+        self.assertEqual(
+            premium.delete_tasks(["Task 2", "Task 2", "Task 5"]), [True, False, False]
+        )
+        self.assertEqual(self.client.tasks.names(), ["Task 1", "Task 3"])
+        premium.create_folder("folder 1")
+        self.assertEqual(
+            premium.assign_projects_to_folder("folder 1", ["Project 1", "Project 2"]),
+            [True, False],
+        )
+        self.assertEqual(premium.folders.get("folder 1").get_total_count(), 2)
+        self.assertEqual(
+            premium.assign_projects_to_folder("folder 2", ["Project 1"]), [False]
+        )
+
+    def test_pomodoro_runs_in_the_scheduler(self):
+        now = [0.0]
+        scheduler = PomodoroScheduler(clock=lambda: now[0])
+        notification = Notification("user")
+        notification.show_notification = Mock()
+        premium = PremiumDecorator(self.client)
+        session = premium.start_pomodoro(notification, scheduler)
+        self.assertIs(scheduler.get_session("user"), session)
+        today = datetime.datetime.now().date()
+        now[0] = 25 * 60
+        scheduler.run_pending()
+        self.assertEqual(self.client.pomodoro_minutes, {today: 25})
+        # Las pausas no suman minutos
+        now[0] = 30 * 60
+        scheduler.run_pending()
+        self.assertEqual(premium.pomodoro_minutes, {today: 25})
+        now[0] = 55 * 60
+        scheduler.run_pending()
+        self.assertEqual(self.client.pomodoro_minutes, {today: 50})
+
+    def test_premium_decorator_shares_indexes(self):
+        premium = PremiumDecorator(self.client)
+        premium.create_task("Task 1")
+        self.assertIn("Task 1", self.client.tasks)
+        self.client.delete_task("Task 1")
+        self.assertNotIn("Task 1", premium.tasks)
+        self.assertTrue(premium.create_folder("folder 1"))
+        self.assertFalse(premium.create_folder("folder 1"))
+        self.client.create_task("Task 2")
+        self.assertTrue(premium.set_tag("Task 2", "Work"))
+        self.assertEqual(self.client.tasks.get("Task 2").tag, "Work")
+        self.assertFalse(premium.set_tag("Task 3", "Work"))
+
+
+class TestRepository(unittest.TestCase):
+    def setUp(self):
+        self.repository = Repository("sqlite://")
+        client = Client()
+        client.create_task("Task 1")
+        client.create_task("Task 2")
+        client.tasks.get("Task 1").add_component(Subtask("Subtask 1"))
+        client.tasks.get("Task 1").add_component(Subtask("Subtask 2"))
+        client.tasks.get("Task 1").get_component("Subtask 1").set_as_done()
+        client.create_project("Project 1")
+        client.projects.get("Project 1").add_component(client.tasks.get("Task 1"))
+        client.set_task_as_done("Task 2")
+        client.premium = True
+        self.client = PremiumDecorator(client)
+        self.client.create_folder("folder 1")
+        self.client.folders.get("folder 1").add_project(
+            client.projects.get("Project 1")
+        )
+
+    def test_premium_owners_fill_the_registry(self):
+        self.repository.save_client("alice", self.client)
+        self.repository.save_client("bob", Client())
+        registry = SubscriptionRegistry()
+        registry.register_all(self.repository.iter_premium())
+        self.assertEqual((registry.count_clients(), registry.count_premium()), (2, 1))
+        self.assertTrue(registry.is_premium("alice"))
+
+    def test_load_missing_owner(self):
+        self.assertIsNone(self.repository.load_client("nobody"))
+        self.assertFalse(self.repository.exists("nobody"))
+
+    def test_save_and_load(self):
+        self.repository.save_client("testuser", self.client)
+        loaded = self.repository.load_client("testuser")
+        self.assertIsInstance(loaded, PremiumDecorator)
+        self.assertEqual(loaded.tasks.names(), ["Task 1", "Task 2"])
+        self.assertTrue(loaded.tasks.get("Task 2").get_status())
+        self.assertEqual([task.get_name() for task in loaded.done_tasks], ["Task 2"])
+
+        task = loaded.tasks.get("Task 1")
+        self.assertIsInstance(task, LazyTask)
+        self.assertFalse(task.is_loaded())
+        self.assertEqual(task.get_total_count(), 2)
+        self.assertEqual(task.get_done_count(), 1)
+        folder = loaded.folders.get("folder 1")
+        self.assertEqual(folder.get_total_count(), 4)
+        self.assertIs(folder.get_project("Project 1").get_component("Task 1"), task)
+
+        self.assertEqual(task.subtasks.names(), ["Subtask 1", "Subtask 2"])
+        self.assertTrue(task.is_loaded())
+        task.get_component("Subtask 2").set_as_done()
+        self.assertEqual(folder.get_done_count(), 2)
+
+    def test_report_from_stored_dates(self):
+        self.repository.save_client("testuser", self.client)
+        report = TasksReport("Tasks", self.repository.iter_done_dates("testuser"))
+        self.assertEqual(report.get_summary().today_completed_tasks, 1)
+
+    def test_save_keeps_unloaded_subtasks(self):
+        self.repository.save_client("testuser", self.client)
+        loaded = self.repository.load_client("testuser")
+        loaded.create_task("Task 3")
+        self.repository.save_client("testuser", loaded)
+        loaded = self.repository.load_client("testuser")
+        self.assertEqual(len(loaded.tasks.get("Task 1").subtasks), 2)
+        self.assertEqual(len(loaded.tasks), 3)
+        self.repository.delete_client("testuser")
+        self.assertFalse(self.repository.exists("testuser"))
+
+    def test_deleted_task_with_the_name_of_a_listed_one(self):
+        client = self.client
+        client.add_subtask("Task 2", "Old subtask")
+        client.delete_task("Task 2")
+        client.create_task("Task 2")
+        client.add_subtask("Task 2", "New subtask")
+        client.pomodoro_minutes[datetime.date(2024, 1, 1)] = 50
+        self.repository.save_client("testuser", client)
+        loaded = self.repository.load_client("testuser")
+        self.assertEqual(loaded.tasks.names(), ["Task 1", "Task 2"])
+        self.assertFalse(loaded.tasks.get("Task 2").get_status())
+        self.assertEqual(len(loaded.done_tasks), 1)
+        self.assertIsNot(loaded.done_tasks[0], loaded.tasks.get("Task 2"))
+        self.assertEqual(loaded.pomodoro_minutes, {datetime.date(2024, 1, 1): 50})
+
+        # The unloaded subtasks follow their task when the rows move
+        loaded.delete_task("Task 1")
+        self.repository.save_client("testuser", loaded)
+        self.assertEqual(loaded.done_tasks[0].subtasks.names(), ["Old subtask"])
+        loaded = self.repository.load_client("testuser")
+        self.assertEqual(loaded.tasks.get("Task 2").subtasks.names(), ["New subtask"])
+        self.assertEqual(loaded.done_tasks[0].subtasks.names(), ["Old subtask"])
+
+    def test_deleted_project_in_a_folder(self):
+        self.assertTrue(self.client.delete_project("Project 1"))
+        self.assertEqual(len(self.client.folders.get("folder 1").projects), 0)
+        # A link left by hand is not stored
+        self.client.folders.get("folder 1").add_project(Project("Project 2"))
+        self.repository.save_client("testuser", self.client)
+        loaded = self.repository.load_client("testuser")
+        self.assertEqual(len(loaded.folders.get("folder 1").projects), 0)
+
+
+class TestApi(unittest.TestCase):
+    def setUp(self):
+        app = create_app(authenticate=lambda username, password: password == "secret")
+        self.http = HttpClient(app)
+        self.alice = ("alice", "secret")
+        self.bob = ("bob", "secret")
+
+    def test_authentication(self):
+        self.assertEqual(self.http.get("/tasks").status_code, 401)
+        self.assertEqual(
+            self.http.get("/tasks", auth=("alice", "bad")).status_code, 401
+        )
+
+    def test_authentication_does_not_block_the_event_loop(self):
+        in_event_loop = []
+
+        def authenticate(username, password):
+            try:
+                asyncio.get_running_loop()
+                in_event_loop.append(True)
+            except RuntimeError:
+                in_event_loop.append(False)
+            return True
+
+        http = HttpClient(create_app(authenticate=authenticate))
+        self.assertEqual(http.get("/tasks", auth=self.alice).status_code, 200)
+        self.assertEqual(in_event_loop, [False])
+
+    def test_sessions_do_not_block_the_event_loop(self):
+        in_event_loop = []
+        repository = Repository("sqlite://")
+        load_client = repository.load_client
+
+        def load(owner):
+            try:
+                asyncio.get_running_loop()
+                in_event_loop.append(True)
+            except RuntimeError:
+                in_event_loop.append(False)
+            return load_client(owner)
+
+        repository.load_client = load
+        sessions = Sessions(SessionManager(repository, capacity=1))
+        http = HttpClient(create_app(sessions, lambda username, password: True))
+        self.assertEqual(http.get("/tasks", auth=self.alice).status_code, 200)
+        self.assertEqual(in_event_loop, [False])
+
+    def test_served_app_uses_the_repository(self):
+        environment = {
+            "FOCUSTODO_DATABASE_URL": "sqlite://",
+            "FOCUSTODO_SESSIONS": "5",
+            "FOCUSTODO_IDLE_SECONDS": "60",
+        }
+        with patch.dict(os.environ, environment):
+            module = importlib.reload(sys.modules["project.api"])
+            manager = module.app.state.sessions.manager
+        self.assertIsInstance(manager.repository, Repository)
+        self.assertEqual((manager.capacity, manager.idle_seconds), (5, 60))
+        self.assertIs(module.app, module.app)
+
+    def test_tasks_are_isolated_per_user(self):
+        response = self.http.post("/tasks", json={"name": "Task 1"}, auth=self.alice)
+        self.assertEqual(response.status_code, 201)
+        response = self.http.post("/tasks", json={"name": "Task 1"}, auth=self.alice)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(len(self.http.get("/tasks", auth=self.alice).json()), 1)
+        self.assertEqual(self.http.get("/tasks", auth=self.bob).json(), [])
+
+    def test_search(self):
+        self.http.post("/tasks", json={"name": "Comprar pan"}, auth=self.alice)
+        self.http.post(
+            "/tasks/Comprar pan/subtasks",
+            json={"name": "Ir a la panadería"},
+            auth=self.alice,
+        )
+        results = self.http.get("/search", params={"q": "pan"}, auth=self.alice).json()
+        self.assertEqual(
+            [(result["kind"], result["name"]) for result in results],
+            [("task", "Comprar pan"), ("subtask", "Ir a la panadería")],
+        )
+        self.assertEqual(
+            self.http.get("/search", params={"q": "pan"}, auth=self.bob).json(), []
+        )
+
+    def test_clients_report(self):
+        registry = SubscriptionRegistry()
+        app = create_app(Sessions(registry=registry), authenticate=lambda u, p: True)
+        http = HttpClient(app)
+        http.get("/tasks", auth=self.alice)
+        http.post("/subscription", auth=self.bob)
+        self.assertEqual((registry.count_clients(), registry.count_premium()), (2, 1))
+        report = http.get("/reports/clients", auth=self.alice).json()["report"]
+        self.assertIn("Number of clients: 2", report)
+        self.assertIn("Number of premium clients: 1", report)
+
+    def test_text_views(self):
+        for name in ("Task 1", "Task 2", "Task 3"):
+            self.http.post("/tasks", json={"name": name}, auth=self.alice)
+        response = self.http.get(
+            "/views/tasks", params={"offset": 1, "limit": 1}, auth=self.alice
+        )
+        self.assertEqual(response.text, "Tarea: Task 2\n")
+        self.assertEqual(
+            self.http.get("/views/folders", auth=self.alice).status_code, 403
+        )
+
+    def test_text_views_are_streamed(self):
+        app = create_app(authenticate=lambda username, password: True)
+        endpoint = next(
+            route.endpoint for route in app.routes if route.path == "/views/tasks"
+        )
+        client = Client()
+        client.create_tasks(["Task 1", "Task 2"])
+        with patch.object(
+            renderer, "iter_chunks", wraps=renderer.iter_chunks
+        ) as chunks:
+            response = asyncio.run(endpoint(0, None, client))
+            # The tree is rendered while the body is sent, not before
+            self.assertFalse(chunks.called)
+            client.add_subtask("Task 2", "Subtask 1")
+            # The tasks were copied, so the deleted task is still rendered
+            client.delete_task("Task 1")
+
+            async def read():
+                return [chunk async for chunk in response.body_iterator]
+
+            body = asyncio.run(read())
+        self.assertEqual(
+            body, ["Tarea: Task 1\nTarea: Task 2\n     Subtarea: Subtask 1\n\n"]
+        )
+
+    def test_tasks_projects_and_subtasks(self):
+        self.http.post("/tasks", json={"name": "Task 1"}, auth=self.alice)
+        self.http.post(
+            "/tasks/Task 1/subtasks", json={"name": "Subtask 1"}, auth=self.alice
+        )
+        self.http.post("/projects", json={"name": "Project 1"}, auth=self.alice)
+        response = self.http.post(
+            "/projects/Project 1/tasks", json={"name": "Task 1"}, auth=self.alice
+        )
+        self.assertEqual(response.json()["total_count"], 2)
+        response = self.http.post(
+            "/tasks/Task 1/subtasks/Subtask 1/done", auth=self.alice
+        )
+        self.assertTrue(response.json()["subtasks"][0]["status"])
+        response = self.http.post("/tasks/Task 1/done", auth=self.alice)
+        self.assertTrue(response.json()["status"])
+        project = self.http.get("/projects", auth=self.alice).json()[0]
+        self.assertEqual(project["done_count"], 2)
+        self.assertEqual(
+            self.http.delete("/tasks/Task 1", auth=self.alice).status_code, 204
+        )
+        self.assertEqual(
+            self.http.delete("/tasks/Task 1", auth=self.alice).status_code, 404
+        )
+
+    def test_premium_endpoints(self):
+        self.assertEqual(self.http.get("/folders", auth=self.alice).status_code, 403)
+        self.assertEqual(
+            self.http.post("/subscription", auth=self.alice).status_code, 200
+        )
+        self.assertEqual(
+            self.http.post("/subscription", auth=self.alice).status_code, 409
+        )
+        response = self.http.post(
+            "/folders", json={"name": "folder 1"}, auth=self.alice
+        )
+        self.assertEqual(response.status_code, 201)
+        self.http.post("/tasks", json={"name": "Task 1"}, auth=self.alice)
+        self.http.post("/tasks/Task 1/done", auth=self.alice)
+        report = self.http.get("/reports/productivity", auth=self.alice).json()
+        self.assertIn("Total completed tasks: 1", report["report"])
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_hotpaths(self):
+        results = hotpaths.run(sizes=(50,), repeat=1)
+        self.assertEqual(
+            [result["benchmark"] for result in results["results"]],
+            list(hotpaths.BENCHMARKS),
+        )
+        for result in results["results"]:
+            self.assertEqual(result["size"], 50)
+            self.assertGreaterEqual(result["best_s"], 0)
+        json.dumps(results)
+
+    @unittest.skipUnless(
+        os.environ.get("FOCUSTODO_BENCHMARKS"), "FOCUSTODO_BENCHMARKS is not set"
+    )
+    def test_memory(self):
+        results = memory.run(2000, 5)
+        self.assertEqual(results["baseline"], memory.BASELINE)
+        self.assertLess(results["ratio"], 1)
+        self.assertIsNone(memory.run(10, 1, baseline=None)["before"])
+
+    def test_startup_defers_modules(self):
+        results = startup.run(repeat=1)
+        for result in results["results"]:
+            self.assertEqual(result["loaded_too_early"], [])
+            self.assertIn("project.lazy", result["loaded_modules"])
+        json.dumps(results)
+
+    def test_parse_importtime(self):
+        output = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   project.lazy\n"
+            "import time:      2773 |       8466 | main\n"
+        )
+        self.assertEqual(
+            startup.parse_importtime(output), {"project.lazy": 120, "main": 8466}
+        )
+
+
+class TestLazyImport(unittest.TestCase):
+    def test_module_loads_on_first_use(self):
+        sys.modules.pop("json.tool", None)
+        module = lazy.lazy_import("json.tool")
+        self.assertFalse(lazy.is_loaded("json.tool"))
+        self.assertIs(lazy.lazy_import("json.tool"), module)
+        self.assertTrue(callable(module.main))
+        self.assertTrue(lazy.is_loaded("json.tool"))
+
+    def test_missing_module(self):
+        with self.assertRaises(ModuleNotFoundError):
+            lazy.lazy_import("project.missing")
+
+    def test_first_use_from_several_threads(self):
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        with open(os.path.join(directory, "slow_module.py"), "w") as file:
+            file.write("import time\ntime.sleep(0.05)\nVALUE = 1\n")
+        self.enterContext(patch.object(sys, "path", [directory] + sys.path))
+        self.enterContext(patch.dict(sys.modules))
+        module = lazy.lazy_import("slow_module")
+        values = []
+        threads = [
+            threading.Thread(target=lambda: values.append(module.VALUE))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(values, [1] * 8)
+        self.assertTrue(lazy.is_loaded("slow_module"))
+
+
+class TestTransfer(unittest.TestCase):
+    def setUp(self):
+        client = Client()
+        client.create_task("Task 1")
+        client.create_task("Task 2")
+        client.create_task("Deleted")
+        client.tasks.get("Task 1").add_component(Subtask("Subtask 1"))
+        client.tasks.get("Task 1").add_component(Subtask("Subtask 2"))
+        client.tasks.get("Task 1").get_component("Subtask 1").set_as_done()
+        client.tasks.get("Task 2").set_tag("Work")
+        client.create_project("Project 1")
+        for name in ("Task 1", "Deleted"):
+            client.projects.get("Project 1").add_component(client.tasks.get(name))
+        client.delete_task("Deleted")
+        client.set_task_as_done("Task 2")
+        client.premium = True
+        self.client = PremiumDecorator(client)
+        self.client.create_folder("folder 1")
+        self.client.folders.get("folder 1").add_project(
+            client.projects.get("Project 1")
+        )
+
+    def round_trip(self, export, load):
+        output = StringIO()
+        export(self.client, output)
+        output.seek(0)
+        loaded = PremiumDecorator(Client())
+        counts = load(loaded, output, batch_size=1)
+        return loaded, counts
+
+    def test_round_trip(self):
+        for export, load in (
+            (transfer.export_ndjson, transfer.import_ndjson),
+            (transfer.export_csv, transfer.import_csv),
+        ):
+            loaded, counts = self.round_trip(export, load)
+            self.assertEqual(
+                list(transfer.iter_records(loaded)),
+                list(transfer.iter_records(self.client)),
+            )
+            self.assertEqual(counts["task"], 3)
+            self.assertEqual(counts["skipped"], 0)
+            self.assertEqual(loaded.tasks.names(), ["Task 1", "Task 2"])
+            self.assertEqual(loaded.tasks.get("Task 2").tag, "Work")
+            self.assertEqual(len(loaded.completions), 1)
+            project = loaded.projects.get("Project 1")
+            self.assertEqual(project.tasks.names(), ["Task 1", "Deleted"])
+            self.assertEqual(project.get_total_count(), 4)
+            self.assertEqual(project.get_done_count(), 1)
+            self.assertIs(
+                loaded.folders.get("folder 1").get_project("Project 1"), project
+            )
+
+    def test_existing_items_are_skipped(self):
+        output = StringIO()
+        transfer.export_ndjson(self.client, output)
+        output.seek(0)
+        counts = transfer.import_ndjson(self.client, output)
+        self.assertNotIn("project", counts)
+        self.assertEqual(self.client.tasks.names(), ["Task 1", "Task 2"])
+        self.assertEqual(len(self.client.done_tasks), 1)
+
+    def test_folders_need_premium(self):
+        output = StringIO()
+        transfer.export_ndjson(self.client, output)
+        output.seek(0)
+        client = Client()
+        counts = transfer.import_ndjson(client, output)
+        self.assertNotIn("folder", counts)
+        self.assertEqual(counts["skipped"], 2)
+        self.assertEqual(client.projects.names(), ["Project 1"])
+
+    def test_done_history(self):
+        # Done through a project, so not in done_tasks
+        self.client.create_task("Task 3")
+        self.client.create_project("Project 2")
+        self.client.add_task_to_project("Project 2", "Task 3")
+        self.client.set_project_as_done("Project 2")
+        # Done, deleted and created again
+        self.client.delete_task("Task 2")
+        self.client.create_task("Task 2")
+        self.client.set_task_as_done("Task 2")
+        self.client.add_subtask("Task 2", "New subtask")
+        for export, load in (
+            (transfer.export_ndjson, transfer.import_ndjson),
+            (transfer.export_csv, transfer.import_csv),
+        ):
+            loaded, _ = self.round_trip(export, load)
+            self.assertEqual(len(loaded.done_tasks), 2)
+            self.assertEqual(len(loaded.completions), 2)
+            self.assertIsNot(loaded.done_tasks[0], loaded.done_tasks[1])
+            self.assertIs(loaded.done_tasks[1], loaded.tasks.get("Task 2"))
+            self.assertEqual(loaded.done_tasks[0].subtasks.names(), [])
+            self.assertEqual(
+                loaded.tasks.get("Task 2").subtasks.names(), ["New subtask"]
+            )
+            self.assertTrue(loaded.tasks.get("Task 3").get_status())
+
+    def test_files_without_task_ids(self):
+        output = StringIO()
+        for record in transfer.iter_records(self.client):
+            del record["task_id"], record["done_position"]
+            output.write(json.dumps(record) + "\n")
+        output.seek(0)
+        loaded = PremiumDecorator(Client())
+        transfer.import_ndjson(loaded, output)
+        self.assertEqual(len(loaded.done_tasks), 1)
+        self.assertEqual(
+            loaded.projects.get("Project 1").tasks.names(), ["Task 1", "Deleted"]
+        )
+
+    def test_folder_links_to_deleted_projects(self):
+        self.client.folders.get("folder 1").add_project(Project("Deleted"))
+        records = list(transfer.iter_records(self.client))
+        self.assertEqual(
+            [
+                record["name"]
+                for record in records
+                if record["type"] == "folder_project"
+            ],
+            ["Project 1"],
+        )
+
+
+class TestRenderer(unittest.TestCase):
+    def setUp(self):
+        self.client = PremiumDecorator(Client())
+        self.client.create_tasks(["Task 1", "Task 2", "Task 3"])
+        self.client.tasks.get("Task 1").add_component(Subtask("Subtask 1"))
+        self.client.set_task_as_done("Task 2")
+        self.client.create_project("Project 1")
+        self.client.add_tasks_to_project("Project 1", ["Task 1", "Task 2"])
+        self.client.create_folder("folder 1")
+        self.client.assign_projects_to_folder("folder 1", ["Project 1"])
+
+    def test_view_tasks(self):
+        output = StringIO()
+        self.client.view_tasks(file=output)
+        self.assertEqual(
+            output.getvalue(),
+            "Tarea: Task 1\n     Subtarea: Subtask 1\n\nTarea: Task 3\n",
+        )
+        output = StringIO()
+        self.client.view_tasks(offset=1, limit=5, file=output)
+        self.assertEqual(output.getvalue(), "Tarea: Task 3\n")
+
+    def test_chunks_end_between_items(self):
+        task = self.client.tasks.get("Task 1")
+        task.add_component(Subtask("Subtask 2"))
+        tasks = list(self.client.tasks)
+        chunks = renderer.iter_chunks(
+            renderer.iter_tasks(tasks), buffer_size=10, whole_items=True
+        )
+        self.assertEqual(
+            next(chunks),
+            "Tarea: Task 1\n     Subtarea: Subtask 1\n\n"
+            "     Subtarea: Subtask 2\n\n",
+        )
+        # The subtasks of an item can change after its chunk
+        task.add_component(Subtask("Subtask 3"))
+        self.assertEqual(list(chunks), ["Tarea: Task 3\n"])
+        lines = renderer.iter_tasks(tasks)
+        self.assertEqual(
+            next(renderer.iter_chunks(lines, buffer_size=10)), "Tarea: Task 1\n"
+        )
+
+    def test_view_projects_and_folders(self):
+        output = StringIO()
+        self.client.view_projects(file=output)
+        self.assertEqual(
+            output.getvalue().splitlines()[:2],
+            ["Proyecto: Project 1 (1/3 realizadas)", "     Tarea: Task 1"],
+        )
+        output = StringIO()
+        self.client.view_folders(file=output)
+        self.assertIn("     Proyecto: Project 1 (1/3 realizadas)\n", output.getvalue())
+        self.assertIn("         Tarea: Task 2\n", output.getvalue())
+
+    def test_buffered_write(self):
+        output = Mock()
+        renderer.write_lines((f"line {n}" for n in range(1000)), output, 1024)
+        self.assertLess(output.write.call_count, 20)
+        text = "".join(call.args[0] for call in output.write.call_args_list)
+        self.assertEqual(text.splitlines(), [f"line {n}" for n in range(1000)])
+
+    def test_standard_output(self):
+        with patch("sys.stdout", new_callable=StringIO) as output:
+            self.client.view_tasks(limit=1)
+        self.assertTrue(output.getvalue().startswith("Tarea: Task 1\n"))
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = self.directory.name
+
+    def open(self, **options):
+        options.setdefault("fsync", "never")
+        client = journal.JournaledClient.open(self.path, **options)
+        self.addCleanup(client.journal.close)
+        return client
+
+    def test_replay_after_crash(self):
+        client = self.open(fsync="always")
+        client.create_tasks(["Task 1", "Task 2", "Task 3"])
+        client.add_subtask("Task 1", "Subtask 1")
+        client.complete_subtask("Task 1", "Subtask 1")
+        client.set_task_as_done("Task 2")
+        client.delete_task("Task 3")
+        client.create_project("Project 1")
+        client.add_task_to_project("Project 1", "Task 1")
+        client.upgrade_to_premium()
+        client.create_folder("folder 1")
+        client.assign_project_to_folder("folder 1", "Project 1")
+        client.set_tag("Task 1", "Work")
+        self.assertFalse(client.create_task("Task 1"))
+        # No se cierra el cliente, como si la aplicación fallara
+        restored = self.open()
+        self.assertTrue(restored.premium)
+        self.assertEqual(restored.seq, client.seq)
+        self.assertEqual(
+            list(transfer.iter_records(restored)), list(transfer.iter_records(client))
+        )
+        self.assertEqual(restored.completions.count_today(), 1)
+        self.assertEqual(restored.folders.get("folder 1").get_done_count(), 1)
+
+    def test_upgrade_of_a_premium_client(self):
+        client = self.open()
+        client.upgrade_to_premium()
+        premium = client.client
+        client.create_folder("folder 1")
+        client.upgrade_to_premium()
+        self.assertIs(client.client, premium)
+        self.assertIsNotNone(client.folders.get("folder 1"))
+        client.journal.flush()
+        operations = [event["op"] for event in client.journal.read()]
+        self.assertEqual(operations, ["premium", "create_folder"])
+
+    def test_snapshot_compacts_the_journal(self):
+        client = self.open(snapshot_every=3)
+        client.create_tasks(["Task 1", "Task 2"])
+        client.set_task_as_done("Task 1")
+        client.journal.flush()
+        self.assertEqual(len(list(client.journal.read())), 2)
+        client.create_task("Task 3")
+        self.assertEqual(list(client.journal.read()), [])
+        client.create_task("Task 4")
+        client.journal.flush()
+        self.assertEqual(len(list(client.journal.read())), 1)
+        client.close()
+        self.assertEqual(list(client.journal.read()), [])
+        restored = self.open()
+        self.assertEqual(
+            restored.tasks.names(), ["Task 1", "Task 2", "Task 3", "Task 4"]
+        )
+        self.assertEqual(len(restored.done_tasks), 1)
+
+    def test_batched_writes(self):
+        client = self.open(batch_size=3, flush_interval=60)
+        client.create_task("Task 1")
+        client.create_task("Task 2")
+        client.create_task("Task 2")
+        self.assertEqual(list(client.journal.read()), [])
+        client.create_task("Task 3")
+        self.assertEqual(len(list(client.journal.read())), 3)
+        with self.assertRaises(ValueError):
+            journal.Journal("journal.ndjson", fsync="sometimes")
+
+    def test_replay_keeps_the_dates(self):
+        with open(os.path.join(self.path, journal.JOURNAL_FILE), "w") as file:
+            for seq, op, args in (
+                (1, "create_task", ["Task 1"]),
+                (2, "set_task_as_done", ["Task 1"]),
+                (3, "pomodoro_minutes", ["2024-01-02", 50]),
+            ):
+                event = {"seq": seq, "op": op, "args": args, "date": "2024-01-02"}
+                file.write(json.dumps(event) + "\n")
+            file.write('{"seq": 4, "op": "create_')  # Línea cortada
+        client = self.open()
+        day = datetime.date(2024, 1, 2)
+        self.assertEqual(client.tasks.get("Task 1").date_done, day)
+        self.assertEqual(client.completions.count_on(day), 1)
+        self.assertEqual(client.pomodoro_minutes, {day: 50})
+        self.assertEqual(client.seq, 3)
+
+    def test_restart_keeps_the_done_history(self):
+        client = self.open()
+        client.create_tasks(["Task 1", "Task 2"])
+        client.create_project("Project 1")
+        client.add_task_to_project("Project 1", "Task 1")
+        client.set_project_as_done("Project 1")
+        for _ in range(2):
+            client.set_task_as_done("Task 2")
+            client.delete_task("Task 2")
+            client.create_task("Task 2")
+        client.close()
+        restored = self.open()
+        self.assertEqual(len(restored.done_tasks), 2)
+        self.assertEqual(len(restored.completions), 2)
+        self.assertTrue(restored.tasks.get("Task 1").get_status())
+        self.assertFalse(restored.tasks.get("Task 2").get_status())
+
+    def test_only_changes_are_recorded(self):
+        client = self.open(batch_size=1)
+        client.upgrade_to_premium()
+        seq = client.seq
+        self.assertFalse(client.set_subtask_as_done("Missing"))
+        self.assertEqual(client.rename_tag("Work", "Home"), 0)
+        self.assertEqual(client.seq, seq)
+        client.create_task("Task 1")
+        client.set_tag("Task 1", "Work")
+        self.assertTrue(client.set_subtask_as_done("Task 1"))
+        self.assertEqual(client.rename_tag("Work", "Home"), 1)
+        self.assertEqual(client.rename_tag("Home", "Home"), 0)
+        self.assertEqual(client.seq, seq + 4)
+
+    def test_idle_journal_is_flushed(self):
+        client = self.open(batch_size=100, flush_interval=0.05)
+        client.create_task("Task 1")
+        for _ in range(100):
+            if list(client.journal.read()):
+                break
+            time.sleep(0.01)
+        self.assertEqual(len(list(client.journal.read())), 1)
+
+    def test_pomodoro_minutes_are_recorded(self):
+        now = [0.0]
+        scheduler = PomodoroScheduler(clock=lambda: now[0])
+        client = self.open(batch_size=1)
+        client.start_pomodoro(Mock(username="user"), scheduler)
+        now[0] = 25 * 60
+        scheduler.run_pending()
+        restored = self.open()
+        today = datetime.datetime.now().date()
+        self.assertEqual(restored.pomodoro_minutes, {today: 25})
+        self.assertEqual(restored.seq, client.seq)
+
+    def test_repository_is_the_checkpoint(self):
+        repository = Repository("sqlite://")
+        client = journal.open_client(repository, "alice", self.path, fsync="never")
+        client.create_tasks(["Task 1", "Task 2"])
+        client.close()
+        self.assertEqual(repository.load_journal_seq("alice"), client.seq)
+        # La API guarda sus cambios en el mismo repositorio
+        stored = repository.load_client("alice")
+        stored.create_task("Task 3")
+        repository.save_client("alice", stored)
+        self.assertEqual(repository.load_journal_seq("alice"), client.seq)
+        client = journal.open_client(repository, "alice", self.path, fsync="never")
+        self.addCleanup(client.journal.close)
+        self.assertEqual(client.tasks.names(), ["Task 1", "Task 2", "Task 3"])
+        client.set_task_as_done("Task 3")
+        client.journal.flush()
+        # Sin cerrar solo se aplica la cola del journal posterior al checkpoint
+        restored = journal.open_client(repository, "alice", self.path)
+        self.addCleanup(restored.journal.close)
+        self.assertEqual(restored.seq, client.seq)
+        self.assertTrue(restored.tasks.get("Task 3").get_status())
+        self.assertEqual(len(restored.done_tasks), 1)
+
+    def test_pinned_date_is_not_shared(self):
+        seen = []
+        with composite.pinned_today(datetime.date(2024, 1, 2)):
+            thread = threading.Thread(target=lambda: seen.append(Task("Task").date))
+            thread.start()
+            thread.join()
+            self.assertEqual(Task("Task").date, datetime.date(2024, 1, 2))
+        self.assertEqual(seen, [datetime.datetime.now().date()])
+
+
+class TestSessionManager(unittest.TestCase):
+    def setUp(self):
+        self.now = 0
+        self.repository = Repository("sqlite://")
+        self.manager = SessionManager(
+            self.repository, capacity=2, idle_seconds=60, clock=lambda: self.now
+        )
+
+    def test_lru_eviction_and_rehydration(self):
+        self.manager.get("alice").create_task("Task 1")
+        self.manager.get("bob")
+        self.manager.get("alice")
+        self.manager.get("carol")
+        self.assertNotIn("bob", self.manager)
+        self.assertIn("alice", self.manager)
+        self.assertTrue(self.repository.exists("bob"))
+        self.manager.get("alice")
+        self.manager.get("dave")
+        self.assertNotIn("carol", self.manager)
+        self.manager.get("alice")
+        self.manager.get("bob")
+        self.assertNotIn("dave", self.manager)
+        self.assertEqual(self.manager.get("alice").tasks.names(), ["Task 1"])
+        self.manager.evict("alice")
+        self.assertEqual(self.manager.get("alice").tasks.names(), ["Task 1"])
+        stats = self.manager.stats()
+        self.assertEqual(stats["evictions"], 4)
+        self.assertEqual(stats["hits"], 4)
+        self.assertEqual(stats["misses"], 6)
+        self.assertEqual(stats["rehydrations"], 2)
+        self.assertEqual(stats["size"], 2)
+
+    def test_idle_eviction(self):
+        self.manager.get("alice")
+        self.now = 30
+        premium = PremiumDecorator(self.manager.get("bob"))
+        premium.premium = True
+        self.manager.set("bob", premium)
+        self.now = 70
+        self.assertEqual(self.manager.evict_idle(), 1)
+        self.assertEqual(self.manager.clients(), [premium])
+        self.now = 100
+        self.assertEqual(self.manager.evict_idle(), 1)
+        self.assertTrue(self.manager.get("bob").premium)
+
+    def test_failed_save_keeps_the_client(self):
+        alice = self.manager.get("alice")
+        alice.create_task("Task 1")
+        self.now = 30
+        self.manager.get("bob")
+        save = self.repository.save_client
+
+        def save_client(owner, client):
+            if owner == "alice":
+                raise OSError("disk full")
+            save(owner, client)
+
+        self.repository.save_client = save_client
+        with self.assertRaises(OSError):
+            self.manager.evict("alice")
+        self.assertIs(self.manager.get("alice"), alice)
+        # The other users are not affected
+        self.now = 100
+        with self.assertLogs("project.sessions", "ERROR"):
+            self.assertEqual(self.manager.evict_idle(), 1)
+        self.assertEqual(self.manager.clients(), [alice])
+        with self.assertLogs("project.sessions", "ERROR"):
+            self.manager.get("carol")
+            self.manager.get("dave")
+        # carol is evicted instead of alice
+        self.assertEqual(self.manager.clients(), [alice, self.manager.get("dave")])
+        self.assertEqual(self.manager.stats()["failed_evictions"], 2)
+        self.repository.save_client = save
+        self.manager.get("erin")
+        self.assertEqual(len(self.manager), 2)
+        self.assertEqual(self.repository.load_client("alice").tasks.names(), ["Task 1"])
+
+    def blocking(self, method):
+        """Makes a repository method wait until the returned event is set."""
+        original = getattr(self.repository, method)
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def wait(owner, *args):
+            calls.append(owner)
+            started.set()
+            release.wait(5)
+            return original(owner, *args)
+
+        setattr(self.repository, method, wait)
+        self.addCleanup(release.set)
+        return started, release, calls
+
+    def test_loading_does_not_block_other_users(self):
+        bob = self.manager.get("bob")
+        started, release, calls = self.blocking("load_client")
+        clients = []
+        threads = [
+            threading.Thread(target=lambda: clients.append(self.manager.get("alice")))
+            for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        self.assertTrue(started.wait(5))
+        # bob is served while alice is loaded outside the lock
+        served = []
+        serving = threading.Thread(
+            target=lambda: served.append(self.manager.get("bob"))
+        )
+        serving.start()
+        serving.join(1)
+        self.assertEqual(served, [bob])
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(calls, ["alice"])
+        self.assertIs(clients[0], clients[1])
+
+    def test_requests_wait_for_the_eviction(self):
+        self.manager.get("alice").create_task("Task 1")
+        self.manager.get("bob")
+        started, release, _ = self.blocking("save_client")
+        evicting = threading.Thread(target=self.manager.evict, args=("alice",))
+        evicting.start()
+        self.assertTrue(started.wait(5))
+        self.assertNotIn("alice", self.manager)
+        self.assertFalse(self.manager.evict("alice"))
+        # bob is served while alice is saved, and alice waits for the save
+        serving = threading.Thread(target=self.manager.get, args=("bob",))
+        serving.start()
+        serving.join(1)
+        self.assertFalse(serving.is_alive())
+        clients = []
+        loading = threading.Thread(
+            target=lambda: clients.append(self.manager.get("alice"))
+        )
+        loading.start()
+        loading.join(0.1)
+        self.assertEqual(clients, [])
+        release.set()
+        evicting.join(5)
+        loading.join(5)
+        self.assertEqual(clients[0].tasks.names(), ["Task 1"])
+
+    def test_failed_load_is_not_replaced(self):
+        def load_client(owner):
+            raise OSError("database is locked")
+
+        self.repository.load_client = load_client
+        with self.assertRaises(OSError):
+            self.manager.get("alice")
+        self.assertNotIn("alice", self.manager)
+
+    def test_without_repository(self):
+        manager = SessionManager(capacity=1)
+        manager.get("alice")
+        manager.get("bob")
+        self.assertEqual(len(manager), 2)
+        self.assertEqual(manager.evict_idle(), 0)
+
+    def test_api_stats(self):
+        http = HttpClient(
+            create_app(Sessions(self.manager), authenticate=lambda user, password: True)
+        )
+        http.get("/tasks", auth=("alice", "secret"))
+        http.get("/tasks", auth=("alice", "secret"))
+        stats = http.get("/sessions/stats", auth=("alice", "secret")).json()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+
+class TestSearch(unittest.TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.client.create_tasks(["Comprar pan", "Estudiar cálculo", "Pagar arriendo"])
+        self.client.add_subtask("Estudiar cálculo", "Repasar integrales")
+        self.client.create_project("Proyecto de cálculo")
+
+    def names(self, query, limit=10):
+        return [result.name for result in self.client.search(query, limit)]
+
+    def test_tokenize(self):
+        self.assertEqual(
+            search.tokenize("Estudiar Cálculo-II"), ["estudiar", "calculo", "ii"]
+        )
+
+    def test_exact_and_prefix_ranking(self):
+        self.assertEqual(
+            self.names("calculo"), ["Estudiar cálculo", "Proyecto de cálculo"]
+        )
+        self.assertEqual(self.names("integ"), ["Repasar integrales"])
+        result = self.client.search("integ")[0]
+        self.assertEqual((result.kind, result.parent), ("subtask", "Estudiar cálculo"))
+        self.assertEqual(self.names("cal"), ["Estudiar cálculo", "Proyecto de cálculo"])
+        self.assertTrue(
+            self.client.search("calculo")[0].score > self.client.search("cal")[0].score
+        )
+
+    def test_multi_term(self):
+        self.assertEqual(self.names("proyecto calc"), ["Proyecto de cálculo"])
+        self.assertEqual(self.names("comprar calculo"), [])
+
+    def test_fuzzy(self):
+        self.assertEqual(self.names("arrendo"), ["Pagar arriendo"])
+        self.assertEqual(self.names("comrpar"), ["Comprar pan"])
+        self.assertEqual(self.client.search_index.search("arrendo", fuzzy=False), [])
+
+    def test_index_follows_changes(self):
+        self.client.search("pan")
+        self.client.create_task("Pan integral")
+        self.assertEqual(self.names("pan"), ["Comprar pan", "Pan integral"])
+        self.client.delete_task("Estudiar cálculo")
+        self.assertEqual(self.names("integrales"), [])
+        self.client.delete_project("Proyecto de cálculo")
+        self.assertEqual(self.names("calculo"), [])
+        self.client.remove_subtask("Comprar pan", "Nada")
+        self.client.add_subtask("Comprar pan", "Ir temprano")
+        self.assertEqual(self.names("temprano"), ["Ir temprano"])
+        self.client.remove_subtask("Comprar pan", "Ir temprano")
+        self.assertEqual(self.names("temprano"), [])
+        self.assertEqual(len(self.client.search_index), 3)
+
+    def test_premium_folders_and_tags(self):
+        self.client.search("pan")
+        premium = PremiumDecorator(self.client)
+        premium.create_folder("Universidad")
+        self.assertEqual([r.kind for r in premium.search("univ")], ["folder"])
+        premium.create_folder("Casa")
+        premium.set_tag("Comprar pan", "Mercado")
+        self.assertEqual([r.name for r in premium.search("casa")], ["Casa"])
+        self.assertEqual([r.name for r in premium.search("mercado")], ["Comprar pan"])
+
+    def test_import_reindexes(self):
+        self.client.search("pan")
+        other = Client()
+        other.create_task("Lavar ropa")
+        output = StringIO()
+        transfer.export_ndjson(other, output)
+        output.seek(0)
+        transfer.import_ndjson(self.client, output)
+        self.assertEqual(self.names("ropa"), ["Lavar ropa"])
+
+    def test_limit(self):
+        self.client.create_tasks([f"Tarea {number}" for number in range(50)])
+        self.assertEqual(len(self.client.search("tarea")), 10)
+        self.assertEqual(len(self.client.search("tarea", limit=None)), 50)
+        self.assertEqual(self.names("tarea 7", limit=1), ["Tarea 7"])
+
+
+class TestTags(unittest.TestCase):
+    def setUp(self):
+        self.client = PremiumDecorator(Client())
+        self.client.create_tasks(["Task 1", "Task 2", "Task 3"])
+
+    def names(self, tag, pending=None):
+        return [
+            task.get_name() for task in self.client.get_tag_index().tasks(tag, pending)
+        ]
+
+    def test_task_tags(self):
+        task = Task("Task")
+        self.assertEqual((task.tag, task.get_tags()), ("General", ("General",)))
+        self.assertTrue(task.add_tag("Work"))
+        self.assertTrue(task.add_tag("Urgent"))
+        self.assertFalse(task.add_tag("Work"))
+        self.assertFalse(task.add_tag("a,b"))
+        self.assertEqual((task.tag, task.tags), ("Work", ("Work", "Urgent")))
+        self.assertTrue(task.remove_tag("Work"))
+        self.assertFalse(task.remove_tag("Work"))
+        task.set_tag("Home")
+        self.assertEqual(task.tags, ("Home",))
+        task.set_tag("General")
+        self.assertEqual(task.tags, ())
+
+    def test_index_follows_tags(self):
+        self.assertEqual(self.names("General"), ["Task 1", "Task 2", "Task 3"])
+        self.assertEqual(
+            self.client.tag_tasks("Work", ["Task 1", "Task 3", "Task 9"]),
+            [True, True, False],
+        )
+        self.assertTrue(self.client.add_tag("Task 1", "Urgent"))
+        self.assertEqual(self.names("Work"), ["Task 1", "Task 3"])
+        self.assertEqual(self.names("General"), ["Task 2"])
+        self.assertEqual(self.client.untag_tasks("Work", ["Task 3"]), [True])
+        self.assertEqual(self.names("Work"), ["Task 1"])
+        self.assertEqual(self.names("General"), ["Task 2", "Task 3"])
+        self.client.set_tag("Task 1", "Home")
+        self.assertNotIn("Work", self.client.get_tag_index())
+        self.assertEqual(self.names("Home"), ["Task 1"])
+
+    def test_filtered_views_and_counts(self):
+        self.client.tag_tasks("Work", ["Task 1", "Task 2"])
+        self.client.set_task_as_done("Task 1")
+        self.assertEqual(self.names("Work", pending=True), ["Task 2"])
+        self.assertEqual(self.client.count_tasks_by_tag("Work"), 2)
+        self.assertEqual(self.client.count_tasks_by_tag("Work", pending=True), 1)
+        self.assertEqual(self.client.count_tasks_by_tag("Missing"), 0)
+        self.assertEqual(
+            self.client.get_tag_counts(), {"General": (1, 1), "Work": (1, 2)}
+        )
+        output = StringIO()
+        self.client.view_tasks_by_tag("Work", file=output)
+        self.assertEqual(output.getvalue(), "Tarea: Task 2\n")
+
+    def test_pending_tasks_after_the_index_is_built(self):
+        self.client.tag_tasks("Work", ["Task 1", "Task 2", "Task 3"])
+        self.client.create_project("Project 1")
+        self.client.add_task_to_project("Project 1", "Task 3")
+        self.assertEqual(self.client.get_tag_counts()["Work"], (3, 3))
+        self.client.set_task_as_done("Task 1")
+        self.client.set_tasks_as_done(["Task 2", "Task 9"])
+        self.assertEqual(self.names("Work", pending=True), ["Task 3"])
+        self.client.set_project_as_done("Project 1")
+        self.assertEqual(self.client.get_tag_counts()["Work"], (0, 3))
+        self.assertEqual(self.client.count_tasks_by_tag("Work", pending=False), 3)
+        self.assertEqual(
+            self.names("Work", pending=False), ["Task 1", "Task 2", "Task 3"]
+        )
+        self.client.untag_tasks("Work", ["Task 1"])
+        self.assertEqual(
+            self.client.get_tag_counts(), {"General": (0, 1), "Work": (0, 2)}
+        )
+
+    def test_created_and_deleted_tasks(self):
+        self.client.get_tag_index()
+        self.client.create_task("Task 4")
+        self.client.delete_tasks(["Task 1", "Task 2"])
+        self.assertEqual(self.names("General"), ["Task 3", "Task 4"])
+        self.client.add_tag("Task 3", "Work")
+        self.client.delete_task("Task 3")
+        self.assertEqual(self.client.count_tasks_by_tag("Work"), 0)
+
+    def test_rename_tag(self):
+        self.client.tag_tasks("Work", ["Task 1", "Task 2"])
+        self.client.add_tag("Task 2", "Office")
+        self.assertEqual(self.client.rename_tag("Work", "Office"), 2)
+        self.assertEqual(self.names("Office"), ["Task 2", "Task 1"])
+        self.assertEqual(self.client.tasks.get("Task 2").tags, ("Office",))
+        self.assertEqual(self.client.search("office")[0].kind, "task")
+        self.assertEqual(self.client.rename_tag("Office", "Office"), 0)
+        self.assertEqual(self.client.rename_tag("Office", " Office "), 0)
+        self.assertEqual(self.client.rename_tag("Missing", "Office"), 0)
+
+    def test_tags_are_stored(self):
+        self.client.tag_tasks("Work", ["Task 1"])
+        self.client.add_tag("Task 1", "Urgent")
+        output = StringIO()
+        transfer.export_ndjson(self.client, output)
+        output.seek(0)
+        other = Client()
+        transfer.import_ndjson(other, output)
+        self.assertEqual(other.tasks.get("Task 1").tags, ("Work", "Urgent"))
+        self.assertEqual(other.tasks.get("Task 2").tags, ())
+        repository = Repository("sqlite:///:memory:")
+        repository.save_client("alice", self.client)
+        loaded = repository.load_client("alice")
+        self.assertEqual(loaded.tasks.get("Task 1").tags, ("Work", "Urgent"))
+
+
+class TestThreadSafeClient(unittest.TestCase):
+    THREADS = 8
+    ITERATIONS = 200
+
+    def use_unloaded_modules(self, *names):
+        """This method gives the client new lazy modules, as in a new process."""
+        package = sys.modules["project"]
+        self.enterContext(patch.dict(sys.modules))
+        for name in names:
+            sys.modules.pop(f"project.{name}", None)
+            self.enterContext(
+                patch.object(package, name, getattr(package, name, None), create=True)
+            )
+            module = lazy.lazy_import(f"project.{name}")
+            self.enterContext(patch.object(cliente, name, module))
+
+    def run_threads(self, target, *args):
+        """This method runs the target in THREADS threads and returns their errors."""
+        errors = []
+
+        def work(number):
+            try:
+                target(number, *args)
+            except Exception as error:  # pylint: disable= broad-exception-caught
+                errors.append(error)
+
+        threads = [
+            threading.Thread(target=work, args=(number,))
+            for number in range(self.THREADS)
+        ]
+        # Se cambia de hilo muy seguido para forzar las condiciones de carrera
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+        return errors
+
+    def test_first_use_of_the_lazy_modules(self):
+        self.use_unloaded_modules("report_factory")
+        client = Client()
+        client.premium = True
+        client = ThreadSafeClient(PremiumDecorator(client))
+        client.create_task("Task 1")
+        client.set_task_as_done("Task 1")
+        errors = self.run_threads(lambda number: client.view_productivity_stats())
+        self.assertEqual(errors, [])
+
+    def test_readers_share_and_writers_wait(self):
+        lock = ReadWriteLock()
+        events = []
+        lock.acquire_read()
+        lock.acquire_read()
+
+        def write():
+            with lock.write():
+                events.append("write")
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        writer.join(0.05)
+        self.assertEqual(events, [])
+        lock.release_read()
+        lock.release_read()
+        writer.join()
+        self.assertEqual(events, ["write"])
+
+    def test_waiting_writer_goes_before_new_readers(self):
+        lock = ReadWriteLock()
+        events = []
+        lock.acquire_read()
+
+        def write():
+            with lock.write():
+                events.append("write")
+
+        def read():
+            with lock.read():
+                events.append("read")
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        while not lock._waiting_writers:
+            time.sleep(0.001)
+        reader = threading.Thread(target=read)
+        reader.start()
+        reader.join(0.05)
+        self.assertEqual(events, [])
+        lock.release_read()
+        writer.join()
+        reader.join()
+        self.assertEqual(events, ["write", "read"])
+
+    def test_stress(self):
+        # La búsqueda se carga por primera vez dentro de los hilos
+        self.use_unloaded_modules("search")
+        client = ThreadSafeClient(Client())
+        client.create_project("Shared")
+
+        def work(number):
+            for iteration in range(self.ITERATIONS):
+                name = f"T{number}-{iteration}"
+                shared = f"Shared {iteration % 5}"
+                client.create_task(name)
+                client.add_subtask(name, "Subtask")
+                client.add_task_to_project("Shared", name)
+                client.create_task(shared)
+                client.add_task_to_project("Shared", shared)
+                if iteration % 2 == 0:
+                    client.set_task_as_done(name)
+                client.set_tasks_as_done([shared])
+                client.complete_subtask(name, "Subtask")
+                if iteration % 3 == 0:
+                    client.delete_tasks([name, shared])
+                client.view_tasks(limit=5, file=StringIO())
+                client.view_projects(limit=1, file=StringIO())
+                client.search(name)
+
+        self.assertEqual(self.run_threads(work), [])
+
+        # Every task was done once, and the counters add up
+        done = client.done_tasks
+        self.assertEqual(len({id(task) for task in done}), len(done))
+        self.assertEqual(len(client.completions), len(done))
+        project = client.projects.get("Shared")
+        total = sum(1 + len(task.subtasks) for task in project.tasks)
+        finished = sum(
+            int(task.status) + sum(int(subtask.status) for subtask in task.subtasks)
+            for task in project.tasks
+        )
+        self.assertEqual(project.get_total_count(), total)
+        self.assertEqual(project.get_done_count(), finished)
+        kept = self.THREADS * (self.ITERATIONS - len(range(0, self.ITERATIONS, 3)))
+        self.assertEqual(
+            len([task for task in client.tasks if task.get_name().startswith("T")]),
+            kept,
+        )
+
+        # The search index has the same items as the client
+        index = client.search_index
+        for task in client.tasks:
+            self.assertIn(("task", task.get_name()), index)
+        subtasks = sum(len(task.subtasks) for task in client.tasks)
+        self.assertEqual(len(index), len(client.tasks) + subtasks + 1)
+
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        database = os.path.join(self.directory.name, "focustodo.db")
+        self.options = [
+            "--user",
+            "alice",
+            "--database",
+            f"sqlite:///{database}",
+            "--journal",
+            os.path.join(self.directory.name, "journal"),
+        ]
+
+    def run_cli(self, *argv, stdin="", authenticate=lambda user, password: True):
+        stdout = StringIO()
+        stderr = StringIO()
+        status = cli.run(
+            self.options + list(argv),
+            stdin=StringIO(stdin),
+            stdout=stdout,
+            stderr=stderr,
+            environ={},
+            authenticate=authenticate,
+        )
+        return status, stdout.getvalue(), stderr.getvalue()
+
+    def test_subcommand(self):
+        status, _, errors = self.run_cli("create-task", "Comprar pan", "Pagar arriendo")
+        self.assertEqual((status, errors), (cli.EXIT_OK, ""))
+        status, output, _ = self.run_cli("tasks", "--limit", "1")
+        self.assertEqual((status, output), (cli.EXIT_OK, "Tarea: Comprar pan\n"))
+
+    def test_script_from_stdin(self):
+        script = """
+        # Onboarding
+        create-task "Comprar pan" "Pagar arriendo"
+        add-subtask "Comprar pan" "Ir temprano"
+        create-project Casa
+        add-to-project Casa "Comprar pan" "Pagar arriendo"
+        done "Pagar arriendo"
+        projects
+        search arriendo
+        """
+        status, output, errors = self.run_cli("--script", "-", stdin=script)
+        self.assertEqual((status, errors), (cli.EXIT_OK, ""))
+        self.assertEqual(
+            output,
+            "Proyecto: Casa (1/3 realizadas)\n"
+            "     Tarea: Comprar pan\n"
+            "         Subtarea: Ir temprano\n"
+            "\n"
+            "task: Pagar arriendo\n",
+        )
+
+    def test_script_file_and_persistence(self):
+        path = os.path.join(self.directory.name, "script.txt")
+        with open(path, "w", encoding="UTF-8") as file:
+            file.write("create-task Uno Dos\ndelete-task Uno\n")
+        self.assertEqual(self.run_cli("--script", path)[0], cli.EXIT_OK)
+        self.assertEqual(self.run_cli("tasks")[1], "Tarea: Dos\n")
+
+    def test_reads_the_changes_of_the_api(self):
+        self.assertEqual(self.run_cli("create-task", "Uno")[0], cli.EXIT_OK)
+        repository = Repository(self.options[3])
+        stored = repository.load_client("alice")
+        stored.create_task("Dos")
+        repository.save_client("alice", stored)
+        self.assertEqual(self.run_cli("tasks")[1], "Tarea: Uno\nTarea: Dos\n")
+
+    def test_failures(self):
+        script = """
+        create-task Uno
+        create-task Uno Dos
+        unknown-command
+        add-subtask "sin comillas
+        create-folder Carpeta
+        tasks
+        """
+        status, output, errors = self.run_cli("--script", "-", stdin=script)
+        self.assertEqual(status, cli.EXIT_FAILED)
+        self.assertEqual(output, "Tarea: Uno\nTarea: Dos\n")
+        lines = errors.splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[0], "línea 3: create-task: falló para Uno")
+        self.assertTrue(lines[1].startswith("línea 4: unknown-command"))
+        self.assertTrue(lines[2].startswith("línea 5: "))
+        self.assertIn("premium", lines[3])
+
+    def test_malformed_csv(self):
+        path = os.path.join(self.directory.name, "broken.csv")
+        with open(path, "w", encoding="UTF-8") as file:
+            # Más grande que el límite de un campo CSV
+            file.write("type,name\ntask," + "x" * (1 << 18) + "\n")
+        status, _, errors = self.run_cli("import", path)
+        self.assertEqual(status, cli.EXIT_FAILED)
+        self.assertIn("import", errors)
+
+    def test_stop_on_error(self):
+        script = "done Nada\ncreate-task Uno\n"
+        status, _, _ = self.run_cli("--stop-on-error", "--script", "-", stdin=script)
+        self.assertEqual(status, cli.EXIT_FAILED)
+        self.assertEqual(self.run_cli("tasks")[1], "")
+
+    def test_usage_errors(self):
+        self.assertEqual(self.run_cli()[0], cli.EXIT_USAGE)
+        self.assertEqual(
+            self.run_cli("--script", "-", "tasks", stdin="tasks")[0], cli.EXIT_USAGE
+        )
+        status, _, errors = self.run_cli(
+            "tasks", authenticate=lambda user, password: False
+        )
+        self.assertEqual(status, cli.EXIT_USAGE)
+        self.assertIn(cli.PASSWORD_VARIABLE, errors)
+
+    def test_output_is_buffered(self):
+        client = Client()
+        stdout = Mock()
+        runner = cli.BatchRunner(client, stdout, StringIO(), buffer_size=1 << 20)
+        commands = [(None, ["create-task", f"Tarea {number}"]) for number in range(50)]
+        commands.append((None, ["tasks"]))
+        self.assertTrue(runner.run_all(commands))
+        self.assertEqual(stdout.write.call_count, 1)
+        self.assertEqual(runner.commands, 51)
+
+
 if __name__ == "__main__":
     unittest.main()